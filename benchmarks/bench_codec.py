@@ -0,0 +1,42 @@
+"""Compare the JSON codecs available to homepluscontrol on large synthetic payloads.
+
+Usage: python benchmarks/bench_codec.py [modules per home ...]
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homepluscontrol import homepluscodec  # noqa: E402
+from homepluscontrol.homeplussynthetic import generate_homes_data, generate_module_status  # noqa: E402
+
+NUM_HOMES = 10
+
+
+def bench(func, number):
+    """Return the best time per call in milliseconds."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1000
+
+
+def main(sizes):
+    print(f"{'payload':<28}{'size':>10}  " + "".join(f"{name + ' loads':>14}{name + ' dumps':>14}" for name in homepluscodec.CODECS))
+    for modules_per_home in sizes:
+        homes_data = generate_homes_data(NUM_HOMES, modules_per_home)
+        payloads = {
+            f"homesdata {NUM_HOMES}x{modules_per_home}": homes_data,
+            f"homestatus {modules_per_home}": generate_module_status(homes_data["body"]["homes"][0]),
+        }
+        for label, payload in payloads.items():
+            raw = json.dumps(payload).encode()
+            number = max(1, 2_000_000 // len(raw))
+            row = f"{label:<28}{len(raw) // 1024:>8}kB  "
+            for codec in homepluscodec.CODECS.values():
+                row += f"{bench(lambda: codec.loads(raw), number):>12.3f}ms"
+                row += f"{bench(lambda: codec.dumps(payload), number):>12.3f}ms"
+            print(row)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10, 100, 1000, 10000])
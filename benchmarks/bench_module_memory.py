@@ -0,0 +1,66 @@
+"""Measure the memory used per module object with tracemalloc.
+
+The "before" figures use plain objects without __slots__ that hold the same instance attributes as the modules in a
+per-instance __dict__, which is how the module classes were laid out before they declared __slots__. The "after"
+figures use the slotted classes.
+
+Usage: python benchmarks/bench_module_memory.py [number of modules]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homepluscontrol.homeplusautomation import HomePlusAutomation  # noqa: E402
+from homepluscontrol.homepluslight import HomePlusLight  # noqa: E402
+from homepluscontrol.homeplusplug import HomePlusPlug  # noqa: E402
+from homepluscontrol.homeplusremote import HomePlusRemote  # noqa: E402
+
+MODULE_CLASSES = [HomePlusPlug, HomePlusLight, HomePlusRemote, HomePlusAutomation]
+
+
+def slot_names(cls):
+    """Return the names of the instance attributes of a slotted class, from its base class down."""
+    return [name for klass in reversed(cls.__mro__) for name in vars(klass).get("__slots__", ())]
+
+
+def unslotted(cls):
+    """Return a function that creates objects holding the attributes of the modules of a class in a per-instance
+    __dict__."""
+    baseline = type(f"Unslotted{cls.__name__}", (), {})
+    # The status URL used to be set on every instance too
+    names = slot_names(cls) + ["statusUrl"]
+
+    def create(*args):
+        module = cls(*args)
+        instance = baseline()
+        for name in names:
+            setattr(instance, name, getattr(module, name))
+        return instance
+
+    return create
+
+
+def bytes_per_module(cls, count):
+    """Return the number of bytes allocated per module when creating `count` modules with a class or function."""
+    # Identifiers and names are created up front, as they are shared with the payloads in practice
+    ids = [f"aa:00:00:00:{i >> 16 & 0xFF:02x}:{i >> 8 & 0xFF:02x}:{i & 0xFF:02x}" for i in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    modules = [cls(None, m_id, "Module", "NLP", "plug", "00:11:22:33:44:55") for m_id in ids]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del modules
+    return allocated / count
+
+
+def main(count):
+    print(f"{'class':<22}{'before (B/module)':>20}{'after (B/module)':>20}")
+    for cls in MODULE_CLASSES:
+        print(f"{cls.__name__:<22}{bytes_per_module(unslotted(cls), count):>20.1f}{bytes_per_module(cls, count):>20.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
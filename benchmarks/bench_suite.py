@@ -0,0 +1,227 @@
+"""Benchmark suite of the parsing, refresh cycle, token and command paths on synthetic fleets.
+
+Every case is timed on homes of increasing size and the best time per call is reported. The network cases run against
+the local fake API server, so they include the real aiohttp client and server stacks but no external latency. The
+results can be saved as a named baseline in benchmarks/baselines, and later runs compared against it: the cases that are
+slower than the baseline by more than the threshold are reported as regressions and make the script exit with status 1.
+
+Usage: python benchmarks/bench_suite.py [--sizes N ...] [--cases NAME ...] [--save NAME] [--compare NAME]
+                                        [--threshold F]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homepluscontrol.authentication import HomePlusOAuth2Async  # noqa: E402
+from homepluscontrol.homeplusapi import HomePlusControlAPI  # noqa: E402
+from homepluscontrol.homeplusfakeserver import HomePlusFakeServer  # noqa: E402
+from homepluscontrol.homeplusplant import HomePlusPlant  # noqa: E402
+from homepluscontrol.homeplussynthetic import generate_home_data, generate_module_status  # noqa: E402
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+DEFAULT_THRESHOLD = 0.10
+# Fraction of the modules whose state changes between two status refreshes in the refresh cycle case
+CHANGE_RATE = 0.05
+
+CASES = {}
+
+
+def case(name, sized=True):
+    """Register a benchmark case.
+
+    The decorated function receives the number of modules per home and the benchmark environment and returns the
+    function to be timed. Cases that are not sized are only timed once, on the smallest home.
+    """
+
+    def register(func):
+        CASES[name] = (func, sized)
+        return func
+
+    return register
+
+
+class FakeServerAPI(HomePlusControlAPI):
+    """API that gets its access tokens from the fake server."""
+
+    def __init__(self, auth, **kwargs):
+        super().__init__(oauth_client=auth.oauth_client, **kwargs)
+        self.auth = auth
+
+    async def async_get_access_token(self):
+        return await self.auth.async_get_access_token()
+
+
+class Environment:
+    """Event loop and fake servers shared by the cases, with one server per home size."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        # The client sessions are bound to the current event loop when they are created
+        asyncio.set_event_loop(self.loop)
+        self._servers = {}
+        self._sessions = []
+
+    def run(self, coroutine):
+        """Run a coroutine to completion, hiding what the library prints to the standard output."""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.loop.run_until_complete(coroutine)
+
+    def server(self, size):
+        """Return the started fake server of a home of `size` modules."""
+        if size not in self._servers:
+            server = HomePlusFakeServer(modules_per_home=size, change_rate=CHANGE_RATE)
+            self.run(server.start())
+            self._servers[size] = server
+        return self._servers[size]
+
+    def auth(self, size):
+        """Return an authentication client of the fake server of a home of `size` modules."""
+        session = self.server(size).client_session()
+        self._sessions.append(session)
+        return HomePlusOAuth2Async("client_id", "client_secret", oauth_client=session)
+
+    def api(self, size):
+        """Return an API client that refreshes the home data on every call, with its home already loaded."""
+        api = FakeServerAPI(self.auth(size), update_interval=-1)
+        self.run(api.async_get_modules())
+        return api
+
+    def close(self):
+        for session in self._sessions:
+            self.run(session.close())
+        for server in self._servers.values():
+            self.run(server.stop())
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+
+@case("parse_home_data")
+def bench_parse_home_data(size, env):
+    home = generate_home_data(size)
+    return lambda: HomePlusPlant(home["id"], home, None)
+
+
+@case("parse_module_status")
+def bench_parse_module_status(size, env):
+    home = generate_home_data(size)
+    plant = HomePlusPlant(home["id"], home, None)
+    # Alternate between two status payloads, so that every call applies changes to the modules
+    statuses = [generate_module_status(home, seed)["body"]["home"]["modules"] for seed in (0, 1)]
+    calls = iter(range(sys.maxsize))
+    return lambda: plant._parse_module_status(statuses[next(calls) % 2])
+
+
+@case("update_modules")
+def bench_update_modules(size, env):
+    api = env.api(size)
+    return api._update_modules
+
+
+@case("handle_home_data")
+def bench_handle_home_data(size, env):
+    api = env.api(size)
+    return lambda: env.run(api.async_handle_home_data())
+
+
+@case("token", sized=False)
+def bench_token(size, env):
+    auth = env.auth(size)
+    return lambda: env.run(auth._async_refresh_token(auth.token))
+
+
+@case("set_state", sized=False)
+def bench_set_state(size, env):
+    api = env.api(size)
+    plug = next(module for module in api._modules.values() if module.device == "plug")
+    calls = iter(range(sys.maxsize))
+    return lambda: env.run(plug.turn_on() if next(calls) % 2 else plug.turn_off())
+
+
+def bench(func):
+    """Return the best time per call in seconds, calibrating the number of calls to run for at least 0.2 seconds."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(number=number, repeat=3)) / number
+
+
+def run(sizes, cases):
+    """Run the cases on homes of every size and return the best time per call, keyed by `case[size]`."""
+    env = Environment()
+    results = {}
+    try:
+        for name in cases:
+            func, sized = CASES[name]
+            for size in sizes if sized else sizes[:1]:
+                key = f"{name}[{size}]"
+                results[key] = bench(func(size, env))
+                print(f"{key:<36}{results[key] * 1000:>14.4f}ms", flush=True)
+    finally:
+        env.close()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the comparison of the results with a baseline and return the keys of the regressions."""
+    regressions = []
+    print(f"\n{'case':<36}{'baseline':>14}{'current':>14}{'change':>10}")
+    for key, current in results.items():
+        previous = baseline["results"].get(key)
+        if previous is None:
+            print(f"{key:<36}{'-':>14}{current * 1000:>12.4f}ms{'new':>10}")
+            continue
+        change = current / previous - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<36}{previous * 1000:>12.4f}ms{current * 1000:>12.4f}ms{change:>+10.1%}{flag}")
+    return regressions
+
+
+def baseline_path(name):
+    return os.path.join(BASELINES_DIR, f"{name}.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="modules per home")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES), help="cases to run")
+    parser.add_argument("--save", metavar="NAME", help="save the results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare the results with a baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="slowdown reported as regression")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(baseline_path(args.compare)) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"Comparing with baseline {args.compare} ({baseline['python']} on {baseline['machine']})")
+
+    results = run(sorted(args.sizes), args.cases)
+
+    if args.save:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        with open(baseline_path(args.save), "w") as baseline_file:
+            json.dump(
+                {"python": platform.python_version(), "machine": platform.machine(), "results": results},
+                baseline_file,
+                indent=2,
+                sort_keys=True,
+            )
+            baseline_file.write("\n")
+    if baseline is not None and compare(results, baseline, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,9 +9,11 @@ import jwt
 from aiohttp import ClientSession
 from yarl import URL
 
+from .homepluscodec import get_codec
+
 
 class AbstractHomePlusOAuth2Async(ABC):
-    def __init__(self, oauth_client=None):
+    def __init__(self, oauth_client=None, json_codec=None):
         """AbstractHomePlusOAuth2Async Constructor.
 
         Base class to handle the OAuth2 authentication flow and HTTP
@@ -26,11 +28,17 @@ class AbstractHomePlusOAuth2Async(ABC):
             oauth_client (:obj:`ClientSession`): aiohttp ClientSession object
                                                  that handles HTTP async
                                                  requests
+            json_codec (HomePlusJsonCodec, optional): JSON codec used for
+                                                      the request and
+                                                      response bodies.
+                                                      Defaults to the
+                                                      fastest installed one.
         """
         if oauth_client is None:
             self.oauth_client = ClientSession()
         else:
             self.oauth_client = oauth_client
+        self.json_codec = get_codec() if json_codec is None else json_codec
 
     @abstractmethod
     async def async_get_access_token(self) -> str:
@@ -120,11 +128,29 @@ class AbstractHomePlusOAuth2Async(ABC):
         if data is not None:
             kwargs["data"] = data
         elif json is not None:
-            kwargs["json"] = json
+            kwargs["data"] = self.json_codec.dumps(json)
+            kwargs["headers"] = {
+                **kwargs.get("headers", {}),
+                "Content-Type": "application/json",
+            }
         r = await self.request("post", url, **kwargs)
         r.raise_for_status()
         return r
 
+    async def response_json(self, response):
+        """Decodes the JSON body of a response with the configured codec.
+
+        The body is decoded directly from the raw bytes, without any
+        intermediate text decoding or content type checks.
+
+        Args:
+            response (ClientResponse): aiohttp response object
+
+        Returns:
+            Decoded JSON body of the response
+        """
+        return self.json_codec.loads(await response.read())
+
 
 class HomePlusOAuth2Async(AbstractHomePlusOAuth2Async):
     """Handles authentication with OAuth2 - Uses aiohttp for asynchronous
@@ -162,6 +188,7 @@ class HomePlusOAuth2Async(AbstractHomePlusOAuth2Async):
         redirect_uri=None,
         token_updater=None,
         oauth_client=None,
+        json_codec=None,
     ):
         """HomePlusOAuth2Async Constructor.
 
@@ -183,9 +210,15 @@ class HomePlusOAuth2Async(AbstractHomePlusOAuth2Async):
                                           handles asynchronous HTTP requests.
                                           If not specified, a new one is
                                           created. Defaults to None.
+            json_codec (HomePlusJsonCodec, optional): JSON codec used for
+                                                      the request and
+                                                      response bodies.
+                                                      Defaults to the
+                                                      fastest installed one.
         """
         super().__init__(
             oauth_client=oauth_client,
+            json_codec=json_codec,
         )
         self.client_id = client_id
         self.client_secret = client_secret
@@ -317,7 +350,7 @@ class HomePlusOAuth2Async(AbstractHomePlusOAuth2Async):
         resp = await self.oauth_client.post(HomePlusOAuth2Async.TOKEN_URL, data=data)
         resp.raise_for_status()
 
-        self.token = cast(dict, await resp.json())
+        self.token = cast(dict, await self.response_json(resp))
         if self.token_updater is not None:
             await self.token_updater(self.token)
 
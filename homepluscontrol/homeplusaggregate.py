@@ -0,0 +1,171 @@
+class HomePlusPowerAggregate:
+    """Running aggregate of the power consumption of a group of modules.
+
+    Attributes:
+        power (int): Total power consumption of the modules in watts.
+        on (int): Number of modules that are on.
+        modules (int): Number of modules in the group.
+    """
+
+    __slots__ = ("power", "on", "modules", "_max_power", "_power_counts")
+
+    def __init__(self):
+        """HomePlusPowerAggregate Constructor"""
+        self.power = 0
+        self.on = 0
+        self.modules = 0
+        self._max_power = 0
+        # Number of modules of the group per power value, to maintain the maximum when a module's power drops
+        self._power_counts = {}
+
+    def __repr__(self):
+        """Return the string representing this aggregate"""
+        return (
+            f"HomePlusPowerAggregate(power={self.power}, on={self.on}, modules={self.modules}, "
+            f"max_power={self._max_power})"
+        )
+
+    @property
+    def max_power(self):
+        """Return the maximum power consumption of a module of the group in watts."""
+        return self._max_power
+
+    def _add(self, power, on):
+        """Add the contribution of a module to the aggregate."""
+        self.power += power
+        self.on += on
+        self.modules += 1
+        counts = self._power_counts
+        counts[power] = counts.get(power, 0) + 1
+        if power > self._max_power:
+            self._max_power = power
+
+    def _subtract(self, power, on):
+        """Subtract the contribution of a module from the aggregate."""
+        self.power -= power
+        self.on -= on
+        self.modules -= 1
+        counts = self._power_counts
+        count = counts[power] - 1
+        if count:
+            counts[power] = count
+        else:
+            del counts[power]
+            # Only the departure of the last module at the maximum requires a scan of the distinct power values
+            if power == self._max_power:
+                self._max_power = max(counts, default=0)
+
+
+class HomePlusPowerAggregates:
+    """Running power aggregates of the modules of a fleet of homes, per home, per bridge and per device type.
+
+    Every registered module contributes its power consumption and on/off status to the aggregate of its home, of its
+    bridge, of its device type and of the whole fleet. The contributions are updated from the deltas of the module
+    state every time it changes, so updates and reads take constant time regardless of the number of modules.
+
+    The aggregate returned for a group is updated in place for as long as the group has modules.
+    """
+
+    def __init__(self):
+        """HomePlusPowerAggregates Constructor"""
+        self._fleet = HomePlusPowerAggregate()
+        self._groups = {}
+        # Registered module, group keys, power and on/off status per module identifier
+        self._contributions = {}
+
+    def __len__(self):
+        """Return the number of modules registered in the aggregates"""
+        return len(self._contributions)
+
+    def fleet(self):
+        """Return the aggregate of all the registered modules."""
+        return self._fleet
+
+    def home(self, home_id):
+        """Return the aggregate of the modules of a home."""
+        return self._group(("home", home_id))
+
+    def bridge(self, bridge):
+        """Return the aggregate of the modules controlled by a bridge."""
+        return self._group(("bridge", bridge))
+
+    def device(self, device):
+        """Return the aggregate of the modules of a device type (plug, light, remote, automation...)."""
+        return self._group(("device", device))
+
+    def add(self, module):
+        """Register a module and add its current state to the aggregates, replacing any module with the same
+        identifier.
+
+        Args:
+            module (HomePlusModule): Module to be registered.
+        """
+        if module.id in self._contributions:
+            self._remove(module.id)
+        self._contribute(module, self._module_keys(module), *_module_power(module))
+
+    def update(self, module):
+        """Update the aggregates with the current state of a module.
+
+        Modules that are not registered are ignored.
+
+        Args:
+            module (HomePlusModule): Module whose state, or bridge, may have changed.
+        """
+        contribution = self._contributions.get(module.id)
+        if contribution is None or contribution[0] is not module:
+            return
+        keys = self._module_keys(module)
+        power, on = _module_power(module)
+        if contribution[1:] == (keys, power, on):
+            return
+        self._remove(module.id)
+        self._contribute(module, keys, power, on)
+
+    def remove(self, module):
+        """Remove a module and its contribution from the aggregates.
+
+        Args:
+            module (HomePlusModule): Module to be removed.
+        """
+        contribution = self._contributions.get(module.id)
+        if contribution is not None and contribution[0] is module:
+            self._remove(module.id)
+
+    @staticmethod
+    def _module_keys(module):
+        """Return the keys of the groups that a module contributes to."""
+        home_id = module.plant.id if module.plant is not None else None
+        return (("home", home_id), ("bridge", module.bridge), ("device", module.device))
+
+    def _group(self, key):
+        """Return the aggregate of a group, or an empty one if the group has no modules."""
+        aggregate = self._groups.get(key)
+        return aggregate if aggregate is not None else HomePlusPowerAggregate()
+
+    def _contribute(self, module, keys, power, on):
+        """Add the contribution of a module to the fleet and to its groups."""
+        self._contributions[module.id] = (module, keys, power, on)
+        self._fleet._add(power, on)
+        groups = self._groups
+        for key in keys:
+            aggregate = groups.get(key)
+            if aggregate is None:
+                aggregate = groups[key] = HomePlusPowerAggregate()
+            aggregate._add(power, on)
+
+    def _remove(self, module_id):
+        """Subtract the contribution of a module from the fleet and from its groups."""
+        _, keys, power, on = self._contributions.pop(module_id)
+        self._fleet._subtract(power, on)
+        groups = self._groups
+        for key in keys:
+            aggregate = groups[key]
+            aggregate._subtract(power, on)
+            if not aggregate.modules:
+                del groups[key]
+
+
+def _module_power(module):
+    """Return the power consumption and on/off status (1 or 0) of a module, which are 0 if they do not apply to it."""
+    return getattr(module, "power", 0) or 0, int(getattr(module, "status", None) == "on")
@@ -4,8 +4,15 @@ import logging
 import time
 
 from .authentication import AbstractHomePlusOAuth2Async
+from .homeplusaggregate import HomePlusPowerAggregates
 from .homeplusconst import HOMES_DATA_URL
+from .homepluseventbus import DEFAULT_WATCH_QUEUE_SIZE, HomePlusEventBus
+from .homeplusindex import HomePlusModuleIndex
+from .homeplusintern import HomePlusInternTable
+from .homeplusmeasure import HomePlusMeasureClient, HomePlusMeasureError
 from .homeplusplant import HomePlusPlant
+from .homeplussnapshot import HomePlusSnapshotError, read_snapshot, write_snapshot
+from .homeplustombstone import HomePlusTombstoneQueue
 
 # The Netatmo Connect Home+ Control API has increased number of request quotas when compared to
 # the Legrand platform. At the time of writing, the quota is 2000 calls per hour or 200 requests every 10 secs
@@ -33,26 +40,101 @@ class HomePlusControlAPI(AbstractHomePlusOAuth2Async):
         oauth_client (:obj:`ClientSession`): aiohttp ClientSession object that handles HTTP async requests
         _homes (dict): Dictionary containing the information of all homes.
         _modules (dict): Dictionary containing the information of all modules in the homes.
-        _modules_to_remove (dict): Dictionary containing the information of modules that are no longer in the homes' topology.
+        module_index (HomePlusModuleIndex): Index of all modules in the homes, with secondary indexes by device type,
+                                            bridge, home and reachability.
+        tombstones (HomePlusTombstoneQueue): Bounded queue of the modules that are no longer in the homes' topology,
+                                             until the consumers acknowledge them.
+        _modules_to_remove (HomePlusTombstoneQueue): Alias of `tombstones`, kept for backwards compatibility.
         _refresh_interval (int): Configured update interval for home and module status information (in seconds).
+        _scheduler (HomePlusRefreshScheduler): Optional scheduler that drives the module status refreshes of the homes.
+        event_bus (HomePlusEventBus): Event bus where the changes in the state of the modules of all homes are published.
+        state_store (HomePlusStateStore): Optional column-oriented store of the state of the modules of all homes.
+        rollup_engine (HomePlusRollupEngine): Optional engine that maintains the power rollups of the modules of all
+                                              homes.
+        journal (HomePlusJournal): Optional journal of the changes in the state of the modules of all homes.
+        history_store (HomePlusHistoryStore): Optional SQLite store of the changes in the state of the modules of all
+                                              homes, fed by the event bus.
+        sample_writer (HomePlusSampleWriter): Optional writer of fixed-width samples of the state of the modules of all
+                                              homes, fed by the event bus.
+        intern_table (HomePlusInternTable): Bounded table that shares the instances of the strings repeated in the
+                                            payloads of all homes.
+        power_aggregates (HomePlusPowerAggregates): Running power aggregates of the modules of all homes, per home,
+                                                    bridge and device type.
+        measure_client (HomePlusMeasureClient): Client of the historical energy measurements of the modules.
     """
 
-    def __init__(self, oauth_client=None, update_interval=DEFAULT_UPDATE_INTERVAL):
+    def __init__(
+        self,
+        oauth_client=None,
+        update_interval=DEFAULT_UPDATE_INTERVAL,
+        scheduler=None,
+        json_codec=None,
+        state_store=None,
+        retention_policy=None,
+        tombstones=None,
+        power_history_size=None,
+        rollup_engine=None,
+        journal=None,
+        history_store=None,
+        sample_writer=None,
+    ):
         """HomePlusControlAPI Constructor
 
         Args:
             oauth_client (:obj:`ClientSession`): aiohttp ClientSession object that handles HTTP async requests
             update_interval (int): Optional refresh interval for the home data in seconds
+            scheduler (HomePlusRefreshScheduler): Optional scheduler, possibly shared with other API instances, that
+                                                  takes over the periodic refresh of the module status of the homes.
+                                                  If absent, the module status of every home is refreshed together
+                                                  with the home data.
+            json_codec (HomePlusJsonCodec): Optional JSON codec for the request and response bodies. Defaults to the
+                                            fastest installed one.
+            state_store (HomePlusStateStore): Optional column-oriented store, possibly shared with other API instances,
+                                              where the state of the modules is written for fleet-wide aggregates.
+            retention_policy (HomePlusRetentionPolicy): Optional policy that decides which parts of the payloads the
+                                                        homes retain after parsing them. Defaults to retaining the
+                                                        complete home data and the decoded module status.
+            tombstones (HomePlusTombstoneQueue): Optional queue of the removed modules, to configure its size and TTL.
+            power_history_size (int): Optional number of power samples kept in a ring buffer per interactive module.
+                                      If absent, no power history is kept.
+            rollup_engine (HomePlusRollupEngine): Optional engine, possibly shared with other API instances, that
+                                                  maintains the multi-resolution power rollups of the modules, homes
+                                                  and device types.
+            journal (HomePlusJournal): Optional journal, possibly shared with other API instances, where the changes in
+                                       the state of the modules are appended.
+            history_store (HomePlusHistoryStore): Optional SQLite store, possibly shared with other API instances,
+                                                  where the changes in the state of the modules are persisted.
+            sample_writer (HomePlusSampleWriter): Optional writer where a sample of the state of every module is
+                                                  appended when the module changes.
         """
         super().__init__(
             oauth_client=oauth_client,
+            json_codec=json_codec,
         )
         self._homes = {}
-        self._modules = {}
-        self._modules_to_remove = {}
+        self.module_index = HomePlusModuleIndex()
+        self._modules = self.module_index.modules
+        self.tombstones = tombstones if tombstones is not None else HomePlusTombstoneQueue()
+        self._modules_to_remove = self.tombstones
         self._last_check = time.monotonic()
         # Set the update interval
         self._refresh_interval = update_interval
+        self._scheduler = scheduler
+        self.event_bus = HomePlusEventBus()
+        self.state_store = state_store
+        self.intern_table = HomePlusInternTable()
+        self.power_aggregates = HomePlusPowerAggregates()
+        self.measure_client = HomePlusMeasureClient(self)
+        self._retention_policy = retention_policy
+        self._power_history_size = power_history_size
+        self.rollup_engine = rollup_engine
+        self.journal = journal
+        self.history_store = history_store
+        if history_store is not None:
+            history_store.attach(self.event_bus)
+        self.sample_writer = sample_writer
+        if sample_writer is not None:
+            sample_writer.attach(self.event_bus, self._modules)
 
     @property
     def logger(self):
@@ -84,7 +166,7 @@ class HomePlusControlAPI(AbstractHomePlusOAuth2Async):
         if not self._homes or self._should_check():
             try:
                 result = await self.get_request(HOMES_DATA_URL)  # Call the API
-                response_body = await result.json()
+                response_body = await self.response_json(result)
                 homes_info = response_body["body"]
             except aiohttp.ClientError as err:
                 raise HomePlusControlApiError("Error retrieving homes information") from err
@@ -115,9 +197,13 @@ class HomePlusControlAPI(AbstractHomePlusOAuth2Async):
                 cur_home.country = home["country"]
                 if cur_home.oauth_client is None:
                     cur_home.oauth_client = self
+                if self._scheduler is not None:
+                    # The scheduler takes care of the module status of the homes that it already knows about
+                    await cur_home.update_home_data(input_home_data=home)
+                    continue
             else:
                 self.logger.debug("New home with id %s detected.", home["id"])
-                self._homes[home["id"]] = HomePlusPlant(home["id"], home, self)
+                self._create_home(home)
 
             # Update the module status information in the home - this makes an API call
             await self._homes[home["id"]].update_home_data_and_modules(input_home_data=home)
@@ -127,10 +213,212 @@ class HomePlusControlAPI(AbstractHomePlusOAuth2Async):
 
         for home_id in homes_to_pop:
             self.logger.debug("Home with id %s is no longer present, so remove from cache.", home_id)
-            self._homes.pop(home_id, None)
+            removed_home = self._homes.pop(home_id, None)
+            if self._scheduler is not None and removed_home is not None:
+                self._scheduler.remove_plant(removed_home)
+            if removed_home is not None:
+                removed_home._detach_modules()
 
         return self._homes
 
+    def save_snapshot(self, path):
+        """Atomically save the homes, their modules and the last known status of the modules to a file.
+
+        Args:
+            path (str): Path of the snapshot file.
+        """
+        write_snapshot(path, self._homes.values(), self.json_codec)
+
+    def load_snapshot(self, path):
+        """Load the homes and modules saved in a snapshot file, so that the last known state is served straight away.
+
+        Homes that are already known are not replaced. The loaded homes are considered up to date until the next
+        refresh interval, after which they are refreshed from the API as usual, and the scheduler, if any, starts
+        refreshing their module status in the background right away.
+
+        Args:
+            path (str): Path of the snapshot file.
+
+        Returns:
+            int: Number of homes loaded.
+
+        Raises:
+            HomePlusControlApiError: If the snapshot cannot be loaded.
+        """
+        try:
+            snapshot = read_snapshot(path, self.json_codec)
+        except HomePlusSnapshotError as err:
+            raise HomePlusControlApiError("Error loading snapshot") from err
+        loaded = 0
+        for home_snapshot in snapshot["homes"]:
+            home_data = home_snapshot["home_data"]
+            if home_data["id"] in self._homes:
+                continue
+            self._create_home(home_data)._parse_module_status(home_snapshot["module_status"])
+            loaded += 1
+        self._last_check = time.monotonic()
+        self.logger.debug("Loaded %d homes from snapshot %s saved at %s", loaded, path, snapshot["saved_at"])
+        return loaded
+
+    def watch(self, home_id=None, module_id=None, device=None, fields=None, maxsize=DEFAULT_WATCH_QUEUE_SIZE):
+        """Return an asynchronous iterator over the changes in the state of the modules.
+
+        Usage: `async for change in api.watch(device="plug", fields=["power"]): ...`
+
+        Args:
+            home_id (str, optional): Only publish the changes of the modules of this home.
+            module_id (str, optional): Only publish the changes of this module.
+            device (str, optional): Only publish the changes of this type of device.
+            fields (iterable, optional): Only publish the changes that involve at least one of these fields.
+            maxsize (int, optional): Maximum number of changes buffered by the watcher.
+
+        Returns:
+            HomePlusEventWatcher: Watcher that has to be closed when no longer used.
+        """
+        return self.event_bus.watch(home_id, module_id, device, fields, maxsize)
+
+    def get_power_aggregate(self, home_id=None, bridge=None, device=None):
+        """Return the running power aggregate of the modules of a home, of a bridge or of a device type.
+
+        Args:
+            home_id (str, optional): Unique identifier of the home.
+            bridge (str, optional): Unique identifier of the bridge.
+            device (str, optional): Type of the device (plug, light, remote, automation...).
+
+        Returns:
+            HomePlusPowerAggregate: Total power, number of modules that are on and maximum power of the group, or of
+                                    all the modules if no group is given.
+
+        Raises:
+            HomePlusControlApiError: If more than one group is given.
+        """
+        groups = [
+            (self.power_aggregates.home, home_id),
+            (self.power_aggregates.bridge, bridge),
+            (self.power_aggregates.device, device),
+        ]
+        groups = [(getter, key) for getter, key in groups if key is not None]
+        if len(groups) > 1:
+            raise HomePlusControlApiError("Power aggregates are maintained per home, bridge or device type only")
+        if not groups:
+            return self.power_aggregates.fleet()
+        getter, key = groups[0]
+        return getter(key)
+
+    async def async_get_energy_measures(self, module_id, start, end=None):
+        """Retrieve the historical energy consumption of a module.
+
+        Completed intervals are cached by the `measure_client`, so only the intervals that were still open are
+        requested again in subsequent calls.
+
+        Args:
+            module_id (str): Unique identifier of the module.
+            start (float): Start of the time range in seconds since the epoch.
+            end (float, optional): End of the time range in seconds since the epoch. Defaults to now.
+
+        Returns:
+            list: List of (interval start, energy) tuples in chronological order.
+
+        Raises:
+            HomePlusControlApiError: If the module is unknown or its measurements could not be retrieved.
+        """
+        module = self._modules.get(module_id)
+        if module is None:
+            raise HomePlusControlApiError(f"Unknown module {module_id}")
+        try:
+            return await self.measure_client.get_measures(module, start, end)
+        except HomePlusMeasureError as err:
+            raise HomePlusControlApiError("Error retrieving energy measurements") from err
+
+    def get_removed_modules(self):
+        """Return the modules that are no longer in the homes' topology and have not been acknowledged yet.
+
+        Returns:
+            list: List of removed modules, oldest first.
+        """
+        return self.tombstones.pending()
+
+    def ack_removed_modules(self, *module_ids):
+        """Acknowledge that the consumer has cleaned up after removed modules, so their tombstones can be dropped.
+
+        Args:
+            *module_ids (str): Unique identifiers of the removed modules.
+
+        Returns:
+            int: Number of tombstones that were acknowledged.
+        """
+        return self.tombstones.ack(*module_ids)
+
+    def subscribe(self, home_id=None, module_id=None):
+        """Register interest in a home or in a module so that its status is polled at the regular interval.
+
+        Homes without registered interest are only polled at the background cadence of the scheduler.
+        Interest is reference-counted, so every call must be balanced by a call to `unsubscribe()`.
+
+        Args:
+            home_id (str, optional): Unique identifier of the home of interest.
+            module_id (str, optional): Unique identifier of the module of interest. If the home is not specified, it
+                                       is derived from the module.
+
+        Raises:
+            HomePlusControlApiError: If there is no scheduler or the home/module is unknown.
+        """
+        self._get_scheduler().subscribe(self._get_interest_home(home_id, module_id), module_id)
+
+    def unsubscribe(self, home_id=None, module_id=None):
+        """Release interest in a home or in a module that was registered with `subscribe()`.
+
+        Args:
+            home_id (str, optional): Unique identifier of the home of interest.
+            module_id (str, optional): Unique identifier of the module of interest. If the home is not specified, it
+                                       is derived from the module.
+
+        Raises:
+            HomePlusControlApiError: If there is no scheduler or the home/module is unknown.
+        """
+        self._get_scheduler().unsubscribe(self._get_interest_home(home_id, module_id), module_id)
+
+    def _create_home(self, home):
+        """Create the object of a new home and register it in the scheduler, if any.
+
+        Args:
+            home (dict): Dictionary representing the JSON structure of the home as returned by the API.
+
+        Returns:
+            HomePlusPlant: New home.
+        """
+        plant = self._homes[home["id"]] = HomePlusPlant(
+            self.intern_table(home["id"]),
+            home,
+            self,
+            event_bus=self.event_bus,
+            state_store=self.state_store,
+            intern_table=self.intern_table,
+            retention_policy=self._retention_policy,
+            module_index=self.module_index,
+            power_aggregates=self.power_aggregates,
+            power_history_size=self._power_history_size,
+            rollup_engine=self.rollup_engine,
+            journal=self.journal,
+        )
+        if self._scheduler is not None:
+            self._scheduler.add_plant(plant)
+        return plant
+
+    def _get_scheduler(self):
+        """Return the refresh scheduler, which is required for interest registration."""
+        if self._scheduler is None:
+            raise HomePlusControlApiError("Interest registration requires a refresh scheduler")
+        return self._scheduler
+
+    def _get_interest_home(self, home_id, module_id):
+        """Return the home object that an interest registration refers to."""
+        if home_id is None and module_id in self._modules:
+            return self._modules[module_id].plant
+        if home_id in self._homes:
+            return self._homes[home_id]
+        raise HomePlusControlApiError(f"Unknown home {home_id} or module {module_id}")
+
     def _should_check(self):
         """Return True if the current monotonic time is > the last check time plus a fixed period.
 
@@ -152,24 +440,17 @@ class HomePlusControlAPI(AbstractHomePlusOAuth2Async):
     def _update_modules(self):
         """Update the modules based on the collected information in the home object.
 
+        The module index is maintained incrementally by the homes, so this only has to add a tombstone for each module
+        that has been removed from the homes' topology since the last call, and to drop the tombstones of the modules
+        that are back.
+
         Returns:
             dict: Dictionary of modules across all of the homes.
         """
-        for home in self._homes.values():
-            current_module_ids = set()
-            for module in list(home.modules.values()):
-                current_module_ids.add(module.id)
-                if module.id not in self._modules:
-                    self.logger.debug(
-                        "Registering Home+ Control module in internal map: %s.",
-                        str(module),
-                    )
-                    self._modules[module.id] = module
-
-            # Discard modules that may have disappeared from the topology
-            modules_to_pop = set(self._modules) - current_module_ids
-
-            for module in modules_to_pop:
-                self._modules_to_remove[module] = self._modules.pop(module)
+        for module in self.module_index.drain_removed():
+            self.tombstones.add(module)
+        for module_id in self.tombstones:
+            if module_id in self._modules:
+                self.tombstones.discard(module_id)
 
         return self._modules
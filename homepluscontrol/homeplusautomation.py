@@ -13,6 +13,8 @@ class HomePlusAutomation(HomePlusModule):
         level (int): The automation's position level (as an integer value from 0 to 100).
     """
 
+    __slots__ = ("level",)
+
     OPEN_FULL = 100
     """Level value that represents a fully open cover."""
 
@@ -53,14 +55,14 @@ class HomePlusAutomation(HomePlusModule):
         }
         return state_param
 
-    def update_state(self, module_data):
-        """Update the internal state of the module from the input JSON data.
+    def _update_state(self, module_status):
+        """Update the internal state of the module from its decoded status.
 
         Args:
-            module_data (json): JSON data of the module state
+            module_status (HomePlusModuleStatus): Decoded status of the module
         """
-        super().update_state(module_data)
-        self.level = module_data["current_position"]
+        super()._update_state(module_status)
+        self.level = module_status.current_position
 
     async def open(self):
         """Open the automation module.
@@ -90,6 +92,7 @@ class HomePlusAutomation(HomePlusModule):
         if await self.post_status_update(desired_level):
             if desired_level != HomePlusAutomation.STOP_MOTION:
                 self.level = desired_level  # Not being stopped, so assume final level is the requested level
+                self._store_state()
             else:
                 await self.get_status_update()  # Stop command issued - need to read the final level
 
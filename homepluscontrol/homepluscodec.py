@@ -0,0 +1,73 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+class HomePlusJsonCodec:
+    """JSON codec used to decode the response bodies and encode the request bodies of the API.
+
+    Attributes:
+        name (str): Name of the codec (orjson, ujson or json).
+    """
+
+    def __init__(self, name, loads, dumps):
+        """HomePlusJsonCodec Constructor
+
+        Args:
+            name (str): Name of the codec.
+            loads (function): Function that decodes a JSON document from bytes or str.
+            dumps (function): Function that encodes an object into a JSON document as bytes.
+        """
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self):
+        """Return the string representing this codec"""
+        return f"HomePlusJsonCodec({self.name})"
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _ujson_dumps(obj):
+    return ujson.dumps(obj).encode()
+
+
+""" JSON codecs in order of preference, keyed by name. Only those whose library is installed are present. """
+CODECS = {}
+if orjson is not None:
+    CODECS["orjson"] = HomePlusJsonCodec("orjson", orjson.loads, orjson.dumps)
+if ujson is not None:
+    CODECS["ujson"] = HomePlusJsonCodec("ujson", ujson.loads, _ujson_dumps)
+CODECS["json"] = HomePlusJsonCodec("json", json.loads, _stdlib_dumps)
+
+
+def get_codec(name=None):
+    """Return a JSON codec.
+
+    Args:
+        name (str, optional): Name of the codec (orjson, ujson or json). Defaults to None, which selects the fastest
+                              codec that is installed.
+
+    Returns:
+        HomePlusJsonCodec: The requested codec.
+
+    Raises:
+        ValueError: If the requested codec is not available.
+    """
+    if name is None:
+        return next(iter(CODECS.values()))
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"JSON codec {name} is not available") from None
@@ -5,6 +5,9 @@ HOMES_STATUS_URL = "https://api.netatmo.com/api/homestatus"
 """ API endpoint to set the stat of the module. """
 SET_STATE_URL = "https://api.netatmo.com/api/setstate"
 
+""" API endpoint for the historical measurements of the modules. """
+GET_MEASURE_URL = "https://api.netatmo.com/api/getmeasure"
+
 """ Legrand/Netatmo product types """
 PRODUCT_TYPES = {
     "NLG": "gateway",
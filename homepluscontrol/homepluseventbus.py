@@ -0,0 +1,182 @@
+"""Event bus that publishes the changes in the state of the modules of the homes.
+
+Only the changes of the module attributes listed in `TRACKED_FIELDS` are published in the event bus.
+"""
+import asyncio
+import collections
+import logging
+
+DEFAULT_WATCH_QUEUE_SIZE = 1000
+
+TRACKED_FIELDS = ("status", "power", "reachable", "level", "battery")
+
+HomePlusModuleChange = collections.namedtuple(
+    "HomePlusModuleChange", ["home_id", "module_id", "device", "changes", "timestamp"]
+)
+HomePlusModuleChange.__doc__ = """Change in the state of a module.
+
+Attributes:
+    home_id (str): Unique identifier of the home of the module.
+    module_id (str): Unique identifier of the module.
+    device (str): Type of the device (plug, light, remote, automation).
+    changes (dict): Dictionary of (old value, new value) tuples keyed by the name of the fields that changed.
+    timestamp (float): Time of the change (seconds since the epoch).
+"""
+
+
+class _EventFilter:
+    """Filter of module changes by home, module, device type and changed fields."""
+
+    __slots__ = ("home_id", "module_id", "device", "fields")
+
+    def __init__(self, home_id=None, module_id=None, device=None, fields=None):
+        self.home_id = home_id
+        self.module_id = module_id
+        self.device = device
+        self.fields = None if fields is None else frozenset(fields)
+
+    def matches(self, event):
+        """Return True if the module change passes the filter."""
+        if self.home_id is not None and event.home_id != self.home_id:
+            return False
+        if self.module_id is not None and event.module_id != self.module_id:
+            return False
+        if self.device is not None and event.device != self.device:
+            return False
+        return self.fields is None or not self.fields.isdisjoint(event.changes)
+
+
+class HomePlusEventWatcher:
+    """Asynchronous iterator over the module changes published in an event bus.
+
+    Changes are buffered in a bounded queue. The publisher never waits for a slow consumer: when the queue is full, the
+    oldest change is discarded to make room for the new one and the `dropped` counter is increased.
+
+    Attributes:
+        dropped (int): Number of changes that were discarded because the queue was full.
+    """
+
+    def __init__(self, bus, event_filter, maxsize=DEFAULT_WATCH_QUEUE_SIZE):
+        """HomePlusEventWatcher Constructor
+
+        Args:
+            bus (HomePlusEventBus): Event bus that the watcher is attached to.
+            event_filter (_EventFilter): Filter of the changes that are of interest to the watcher.
+            maxsize (int): Maximum number of changes buffered by the watcher.
+        """
+        self.dropped = 0
+        self._bus = bus
+        self._filter = event_filter
+        self._queue = asyncio.Queue(maxsize)
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed and self._queue.empty():
+            raise StopAsyncIteration
+        event = await self._queue.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Detach the watcher from the event bus and end the iteration once the buffered changes are consumed."""
+        if self._closed:
+            return
+        self._closed = True
+        self._bus._watchers.remove(self)
+        self._put(None)
+
+    def _put(self, event):
+        """Buffer a change, discarding the oldest one if the queue is full."""
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+
+
+class HomePlusEventBus:
+    """Event bus that publishes the changes in the state of the modules of the homes.
+
+    Consumers can either register callbacks through `add_listener()` or iterate asynchronously over the changes with
+    `async for change in bus.watch(...)`. In both cases, the changes can be filtered by home, module, device type and
+    changed fields.
+    """
+
+    def __init__(self):
+        """HomePlusEventBus Constructor"""
+        self._listeners = []
+        self._watchers = []
+
+    @property
+    def logger(self):
+        """Return logger of the event bus."""
+        return logging.getLogger(__name__)
+
+    @property
+    def active(self):
+        """Return True if there is at least one listener or watcher attached to the bus."""
+        return bool(self._listeners or self._watchers)
+
+    def add_listener(self, callback, home_id=None, module_id=None, device=None, fields=None):
+        """Register a callback that is called synchronously with every matching module change.
+
+        Args:
+            callback (function): Function that receives a `HomePlusModuleChange` as its only argument.
+            home_id (str, optional): Only publish the changes of the modules of this home.
+            module_id (str, optional): Only publish the changes of this module.
+            device (str, optional): Only publish the changes of this type of device.
+            fields (iterable, optional): Only publish the changes that involve at least one of these fields.
+
+        Returns:
+            function: Function that removes the listener from the bus when called.
+        """
+        listener = (callback, _EventFilter(home_id, module_id, device, fields))
+        self._listeners.append(listener)
+
+        def remove_listener():
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return remove_listener
+
+    def watch(self, home_id=None, module_id=None, device=None, fields=None, maxsize=DEFAULT_WATCH_QUEUE_SIZE):
+        """Return an asynchronous iterator over the matching module changes.
+
+        Args:
+            home_id (str, optional): Only publish the changes of the modules of this home.
+            module_id (str, optional): Only publish the changes of this module.
+            device (str, optional): Only publish the changes of this type of device.
+            fields (iterable, optional): Only publish the changes that involve at least one of these fields.
+            maxsize (int, optional): Maximum number of changes buffered by the watcher.
+
+        Returns:
+            HomePlusEventWatcher: Watcher that has to be closed when no longer used.
+        """
+        watcher = HomePlusEventWatcher(self, _EventFilter(home_id, module_id, device, fields), maxsize)
+        self._watchers.append(watcher)
+        return watcher
+
+    def publish(self, event):
+        """Publish a module change to all the matching listeners and watchers.
+
+        Args:
+            event (HomePlusModuleChange): Module change to be published.
+        """
+        for callback, event_filter in list(self._listeners):
+            if event_filter.matches(event):
+                try:
+                    callback(event)
+                except Exception:
+                    self.logger.exception("Error in module change listener %s", callback)
+        for watcher in self._watchers:
+            if watcher._filter.matches(event):
+                watcher._put(event)
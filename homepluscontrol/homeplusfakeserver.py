@@ -0,0 +1,372 @@
+"""Local stand-in for the Netatmo API, for load and latency testing of the library against a real network stack.
+
+Usage: python -m homepluscontrol.homeplusfakeserver [--homes N] [--modules N] [--port N] [--latency S] [--error-rate F]
+"""
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import random
+import secrets
+import time
+
+import aiohttp
+from aiohttp import web
+
+from .homeplusconst import HOMES_DATA_URL
+from .homeplussynthetic import generate_homes_data, generate_module_status
+
+""" Origin of the real API, which is replaced by the URL of the fake server in the requests of `HomePlusFakeSession`. """
+API_ORIGIN = HOMES_DATA_URL[: HOMES_DATA_URL.index("/", len("https://"))]
+
+DEFAULT_TOKEN_LIFETIME = 10800
+DEFAULT_SHUTTER_SPEED = 20.0  # Percent of the course per second
+
+# Error codes returned by the API in the body of the failed requests
+_INVALID_TOKEN = 2
+_INTERNAL_ERROR = 6
+_INVALID_PARAMS = 21
+_USAGE_REACHED = 26
+
+
+class HomePlusFakeSession:
+    """Client session that sends the requests for the real API to a fake server instead.
+
+    It can be passed as the `oauth_client` of the API and authentication classes in place of an aiohttp
+    `ClientSession`: requests to the real API are redirected to the fake server, other requests are left untouched.
+    """
+
+    def __init__(self, server_url, session=None):
+        """HomePlusFakeSession Constructor
+
+        Args:
+            server_url (str): Base URL of the fake server.
+            session (ClientSession, optional): aiohttp session that sends the requests. If not specified, a new one is
+                                               created.
+        """
+        self.server_url = server_url.rstrip("/")
+        self.session = aiohttp.ClientSession() if session is None else session
+
+    @property
+    def closed(self):
+        """Return True if the underlying session is closed."""
+        return self.session.closed
+
+    def request(self, method, url, **kwargs):
+        """Send a request with the underlying session, redirecting it to the fake server if needed."""
+        return self.session.request(method, self._rewrite(url), **kwargs)
+
+    def get(self, url, **kwargs):
+        """Send a GET request with the underlying session, redirecting it to the fake server if needed."""
+        return self.request("get", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Send a POST request with the underlying session, redirecting it to the fake server if needed."""
+        return self.request("post", url, **kwargs)
+
+    async def close(self):
+        """Close the underlying session."""
+        await self.session.close()
+
+    def _rewrite(self, url):
+        """Return the URL of the fake server that stands in for a URL of the real API."""
+        url = str(url)
+        if url.startswith(API_ORIGIN):
+            return self.server_url + url[len(API_ORIGIN) :]
+        return url
+
+
+class HomePlusFakeServer:
+    """aiohttp server that simulates the `/oauth2/token`, `/api/homesdata`, `/api/homestatus` and `/api/setstate`
+    endpoints of the Netatmo API for a synthetic fleet of homes.
+
+    Every request waits for a simulated latency and then fails with a 500 error with probability `error_rate`. If a
+    quota is set, each access token can make at most `quota` requests per `quota_period` seconds and the requests
+    beyond it fail with a 429 error. Tokens expire after `token_lifetime` seconds.
+
+    The state of the modules evolves between requests: `setstate` turns plugs and lights on and off and sets the target
+    position of the shutters, which then move at `shutter_speed` percent per second, and every `homestatus` request
+    randomly changes the state of a fraction `change_rate` of the modules of the home.
+
+    Attributes:
+        homes_data (dict): Response body of the `homesdata` endpoint.
+        request_counts (Counter): Number of requests received, per path.
+        error_counts (Counter): Number of error responses sent, per HTTP status.
+        peers (set): Client addresses seen by the server, to measure connection reuse.
+        url (str): Base URL of the server once started.
+    """
+
+    def __init__(
+        self,
+        num_homes=1,
+        modules_per_home=10,
+        seed=0,
+        latency=0.0,
+        error_rate=0.0,
+        quota=None,
+        quota_period=10.0,
+        token_lifetime=DEFAULT_TOKEN_LIFETIME,
+        change_rate=0.0,
+        shutter_speed=DEFAULT_SHUTTER_SPEED,
+        clock=time.monotonic,
+    ):
+        """HomePlusFakeServer Constructor
+
+        Args:
+            num_homes (int, optional): Number of homes of the account.
+            modules_per_home (int, optional): Number of modules per home, in addition to its gateway.
+            seed (int, optional): Seed of the generators of the fleet, of the latencies, errors and state transitions.
+            latency (float or function, optional): Latency of the responses in seconds, or function that draws it from
+                                                   the `random.Random` instance passed as its only argument, e.g.
+                                                   `lambda rng: rng.lognormvariate(-3, 0.5)`.
+            error_rate (float, optional): Fraction of the requests that fail with a 500 error.
+            quota (int, optional): Maximum number of requests per access token and quota period. No limit if None.
+            quota_period (float, optional): Duration of the quota period in seconds.
+            token_lifetime (int, optional): Lifetime of the access tokens in seconds.
+            change_rate (float, optional): Fraction of the modules whose state changes on every `homestatus` request.
+            shutter_speed (float, optional): Speed of the shutters in percent of their course per second.
+            clock (function, optional): Monotonic clock that drives the quotas and the shutter motion.
+        """
+        self.homes_data = generate_homes_data(num_homes, modules_per_home, seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota = quota
+        self.quota_period = quota_period
+        self.token_lifetime = token_lifetime
+        self.change_rate = change_rate
+        self.shutter_speed = shutter_speed
+        self.clock = clock
+        self.request_counts = collections.Counter()
+        self.error_counts = collections.Counter()
+        self.peers = set()
+        self.url = None
+        self._rng = random.Random(seed)
+        self._homes = {home["id"]: home for home in self.homes_data["body"]["homes"]}
+        # Mutable status of the modules of every home, keyed by module identifier
+        self._status = {
+            home_id: {status["id"]: status for status in generate_module_status(home, seed)["body"]["home"]["modules"]}
+            for home_id, home in self._homes.items()
+        }
+        # Start position and time of the shutters in motion, keyed by module identifier
+        self._motion = {}
+        self._tokens = {}
+        self._usage = collections.defaultdict(collections.deque)
+        self._runner = None
+        self.app = web.Application(middlewares=[self._simulate])
+        self.app.router.add_post("/oauth2/token", self._handle_token)
+        self.app.router.add_get("/api/homesdata", self._handle_homes_data)
+        self.app.router.add_get("/api/homestatus", self._handle_home_status)
+        self.app.router.add_post("/api/setstate", self._handle_set_state)
+
+    @property
+    def logger(self):
+        """Return logger of the fake server."""
+        return logging.getLogger(__name__)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving on a host and port.
+
+        Args:
+            host (str, optional): Host to listen on.
+            port (int, optional): Port to listen on. If 0, a free port is picked.
+
+        Returns:
+            str: Base URL of the server.
+        """
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        self.logger.debug("Fake Netatmo API listening on %s", self.url)
+        return self.url
+
+    async def stop(self):
+        """Stop serving and close the open connections."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def client_session(self, session=None):
+        """Return a client session that sends the requests for the real API to this server.
+
+        Args:
+            session (ClientSession, optional): aiohttp session that sends the requests, e.g. to configure its
+                                               connector. If not specified, a new one is created.
+
+        Returns:
+            HomePlusFakeSession: Client session to be used as the `oauth_client` of the API.
+        """
+        return HomePlusFakeSession(self.url, session)
+
+    def module_status(self, home_id, module_id):
+        """Return the current status of a module, as returned by the `homestatus` endpoint."""
+        status = self._status[home_id][module_id]
+        if module_id in self._motion:
+            self._move(status)
+        return dict(status)
+
+    @web.middleware
+    async def _simulate(self, request, handler):
+        """Simulate the latency, errors and quota of the real API around every request."""
+        self.request_counts[request.path] += 1
+        self.peers.add(request.transport.get_extra_info("peername") if request.transport is not None else None)
+        latency = self.latency(self._rng) if callable(self.latency) else self.latency
+        if latency > 0:
+            await asyncio.sleep(latency)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return self._error(500, _INTERNAL_ERROR, "Internal error")
+        if request.path != "/oauth2/token":
+            token = request.headers.get("Authorization", "")[len("Bearer ") :]
+            expires_on = self._tokens.get(token)
+            if expires_on is None or expires_on <= self.clock():
+                return self._error(403, _INVALID_TOKEN, "Invalid access token")
+            if self.quota is not None and not self._consume_quota(token):
+                return self._error(429, _USAGE_REACHED, "User usage reached")
+        return await handler(request)
+
+    async def _handle_token(self, request):
+        """Issue a new access token for an authorization code or a refresh token."""
+        data = await request.post()
+        if data.get("grant_type") not in ("refresh_token", "authorization_code"):
+            return self._error(400, _INVALID_PARAMS, "Invalid grant type")
+        access_token = secrets.token_hex(16)
+        self._tokens[access_token] = self.clock() + self.token_lifetime
+        return web.json_response(
+            {
+                "access_token": access_token,
+                "refresh_token": secrets.token_hex(16),
+                "expires_in": self.token_lifetime,
+                "scope": ["read_magellan", "write_magellan", "read_bubendorff", "write_bubendorff"],
+            }
+        )
+
+    async def _handle_homes_data(self, request):
+        """Return the topology of all the homes of the account."""
+        return web.json_response(self.homes_data)
+
+    async def _handle_home_status(self, request):
+        """Return the status of the modules of a home, after applying the random state changes."""
+        home_id = request.query.get("home_id")
+        if home_id not in self._status:
+            return self._error(400, _INVALID_PARAMS, "Unknown home")
+        if self.change_rate:
+            self._random_changes(home_id)
+        modules = [self.module_status(home_id, module_id) for module_id in self._status[home_id]]
+        return web.json_response(
+            {"status": "ok", "time_server": int(time.time()), "body": {"home": {"id": home_id, "modules": modules}}}
+        )
+
+    async def _handle_set_state(self, request):
+        """Apply the requested state to the modules of a home."""
+        try:
+            home = (await request.json())["home"]
+            statuses = self._status[home["id"]]
+            changes = [(statuses[module["id"]], module) for module in home["modules"]]
+        except (ValueError, KeyError, TypeError):
+            return self._error(400, _INVALID_PARAMS, "Invalid state")
+        for status, change in changes:
+            if "on" in change and "on" in status:
+                self._switch(status, bool(change["on"]))
+            if "target_position" in change and "current_position" in status:
+                if status["id"] in self._motion:
+                    self._move(status)
+                status["target_position"] = change["target_position"]
+                self._motion[status["id"]] = (status["current_position"], self.clock())
+        return web.json_response({"status": "ok", "time_server": int(time.time())})
+
+    def _switch(self, status, on):
+        """Turn a plug or light on or off."""
+        status["on"] = on
+        status["power"] = self._rng.randint(1, 2000) if on else 0
+
+    def _move(self, status):
+        """Update the current position of a shutter in motion."""
+        start_position, start_time = self._motion[status["id"]]
+        target = status["target_position"]
+        travelled = (self.clock() - start_time) * self.shutter_speed
+        if travelled >= abs(target - start_position):
+            status["current_position"] = target
+            del self._motion[status["id"]]
+        else:
+            direction = 1 if target > start_position else -1
+            status["current_position"] = int(start_position + direction * travelled)
+
+    def _random_changes(self, home_id):
+        """Randomly change the state of a fraction `change_rate` of the modules of a home."""
+        rng = self._rng
+        for status in self._status[home_id].values():
+            if rng.random() >= self.change_rate:
+                continue
+            if "on" in status:
+                if status["on"] and rng.random() < 0.5:
+                    status["power"] = rng.randint(1, 2000)
+                else:
+                    self._switch(status, not status["on"])
+            elif rng.random() < 0.1:
+                status["reachable"] = not status["reachable"]
+
+    def _consume_quota(self, token):
+        """Count a request against the quota of an access token and return False if the quota is exhausted."""
+        now = self.clock()
+        usage = self._usage[token]
+        while usage and usage[0] <= now - self.quota_period:
+            usage.popleft()
+        if len(usage) >= self.quota:
+            return False
+        usage.append(now)
+        return True
+
+    def _error(self, http_status, code, message):
+        """Return an error response in the structure of the real API."""
+        self.error_counts[http_status] += 1
+        return web.Response(
+            status=http_status,
+            body=json.dumps({"error": {"code": code, "message": message}}),
+            content_type="application/json",
+        )
+
+
+def main(argv=None):
+    """Run a fake server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--homes", type=int, default=1, help="number of homes")
+    parser.add_argument("--modules", type=int, default=10, help="number of modules per home")
+    parser.add_argument("--host", default="127.0.0.1", help="host to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="mean latency of the responses in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of the requests that fail")
+    parser.add_argument("--quota", type=int, default=None, help="maximum number of requests per token and period")
+    parser.add_argument("--change-rate", type=float, default=0.0, help="fraction of modules changed per status")
+    args = parser.parse_args(argv)
+
+    latency = (lambda rng: rng.expovariate(1 / args.latency)) if args.latency > 0 else 0.0
+    server = HomePlusFakeServer(
+        args.homes,
+        args.modules,
+        latency=latency,
+        error_rate=args.error_rate,
+        quota=args.quota,
+        change_rate=args.change_rate,
+    )
+    loop = asyncio.new_event_loop()
+    print(f"Serving {args.homes}x{args.modules} modules on {loop.run_until_complete(server.start(args.host, args.port))}")
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(server.stop())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import asyncio
+import collections
+import concurrent.futures
+import logging
+import sqlite3
+
+DEFAULT_HISTORY_BATCH_SIZE = 500
+
+HomePlusHistoryRecord = collections.namedtuple(
+    "HomePlusHistoryRecord", ["timestamp", "home_id", "module_id", "device", "field", "old", "new"]
+)
+HomePlusHistoryRecord.__doc__ = """Change of a field of a module, as stored in the history.
+
+Boolean values are stored, and returned, as 0 or 1.
+
+Attributes:
+    timestamp (float): Time of the change (seconds since the epoch).
+    home_id (str): Unique identifier of the home of the module.
+    module_id (str): Unique identifier of the module.
+    device (str): Type of the device (plug, light, remote, automation).
+    field (str): Name of the field that changed.
+    old: Value of the field before the change.
+    new: Value of the field after the change.
+"""
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS changes (
+        time REAL NOT NULL,
+        home_id TEXT NOT NULL,
+        module_id TEXT NOT NULL,
+        device TEXT,
+        field TEXT NOT NULL,
+        old,
+        new
+    )""",
+    "CREATE INDEX IF NOT EXISTS changes_module_time ON changes (module_id, time)",
+    "CREATE INDEX IF NOT EXISTS changes_home_time ON changes (home_id, time)",
+)
+
+_INSERT = "INSERT INTO changes (time, home_id, module_id, device, field, old, new) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+
+class HomePlusHistoryStore:
+    """SQLite store of the history of the changes in the state of the modules.
+
+    The store listens to the module changes published in an event bus (see `attach()`) and buffers them. The changes
+    of a refresh cycle, which are published together, are written as one batch by a dedicated thread once the cycle is
+    over, or as soon as `batch_size` of them are buffered, so the event loop never waits for the database. The
+    database is in WAL mode so that it can be queried while it is being written.
+
+    Queries first wait until the buffered changes are written, so they never miss recent changes, and return
+    iterators over `HomePlusHistoryRecord`, so large results are not loaded in memory at once.
+
+    Attributes:
+        path (str): Path of the SQLite database file.
+        batch_size (int): Maximum number of buffered changes, which triggers a write before the end of the cycle.
+        rows_written (int): Number of changes written to the database.
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_HISTORY_BATCH_SIZE):
+        """HomePlusHistoryStore Constructor
+
+        Args:
+            path (str): Path of the SQLite database file, which is created if needed.
+            batch_size (int, optional): Maximum number of buffered changes, which triggers a write before the end of
+                                        the cycle.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._pending = []
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="homeplushistory")
+        self._connection = None
+        self._writes = set()
+        # Create the schema straight away, so the store can be queried before anything is written
+        self._executor.submit(self._connect).result()
+
+    @property
+    def logger(self):
+        """Return logger of the history store."""
+        return logging.getLogger(__name__)
+
+    def attach(self, event_bus):
+        """Start storing the module changes published in an event bus.
+
+        Args:
+            event_bus (HomePlusEventBus): Event bus where the module changes are published.
+
+        Returns:
+            function: Function that stops storing the changes when called.
+        """
+        return event_bus.add_listener(self.add)
+
+    def add(self, change):
+        """Buffer a module change, to be written with the other changes of the same refresh cycle.
+
+        The changes of a cycle are all published during the same iteration of the event loop, so the buffered changes
+        are written on its next iteration, or straight away if there are `batch_size` of them. Without a running event
+        loop, they are written when the store is flushed or queried.
+
+        Args:
+            change (HomePlusModuleChange): Change in the state of a module.
+        """
+        pending = self._pending
+        if not pending:
+            try:
+                asyncio.get_running_loop().call_soon(self._write_pending)
+            except RuntimeError:
+                pass
+        for field, (old, new) in change.changes.items():
+            pending.append((change.timestamp, change.home_id, change.module_id, change.device, field, old, new))
+        if len(pending) >= self.batch_size:
+            self._write_pending()
+
+    async def async_flush(self):
+        """Write all the buffered changes and wait until they are in the database."""
+        self._write_pending()
+        if self._writes:
+            await asyncio.gather(*[asyncio.wrap_future(future) for future in list(self._writes)])
+
+    def flush(self):
+        """Write all the buffered changes and wait until they are in the database, blocking the calling thread."""
+        if self._connection is None:
+            return
+        rows, self._pending = self._pending, []
+        self._executor.submit(self._write, rows).result()
+
+    def close(self):
+        """Write the buffered changes and close the database."""
+        if self._connection is not None:
+            self.flush()
+            self._executor.submit(self._close).result()
+            self._executor.shutdown()
+
+    def query(self, module_id=None, home_id=None, field=None, start=None, end=None):
+        """Return the changes that match all the given conditions, in chronological order.
+
+        Args:
+            module_id (str, optional): Unique identifier of the module.
+            home_id (str, optional): Unique identifier of the home.
+            field (str, optional): Name of the field that changed.
+            start (float, optional): Start of the time range in seconds since the epoch (inclusive).
+            end (float, optional): End of the time range in seconds since the epoch (inclusive).
+
+        Returns:
+            iterator: Iterator over the matching `HomePlusHistoryRecord`.
+        """
+        self.flush()
+        conditions, parameters = [], []
+        for column, value in (("module_id", module_id), ("home_id", home_id), ("field", field)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        if start is not None:
+            conditions.append("time >= ?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("time <= ?")
+            parameters.append(end)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT time, home_id, module_id, device, field, old, new FROM changes{where} ORDER BY time, rowid"
+        return self._select(sql, parameters, HomePlusHistoryRecord._make)
+
+    def last_change_to(self, module_id, field, value):
+        """Return the time when a field of a module last changed to a value, e.g. when a plug was last turned on.
+
+        Args:
+            module_id (str): Unique identifier of the module.
+            field (str): Name of the field.
+            value: Value of the field.
+
+        Returns:
+            float: Time of the change in seconds since the epoch, or None if the field never changed to the value.
+        """
+        self.flush()
+        sql = "SELECT MAX(time) FROM changes WHERE module_id = ? AND field = ? AND new = ?"
+        return next(self._select(sql, (module_id, field, value), lambda row: row[0]))
+
+    def modules_with(self, field, value, start, end, home_id=None):
+        """Return the modules whose field had a value at some point of a time range, e.g. the modules that were
+        unreachable yesterday.
+
+        Args:
+            field (str): Name of the field.
+            value: Value of the field.
+            start (float): Start of the time range in seconds since the epoch.
+            end (float): End of the time range in seconds since the epoch.
+            home_id (str, optional): Only return the modules of this home.
+
+        Returns:
+            iterator: Iterator over the unique identifiers of the modules, in alphabetical order.
+        """
+        self.flush()
+        home_condition = "" if home_id is None else " AND home_id = ?"
+        home_parameters = () if home_id is None else (home_id,)
+        # Modules that changed to the value during the range, or whose last change before the range was to the value
+        sql = f"""
+            SELECT module_id FROM changes
+            WHERE field = ? AND new = ? AND time BETWEEN ? AND ?{home_condition}
+            UNION
+            SELECT module_id FROM (
+                SELECT module_id, new, MAX(time) FROM changes
+                WHERE field = ? AND time < ?{home_condition}
+                GROUP BY module_id
+            ) WHERE new = ?
+            ORDER BY module_id
+        """
+        parameters = (field, value, start, end, *home_parameters, field, start, *home_parameters, value)
+        return self._select(sql, parameters, lambda row: row[0])
+
+    def _write_pending(self):
+        """Hand the buffered changes to the writer thread, without waiting for them to be written."""
+        if not self._pending or self._connection is None:
+            return
+        rows, self._pending = self._pending, []
+        future = self._executor.submit(self._write, rows)
+        self._writes.add(future)
+        future.add_done_callback(self._writes.discard)
+
+    def _connect(self):
+        """Open the database in the writer thread and create its schema."""
+        connection = self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+
+    def _write(self, rows):
+        """Write a batch of changes in a single transaction, in the writer thread."""
+        if not rows:
+            return
+        try:
+            with self._connection:
+                self._connection.executemany(_INSERT, rows)
+        except sqlite3.Error:
+            self.logger.exception("Error writing %d module changes to the history store %s", len(rows), self.path)
+            raise
+        self.rows_written += len(rows)
+
+    def _close(self):
+        """Close the database in the writer thread."""
+        self._connection.close()
+        self._connection = None
+
+    def _select(self, sql, parameters, make):
+        """Iterate over the results of a query on a dedicated read connection."""
+        connection = sqlite3.connect(self.path)
+        try:
+            for row in connection.execute(sql, parameters):
+                yield make(row)
+        finally:
+            connection.close()
@@ -0,0 +1,135 @@
+import logging
+
+
+class HomePlusModuleIndex:
+    """Index of the modules of all the homes, with secondary indexes by device type, bridge, home and reachability.
+
+    The index is maintained incrementally by the homes as their modules are created, updated and removed, so every
+    lookup by key is O(1) and every query returns its k matching modules in O(k), regardless of the number of homes
+    and modules in the index.
+
+    Attributes:
+        modules (dict): Dictionary of all the indexed modules keyed by their unique identifier.
+    """
+
+    def __init__(self):
+        """HomePlusModuleIndex Constructor"""
+        self.modules = {}
+        self._by_device = {}
+        self._by_bridge = {}
+        self._by_home = {}
+        self._by_reachable = {True: {}, False: {}}
+        self._keys = {}
+        self._removed = []
+
+    def __len__(self):
+        """Return the number of modules in the index"""
+        return len(self.modules)
+
+    def __contains__(self, module_id):
+        """Return True if a module with the given identifier is in the index"""
+        return module_id in self.modules
+
+    def __iter__(self):
+        """Iterate over the modules in the index"""
+        return iter(self.modules.values())
+
+    @property
+    def logger(self):
+        """Return logger of the index."""
+        return logging.getLogger(__name__)
+
+    def get(self, module_id):
+        """Return the module with the given identifier, or None if it is not in the index."""
+        return self.modules.get(module_id)
+
+    def by_device(self, device):
+        """Return the list of modules of a device type (plug, light, remote, automation...)."""
+        return list(self._by_device.get(device, {}).values())
+
+    def by_bridge(self, bridge):
+        """Return the list of modules controlled by a bridge."""
+        return list(self._by_bridge.get(bridge, {}).values())
+
+    def by_home(self, home_id):
+        """Return the list of modules of a home."""
+        return list(self._by_home.get(home_id, {}).values())
+
+    def by_reachable(self, reachable=True):
+        """Return the list of modules that are (or are not) reachable."""
+        return list(self._by_reachable[reachable is True].values())
+
+    def add(self, module):
+        """Add a module to the index, replacing any module with the same identifier.
+
+        Args:
+            module (HomePlusModule): Module to be indexed.
+        """
+        old_module = self.modules.get(module.id)
+        if old_module is module:
+            return
+        if old_module is not None:
+            self.remove(old_module)
+        self.logger.debug("Registering Home+ Control module in index: %s.", str(module))
+        self.modules[module.id] = module
+        self._index(module)
+
+    def remove(self, module):
+        """Remove a module from the index.
+
+        The module is recorded so that it is returned by the next call to `drain_removed()`.
+
+        Args:
+            module (HomePlusModule): Module to be removed.
+        """
+        if self.modules.get(module.id) is not module:
+            return
+        del self.modules[module.id]
+        self._unindex(module.id)
+        self._removed.append(module)
+
+    def update(self, module):
+        """Update the secondary indexes of a module whose bridge or reachability may have changed.
+
+        Args:
+            module (HomePlusModule): Module that is already in the index.
+        """
+        if self.modules.get(module.id) is not module:
+            return
+        if self._keys[module.id] != self._module_keys(module):
+            self._unindex(module.id)
+            self._index(module)
+
+    def drain_removed(self):
+        """Return the modules removed from the index since the last call, excluding those that were added again.
+
+        Returns:
+            list: List of removed modules.
+        """
+        removed, self._removed = self._removed, []
+        return [module for module in removed if module.id not in self.modules]
+
+    @staticmethod
+    def _module_keys(module):
+        """Return the keys of a module in the secondary indexes."""
+        home_id = module.plant.id if module.plant is not None else None
+        return (module.device, module.bridge, home_id, module.reachable is True)
+
+    def _index(self, module):
+        """Add a module to the secondary indexes."""
+        keys = self._keys[module.id] = self._module_keys(module)
+        device, bridge, home_id, reachable = keys
+        self._by_device.setdefault(device, {})[module.id] = module
+        self._by_bridge.setdefault(bridge, {})[module.id] = module
+        self._by_home.setdefault(home_id, {})[module.id] = module
+        self._by_reachable[reachable][module.id] = module
+
+    def _unindex(self, module_id):
+        """Remove a module from the secondary indexes."""
+        device, bridge, home_id, reachable = self._keys.pop(module_id)
+        for index, key in ((self._by_device, device), (self._by_bridge, bridge), (self._by_home, home_id)):
+            bucket = index[key]
+            del bucket[module_id]
+            if not bucket:
+                del index[key]
+        del self._by_reachable[reachable][module_id]
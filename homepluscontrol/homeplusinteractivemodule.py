@@ -1,5 +1,6 @@
 import aiohttp
 import json
+import time
 
 from .homeplusconst import SET_STATE_URL
 from .homeplusmodule import HomePlusModule
@@ -14,8 +15,14 @@ class HomePlusInteractiveModule(HomePlusModule):
     Attributes:
         status (str): The module can have status = 'on' or status = 'off'
         power (int): The module power consumption in watts (as an integer value)
+        power_history (HomePlusPowerHistory): Optional ring buffer of the power consumption samples of the module.
+                                              Defaults to None, i.e. no history is kept.
+        power_rollup (HomePlusPowerRollup): Optional multi-resolution rollup of the power consumption of the module.
+                                            Defaults to None, i.e. no rollup is maintained.
     """
 
+    __slots__ = ("status", "power", "power_history", "power_rollup")
+
     STATUS_ON = True
     """ Data to be set in the API to set the device to an 'on' state."""
 
@@ -39,6 +46,8 @@ class HomePlusInteractiveModule(HomePlusModule):
         super().__init__(plant, id, name, hw_type, device, bridge, fw, type, reachable)
         self.status = ""
         self.power = 0
+        self.power_history = None
+        self.power_rollup = None
 
     def __str__(self):
         """Return the string representing this module"""
@@ -51,25 +60,40 @@ class HomePlusInteractiveModule(HomePlusModule):
         }
         return state_param
 
-    def update_state(self, module_data):
-        """Update the internal state of the module from the input JSON data.
+    def _update_state(self, module_status):
+        """Update the internal state of the module from its decoded status.
+
+        Args:
+            module_status (HomePlusModuleStatus): Decoded status of the module
+        """
+        super()._update_state(module_status)
+        self.status = "on" if module_status.on else "off"
+        self.power = int(module_status.power)
+        if self.power_history is not None or self.power_rollup is not None:
+            self._sample_power(time.time())
+
+    def _sample_power(self, timestamp):
+        """Add the current power of the module as a sample to its power history and rollup, if it keeps them.
 
         Args:
-            module_data (json): JSON data of the module state
+            timestamp (float): Time of the sample in seconds since the epoch.
         """
-        super().update_state(module_data)
-        self.status = "on" if module_data.get("on") else "off"
-        self.power = int(module_data.get("power", "0"))
+        if self.power_history is not None:
+            self.power_history.append(timestamp, self.power)
+        if self.power_rollup is not None:
+            self.power_rollup.add(timestamp, self.power)
 
     async def turn_on(self):
         """Turn on this interactive module"""
         if await self.post_status_update(HomePlusInteractiveModule.STATUS_ON):
             self.status = "on"
+            self._store_state()
 
     async def turn_off(self):
         """Turn off this interactive module"""
         if await self.post_status_update(HomePlusInteractiveModule.STATUS_OFF):
             self.status = "off"
+            self._store_state()
 
     async def toggle_status(self):
         """Toggle the state of this interactive module, i.e. if the module is on, the method call turns it off.
@@ -81,6 +105,7 @@ class HomePlusInteractiveModule(HomePlusModule):
 
         if await self.post_status_update(desired_status):
             self.status = "on" if desired_status else "off"
+            self._store_state()
 
     async def post_status_update(self, desired_end_status):
         """Call the API method to act on the module's status.
@@ -0,0 +1,65 @@
+import collections
+
+DEFAULT_INTERN_TABLE_SIZE = 100000
+
+
+class HomePlusInternTable:
+    """Bounded table of canonical instances of the strings that repeat across the parsed payloads.
+
+    Identifiers of homes, modules and bridges, hardware types, names and battery states are decoded into new string
+    objects on every refresh. Passing them through the table replaces each of them by a single shared instance, so that
+    the module objects and cached payloads of a long-running process reference the same strings instead of holding a
+    fresh copy per refresh.
+
+    Unlike `sys.intern`, the table is bounded: when it is full, the oldest entries are evicted first.
+
+    Attributes:
+        max_size (int): Maximum number of strings kept in the table.
+        hits (int): Number of lookups that returned an existing instance.
+        misses (int): Number of lookups that added a new instance to the table.
+        evictions (int): Number of instances evicted from the table to make room for new ones.
+    """
+
+    def __init__(self, max_size=DEFAULT_INTERN_TABLE_SIZE):
+        """HomePlusInternTable Constructor
+
+        Args:
+            max_size (int, optional): Maximum number of strings kept in the table.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Popping the oldest entry of a dict gets slower with every entry deleted before it, but not of an OrderedDict
+        self._table = collections.OrderedDict()
+
+    def __len__(self):
+        """Return the number of strings in the table"""
+        return len(self._table)
+
+    def __call__(self, value):
+        """Return the canonical instance of a string.
+
+        Args:
+            value (str): String to be interned. Any other type of value is returned as is.
+
+        Returns:
+            str: Canonical instance of the string, which is equal to the input value.
+        """
+        if value.__class__ is not str:
+            return value
+        table = self._table
+        canonical = table.get(value)
+        if canonical is not None:
+            self.hits += 1
+            return canonical
+        self.misses += 1
+        if len(table) >= self.max_size:
+            table.popitem(last=False)
+            self.evictions += 1
+        table[value] = value
+        return value
+
+    def clear(self):
+        """Remove all the strings from the table."""
+        self._table.clear()
@@ -0,0 +1,525 @@
+import asyncio
+import bisect
+import collections
+import concurrent.futures
+import logging
+import os
+import struct
+import threading
+
+from .homepluseventbus import TRACKED_FIELDS
+
+DEFAULT_SEGMENT_SIZE = 8 * 1024 * 1024  # 8 MiB
+DEFAULT_INDEX_INTERVAL = 256  # Records between two entries of the sparse index
+DEFAULT_JOURNAL_BATCH_SIZE = 500
+
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+
+HomePlusJournalRecord = collections.namedtuple(
+    "HomePlusJournalRecord", ["timestamp", "module_id", "field", "old", "new"]
+)
+HomePlusJournalRecord.__doc__ = """Change of a field of a module, as recorded in the journal.
+
+Attributes:
+    timestamp (float): Time of the change (seconds since the epoch).
+    module_id (str): Unique identifier of the module.
+    field (str): Name of the field that changed (see `TRACKED_FIELDS`).
+    old: Value of the field before the change.
+    new: Value of the field after the change.
+"""
+
+# Record: length of the rest of the record, then timestamp, module identifier, field code and old and new values
+_LENGTH = struct.Struct("<H")
+_TIMESTAMP = struct.Struct("<d")
+_BYTE = struct.Struct("<B")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_STR_LENGTH = struct.Struct("<H")
+# Index entry: timestamp and offset of a record in the segment
+_INDEX_ENTRY = struct.Struct("<dQ")
+
+_NONE, _FALSE, _TRUE, _INT_TAG, _FLOAT_TAG, _STR_TAG = range(6)
+_FIELD_CODES = {field: code for code, field in enumerate(TRACKED_FIELDS)}
+
+
+class _Segment:
+    """Segment file of the journal, with the sparse index of its records in memory."""
+
+    __slots__ = ("path", "index", "size", "records", "last_timestamp")
+
+    def __init__(self, path):
+        self.path = path
+        self.index = []
+        self.size = 0
+        self.records = 0
+        self.last_timestamp = None
+
+    @property
+    def first_timestamp(self):
+        return self.index[0][0] if self.index else None
+
+    @property
+    def index_path(self):
+        return self.path[: -len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+
+class HomePlusJournal:
+    """Append-only journal of the changes in the state of the modules.
+
+    Every change of a tracked field of a module is appended as a compact binary record (timestamp, module identifier,
+    field, old and new values) to the active segment file of the journal directory. When the active segment reaches
+    `segment_size` bytes, it is sealed and a new one is started.
+
+    Each segment has a sparse index, with the timestamp and offset of one record every `index_interval` records, that is
+    kept in a companion file and in memory. Replaying a time range only reads the segments that overlap with it,
+    starting at the closest indexed record, so the journal can hold millions of records without loading them in memory.
+
+    Sealed segments are compacted when they are sealed, or on demand with `compact()`: segments older than the
+    `retention` are deleted, and the successive changes of the same field of a module within `compaction_window`
+    seconds are merged into a single change from the first old value to the last new value. Replays read the segment
+    files as they iterate, so a compaction requested while a replay is in progress is deferred until every replay is
+    over.
+
+    Appended records are buffered and written in batches by a dedicated thread, either when `batch_size` of them are
+    buffered or when `write_pending()` is called, so the event loop never waits for the segment files. Replaying and
+    compacting wait for the buffered records to be written first.
+
+    Records are expected to be appended in time order.
+
+    Attributes:
+        directory (str): Directory of the segment files.
+        segment_size (int): Size in bytes from which the active segment is sealed.
+        index_interval (int): Number of records between two entries of the sparse index.
+        compaction_window (float): Length in seconds of the windows whose successive changes are merged, or None to
+                                   keep every change.
+        retention (float): Number of seconds after which sealed segments are deleted, or None to keep them forever.
+        batch_size (int): Number of buffered records that triggers a write.
+        records_written (int): Number of records appended to the journal.
+        records_compacted (int): Number of records removed by the compactions.
+    """
+
+    def __init__(
+        self,
+        directory,
+        segment_size=DEFAULT_SEGMENT_SIZE,
+        index_interval=DEFAULT_INDEX_INTERVAL,
+        compaction_window=None,
+        retention=None,
+        batch_size=DEFAULT_JOURNAL_BATCH_SIZE,
+    ):
+        """HomePlusJournal Constructor
+
+        The segments already present in the directory are recovered, and new records are appended to a new segment.
+
+        Args:
+            directory (str): Directory of the segment files, which is created if needed.
+            segment_size (int, optional): Size in bytes from which the active segment is sealed.
+            index_interval (int, optional): Number of records between two entries of the sparse index.
+            compaction_window (float, optional): Length in seconds of the windows whose successive changes are merged
+                                                 by the compaction. Defaults to None, i.e. every change is kept.
+            retention (float, optional): Number of seconds after which sealed segments are deleted by the compaction.
+                                         Defaults to None, i.e. segments are kept forever.
+            batch_size (int, optional): Number of buffered records that triggers a write.
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.index_interval = index_interval
+        self.compaction_window = compaction_window
+        self.retention = retention
+        self.batch_size = batch_size
+        self.records_written = 0
+        self.records_compacted = 0
+        os.makedirs(directory, exist_ok=True)
+        # Protects the segments from being compacted while they are replayed
+        self._lock = threading.Lock()
+        self._readers = 0
+        self._deferred_compaction = None
+        self._segments = []
+        for path in self._segment_paths():
+            segment = self._recover(path)
+            if segment.records:
+                self._segments.append(segment)
+            else:
+                self._delete(segment)
+        self._file = None
+        self._index_file = None
+        self._start_segment()
+        self._pending = []
+        self._writes = set()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="homeplusjournal")
+
+    @property
+    def logger(self):
+        """Return logger of the journal."""
+        return logging.getLogger(__name__)
+
+    @property
+    def segments(self):
+        """Return the paths of the segment files, oldest first."""
+        return [segment.path for segment in self._segments]
+
+    def append(self, module_id, field, old, new, timestamp):
+        """Buffer the change of a field of a module, writing the buffered changes if there are `batch_size` of them.
+
+        Args:
+            module_id (str): Unique identifier of the module.
+            field (str): Name of the field that changed (see `TRACKED_FIELDS`).
+            old: Value of the field before the change (None, bool, int, float or str).
+            new: Value of the field after the change (None, bool, int, float or str).
+            timestamp (float): Time of the change (seconds since the epoch).
+
+        Raises:
+            ValueError: If the field cannot be recorded in the journal.
+        """
+        if field not in _FIELD_CODES:
+            raise ValueError(f"Field {field} cannot be recorded in the journal")
+        self._pending.append((timestamp, module_id, field, old, new))
+        if len(self._pending) >= self.batch_size:
+            self.write_pending()
+
+    def append_change(self, change):
+        """Buffer the changes of a module published in the event bus.
+
+        Args:
+            change (HomePlusModuleChange): Change in the state of a module.
+        """
+        for field, (old, new) in change.changes.items():
+            self.append(change.module_id, field, old, new, change.timestamp)
+
+    def write_pending(self):
+        """Hand the buffered records to the writer thread, without waiting for them to be written."""
+        if not self._pending:
+            return
+        records, self._pending = self._pending, []
+        future = self._executor.submit(self._write, records)
+        self._writes.add(future)
+        future.add_done_callback(self._writes.discard)
+
+    async def async_flush(self):
+        """Write all the buffered records and wait until they are in the segment files."""
+        self.write_pending()
+        if self._writes:
+            await asyncio.gather(*[asyncio.wrap_future(future) for future in list(self._writes)])
+
+    def flush(self):
+        """Write all the buffered records and wait until they are in the segment files, blocking the calling thread."""
+        if self._file is None:
+            return
+        records, self._pending = self._pending, []
+        self._executor.submit(self._write, records).result()
+
+    def close(self):
+        """Write the buffered records, seal the active segment and close the journal."""
+        if self._file is not None:
+            self.flush()
+            self._executor.submit(self._seal).result()
+            self._executor.shutdown()
+            self._file = self._index_file = None
+
+    def replay(self, start=None, end=None, module_id=None):
+        """Iterate over the records of a time range, in the order in which they were appended.
+
+        Args:
+            start (float, optional): Start of the range in seconds since the epoch (inclusive).
+            end (float, optional): End of the range in seconds since the epoch (inclusive).
+            module_id (str, optional): Only return the records of this module.
+
+        Returns:
+            iterator: Iterator over the `HomePlusJournalRecord` of the range, which are the records written when the
+                      iteration starts.
+        """
+        self.flush()
+        with self._lock:
+            self._readers += 1
+            # The writer thread keeps appending to the active segment, so the replay is limited to what is written now
+            segments = [
+                (segment.path, list(segment.index), segment.size, segment.last_timestamp)
+                for segment in self._segments
+                if segment.records
+            ]
+        try:
+            for path, index, size, last_timestamp in segments:
+                if start is not None and last_timestamp < start:
+                    continue
+                if end is not None and index[0][0] > end:
+                    break
+                offset = 0
+                if start is not None:
+                    # Last indexed record strictly before the start of the range
+                    position = bisect.bisect_left(index, (start,)) - 1
+                    if position >= 0:
+                        offset = index[position][1]
+                for record in _read_records(path, offset, size):
+                    if start is not None and record.timestamp < start:
+                        continue
+                    if end is not None and record.timestamp > end:
+                        return
+                    if module_id is None or record.module_id == module_id:
+                        yield record
+        finally:
+            self._end_replay()
+
+    def compact(self, now=None):
+        """Compact the sealed segments of the journal.
+
+        Args:
+            now (float, optional): Current time in seconds since the epoch, used to apply the retention. Defaults to
+                                   the timestamp of the last record appended.
+        """
+        if self._file is not None:
+            self.flush()
+            self._executor.submit(self._compact, now).result()
+        else:
+            self._compact(now)
+
+    def _end_replay(self):
+        """Unregister a replay that is over, running the compaction deferred by the replays if it was the last one."""
+        with self._lock:
+            self._readers -= 1
+            deferred = self._deferred_compaction if not self._readers else None
+            if deferred is not None:
+                self._deferred_compaction = None
+        if deferred is not None:
+            if self._file is not None:
+                self._executor.submit(self._compact, *deferred)
+            else:
+                self._compact(*deferred)
+
+    def _compact(self, now):
+        """Compact the sealed segments of the journal, in the writer thread while the journal is open, unless they are
+        being replayed."""
+        with self._lock:
+            if self._readers:
+                self._deferred_compaction = (now,)
+                return
+            self._compact_segments(now)
+
+    def _compact_segments(self, now):
+        """Apply the retention to the sealed segments and merge their successive changes."""
+        if now is None:
+            now = max((s.last_timestamp for s in self._segments if s.last_timestamp is not None), default=0)
+        # Every segment is sealed once the active one is closed, including the one that has just been sealed
+        sealed = self._segments if self._file is None or self._file.closed else self._segments[:-1]
+        for segment in list(sealed):
+            if self.retention is not None and segment.records and segment.last_timestamp < now - self.retention:
+                self.logger.debug("Deleting expired journal segment %s", segment.path)
+                self.records_compacted += segment.records
+                self._delete(segment)
+            elif self.compaction_window is not None:
+                self._compact_segment(segment)
+
+    def _write(self, records):
+        """Write a batch of records to the active segment, in the writer thread."""
+        for record in records:
+            self._write_record(*record)
+        self._file.flush()
+        self._index_file.flush()
+
+    def _write_record(self, timestamp, module_id, field, old, new):
+        """Write a record to the active segment, sealing it and starting a new one if it is full."""
+        segment = self._segments[-1]
+        record = _encode(timestamp, module_id, field, old, new)
+        if segment.records % self.index_interval == 0:
+            entry = (timestamp, segment.size)
+            segment.index.append(entry)
+            self._index_file.write(_INDEX_ENTRY.pack(*entry))
+        self._file.write(record)
+        segment.size += len(record)
+        segment.records += 1
+        segment.last_timestamp = timestamp
+        self.records_written += 1
+        if segment.size >= self.segment_size:
+            self._seal()
+            self._start_segment()
+
+    def _segment_paths(self):
+        """Return the paths of the segment files in the directory, oldest first."""
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _start_segment(self):
+        """Start a new active segment."""
+        sequence = 0
+        if self._segments:
+            sequence = int(os.path.basename(self._segments[-1].path)[: -len(SEGMENT_SUFFIX)]) + 1
+        segment = _Segment(os.path.join(self.directory, f"{sequence:08d}{SEGMENT_SUFFIX}"))
+        self._segments.append(segment)
+        self._file = open(segment.path, "wb")
+        self._index_file = open(segment.index_path, "wb")
+
+    def _seal(self):
+        """Close the active segment and compact the sealed segments if needed."""
+        self._file.close()
+        self._index_file.close()
+        if self.retention is not None or self.compaction_window is not None:
+            self._compact(None)
+
+    def _delete(self, segment):
+        """Delete a segment and its index."""
+        if segment in self._segments:
+            self._segments.remove(segment)
+        for path in (segment.path, segment.index_path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _compact_segment(self, segment):
+        """Merge the successive changes of the same field of a module within the compaction window."""
+        window = self.compaction_window
+        merged = {}
+        for record in _read_records(segment.path, 0, segment.size):
+            bucket = record.timestamp - record.timestamp % window
+            key = (bucket, record.module_id, record.field)
+            previous = merged.get(key)
+            if previous is None:
+                merged[key] = record
+            else:
+                merged[key] = previous._replace(timestamp=record.timestamp, new=record.new)
+        records = sorted(
+            (r for r in merged.values() if r.old != r.new or type(r.old) is not type(r.new)),
+            key=lambda r: r.timestamp,
+        )
+        if len(records) == segment.records:
+            return
+        temp_path = segment.path + ".tmp"
+        temp_index_path = segment.index_path + ".tmp"
+        index = []
+        size = 0
+        with open(temp_path, "wb") as segment_file, open(temp_index_path, "wb") as index_file:
+            for count, record in enumerate(records):
+                if count % self.index_interval == 0:
+                    index.append((record.timestamp, size))
+                    index_file.write(_INDEX_ENTRY.pack(record.timestamp, size))
+                data = _encode(*record)
+                segment_file.write(data)
+                size += len(data)
+        os.replace(temp_path, segment.path)
+        os.replace(temp_index_path, segment.index_path)
+        self.records_compacted += segment.records - len(records)
+        if not records:
+            self._delete(segment)
+            return
+        segment.index = index
+        segment.size = size
+        segment.records = len(records)
+        segment.last_timestamp = records[-1].timestamp
+
+    def _recover(self, path):
+        """Load the index of an existing segment and find its last record, discarding any truncated record and
+        rebuilding the missing index entries."""
+        segment = _Segment(path)
+        segment.size = os.path.getsize(path)
+        if os.path.exists(segment.index_path):
+            with open(segment.index_path, "rb") as index_file:
+                data = index_file.read()
+            entries = (_INDEX_ENTRY.unpack_from(data, i * _INDEX_ENTRY.size) for i in range(len(data) // _INDEX_ENTRY.size))
+            segment.index = [entry for entry in entries if entry[1] < segment.size]
+        indexed = len(segment.index)
+        offset = segment.index[-1][1] if segment.index else 0
+        segment.records = max(indexed - 1, 0) * self.index_interval
+        end = offset
+        for record, record_end in _read_records(path, offset, segment.size, with_offsets=True):
+            if segment.records % self.index_interval == 0 and (not segment.index or segment.index[-1][1] < end):
+                segment.index.append((record.timestamp, end))
+            segment.records += 1
+            segment.last_timestamp = record.timestamp
+            end = record_end
+        if end < segment.size:
+            self.logger.warning("Discarding truncated record at the end of journal segment %s", path)
+            with open(path, "r+b") as segment_file:
+                segment_file.truncate(end)
+            segment.size = end
+        if len(segment.index) != indexed or end < segment.size:
+            with open(segment.index_path, "wb") as index_file:
+                index_file.write(b"".join(_INDEX_ENTRY.pack(*entry) for entry in segment.index))
+        return segment
+
+
+def _encode(timestamp, module_id, field, old, new):
+    """Encode a record."""
+    module_id_bytes = module_id.encode()
+    code = _FIELD_CODES.get(field)
+    if code is None:
+        raise ValueError(f"Field {field} cannot be recorded in the journal")
+    body = b"".join(
+        (
+            _BYTE.pack(len(module_id_bytes)),
+            module_id_bytes,
+            _BYTE.pack(code),
+            _encode_value(old),
+            _encode_value(new),
+        )
+    )
+    return _LENGTH.pack(_TIMESTAMP.size + len(body)) + _TIMESTAMP.pack(timestamp) + body
+
+
+def _encode_value(value):
+    """Encode a field value as a type tag followed by its payload."""
+    if value is None:
+        return _BYTE.pack(_NONE)
+    if value is True:
+        return _BYTE.pack(_TRUE)
+    if value is False:
+        return _BYTE.pack(_FALSE)
+    if isinstance(value, int):
+        return _BYTE.pack(_INT_TAG) + _INT.pack(value)
+    if isinstance(value, float):
+        return _BYTE.pack(_FLOAT_TAG) + _FLOAT.pack(value)
+    data = str(value).encode()
+    return _BYTE.pack(_STR_TAG) + _STR_LENGTH.pack(len(data)) + data
+
+
+def _decode_value(data, offset):
+    """Decode a field value, returning it with the offset of the data that follows it."""
+    tag = data[offset]
+    offset += 1
+    if tag == _NONE:
+        return None, offset
+    if tag == _TRUE:
+        return True, offset
+    if tag == _FALSE:
+        return False, offset
+    if tag == _INT_TAG:
+        return _INT.unpack_from(data, offset)[0], offset + _INT.size
+    if tag == _FLOAT_TAG:
+        return _FLOAT.unpack_from(data, offset)[0], offset + _FLOAT.size
+    length = _STR_LENGTH.unpack_from(data, offset)[0]
+    offset += _STR_LENGTH.size
+    return data[offset : offset + length].decode(), offset + length
+
+
+def _read_records(path, offset, size, with_offsets=False, chunk_size=64 * 1024):
+    """Iterate over the complete records of a segment file from an offset, reading it in chunks.
+
+    With `with_offsets`, (record, offset of the end of the record) tuples are returned instead of the records.
+    """
+    with open(path, "rb") as segment_file:
+        segment_file.seek(offset)
+        remaining = size - offset
+        buffer = b""
+        position = 0
+        while True:
+            available = len(buffer) - position
+            if available < _LENGTH.size or available < _LENGTH.size + _LENGTH.unpack_from(buffer, position)[0]:
+                chunk = segment_file.read(min(chunk_size, remaining)) if remaining > 0 else b""
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            end = position + _LENGTH.size + _LENGTH.unpack_from(buffer, position)[0]
+            cursor = position + _LENGTH.size
+            timestamp = _TIMESTAMP.unpack_from(buffer, cursor)[0]
+            cursor += _TIMESTAMP.size
+            id_length = buffer[cursor]
+            cursor += 1
+            module_id = buffer[cursor : cursor + id_length].decode()
+            cursor += id_length
+            field = TRACKED_FIELDS[buffer[cursor]]
+            old, cursor = _decode_value(buffer, cursor + 1)
+            new, cursor = _decode_value(buffer, cursor)
+            offset += end - position
+            position = end
+            record = HomePlusJournalRecord(timestamp, module_id, field, old, new)
+            yield (record, offset) if with_offsets else record
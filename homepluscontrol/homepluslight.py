@@ -7,6 +7,8 @@ class HomePlusLight(HomePlusInteractiveModule):
     This class extends the HomePlusInteractiveModule base class.
     """
 
+    __slots__ = ()
+
     def __init__(self, plant, id, name, hw_type, device, bridge, fw="", type="", reachable=False):
         """HomePlusLight Constructor
 
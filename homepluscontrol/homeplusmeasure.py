@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from .homeplusconst import GET_MEASURE_URL
+
+""" Length in seconds of the intervals of the supported measurement scales. """
+MEASURE_SCALES = {
+    "5min": 300,
+    "30min": 1800,
+    "1hour": 3600,
+    "3hours": 10800,
+    "1day": 86400,
+    "1week": 604800,
+}
+
+DEFAULT_MEASURE_SCALE = "1hour"
+DEFAULT_MEASURE_TYPE = "sum_energy_elec"
+DEFAULT_CHUNK_SIZE = 1024  # Maximum number of values returned by a single request
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+
+
+class HomePlusMeasureError(Exception):
+    """Error occurred while retrieving the measurements of a module."""
+
+
+class HomePlusMeasureClient:
+    """Client of the historical measurements (e.g. the energy consumption) of the modules.
+
+    Time ranges are split into chunks of at most `chunk_size` intervals, aligned on multiples of the chunk length, and
+    the chunks that are not cached are requested concurrently, with at most `max_concurrent` requests in flight.
+
+    Intervals that have ended can no longer change, so the values of the completed intervals of every chunk are
+    cached and never requested again: once a range has been retrieved, subsequent calls only request the intervals
+    that were still open.
+
+    Attributes:
+        oauth_client (AbstractHomePlusOAuth2Async): Authentication client to make requests to the REST API.
+        scale (str): Scale of the measurements, i.e. the length of their intervals (see `MEASURE_SCALES`).
+        measure_type (str): Type of the measurements.
+        chunk_size (int): Maximum number of intervals requested at once.
+        max_concurrent (int): Maximum number of requests that can be in flight at the same time.
+        requests (int): Number of requests made to the API.
+    """
+
+    def __init__(
+        self,
+        oauth_client,
+        scale=DEFAULT_MEASURE_SCALE,
+        measure_type=DEFAULT_MEASURE_TYPE,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        max_concurrent=DEFAULT_MAX_CONCURRENT_REQUESTS,
+        clock=time.time,
+    ):
+        """HomePlusMeasureClient Constructor
+
+        Args:
+            oauth_client (AbstractHomePlusOAuth2Async): Authentication client to make requests to the REST API.
+            scale (str, optional): Scale of the measurements (see `MEASURE_SCALES`). Defaults to 1 hour.
+            measure_type (str, optional): Type of the measurements. Defaults to the consumed electrical energy.
+            chunk_size (int, optional): Maximum number of intervals requested at once.
+            max_concurrent (int, optional): Maximum number of requests that can be in flight at the same time.
+            clock (callable, optional): Function that returns the current time in seconds since the epoch.
+
+        Raises:
+            ValueError: If the scale is not supported.
+        """
+        if scale not in MEASURE_SCALES:
+            raise ValueError(f"Unsupported measurement scale {scale}, expected one of {', '.join(MEASURE_SCALES)}")
+        self.oauth_client = oauth_client
+        self.scale = scale
+        self.measure_type = measure_type
+        self.chunk_size = chunk_size
+        self.max_concurrent = max_concurrent
+        self.requests = 0
+        self._clock = clock
+        # Per module, the values and the time until which they are complete for every chunk that has been requested
+        self._cache = {}
+        self._semaphore = None
+
+    @property
+    def logger(self):
+        """Return logger of the measurement client."""
+        return logging.getLogger(__name__)
+
+    @property
+    def step(self):
+        """Return the length of an interval in seconds."""
+        return MEASURE_SCALES[self.scale]
+
+    async def get_measures(self, module, start, end=None):
+        """Return the measurements of a module over a time range.
+
+        Args:
+            module (HomePlusModule): Module whose measurements are requested. It must be controlled by a bridge.
+            start (float): Start of the range in seconds since the epoch.
+            end (float, optional): End of the range in seconds since the epoch. Defaults to now.
+
+        Returns:
+            list: List of (interval start, value) tuples in chronological order.
+
+        Raises:
+            HomePlusMeasureError: If the module is not controlled by a bridge, or the measurements could not be
+                                  retrieved.
+        """
+        if module.bridge is None:
+            raise HomePlusMeasureError(f"Module {module.id} has no bridge, so it has no measurements")
+        step = self.step
+        now = self._clock()
+        end = now if end is None else min(end, now)
+        # Intervals that start before this time have ended, so their values are final
+        open_start = now - now % step
+        chunk_length = step * self.chunk_size
+        chunks = self._cache.setdefault(module.id, {})
+
+        chunk_starts = []
+        fetches = []
+        chunk_start = start - start % chunk_length
+        while chunk_start < end:
+            chunk_starts.append(chunk_start)
+            chunk_end = min(chunk_start + chunk_length, end)
+            chunk = chunks.get(chunk_start)
+            complete_until = chunk_start if chunk is None else chunk[0]
+            if complete_until < chunk_end:
+                fetches.append((chunk_start, complete_until, chunk_end))
+            chunk_start += chunk_length
+
+        transient = {}
+        if fetches:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            results = await asyncio.gather(*[self._fetch(module, begin, fetch_end) for _, begin, fetch_end in fetches])
+            for (chunk_start, _, fetch_end), values in zip(fetches, results):
+                chunk = chunks.get(chunk_start)
+                if chunk is None:
+                    chunk = chunks[chunk_start] = [chunk_start, {}]
+                # Only the intervals that have ended and were fully requested are final
+                complete_until = chunk[0] = max(chunk[0], min(fetch_end - fetch_end % step, open_start))
+                for timestamp, value in values.items():
+                    if timestamp < complete_until:
+                        chunk[1][timestamp] = value
+                    else:
+                        transient[timestamp] = value
+
+        result = [item for item in transient.items() if start <= item[0] < end]
+        for chunk_start in chunk_starts:
+            chunk = chunks.get(chunk_start)
+            if chunk is not None:
+                result.extend(item for item in chunk[1].items() if start <= item[0] < end)
+        return sorted(result)
+
+    async def _fetch(self, module, begin, end):
+        """Request the measurements of a module between two times.
+
+        Returns:
+            dict: Dictionary of the values keyed by the start time of their interval.
+        """
+        params = {
+            "device_id": module.bridge,
+            "module_id": module.id,
+            "scale": self.scale,
+            "type": self.measure_type,
+            "date_begin": int(begin),
+            "date_end": int(end),
+            "optimize": "false",
+            "real_time": "true",
+        }
+        oauth_client = self.oauth_client
+        async with self._semaphore:
+            self.requests += 1
+            try:
+                response = await oauth_client.get_request(GET_MEASURE_URL, params)
+                response_body = await oauth_client.response_json(response)
+            except aiohttp.ClientError as err:
+                raise HomePlusMeasureError(f"Error retrieving the measurements of module {module.id}") from err
+        self.logger.debug("Obtained measurements of module %s from API: %s", module.id, response_body)
+        return {int(timestamp): value[0] for timestamp, value in response_body.get("body", {}).items() if value}
@@ -3,6 +3,7 @@ import logging
 import aiohttp
 
 from .homeplusconst import HOMES_STATUS_URL
+from .homepluspayload import HomePlusModuleStatus
 
 
 class HomePlusModule:
@@ -20,6 +21,11 @@ class HomePlusModule:
         statusUrl (str): URL of the API endpoint that returns the status of the home modules
     """
 
+    __slots__ = ("plant", "id", "name", "hw_type", "device", "reachable", "fw", "type", "bridge", "_slot")
+
+    statusUrl = HOMES_STATUS_URL
+    """ URL of the API endpoint that returns the status of the home modules. """
+
     def __init__(self, plant, id, name, hw_type, device, bridge, fw="", type="", reachable=False):
         """HomePlusModule Constructor
 
@@ -43,7 +49,7 @@ class HomePlusModule:
         self.fw = fw
         self.type = type
         self.bridge = bridge
-        self.statusUrl = HOMES_STATUS_URL
+        self._slot = None
 
     def __str__(self):
         """Return the string representing this module"""
@@ -58,10 +64,35 @@ class HomePlusModule:
         """Update the internal state of the module from the input JSON data.
 
         Args:
-            module_data (json): JSON data of the module state
+            module_data (json): JSON data of the module state, either as returned by the API or already decoded
+                                into a `HomePlusModuleStatus`
+        """
+        if not isinstance(module_data, HomePlusModuleStatus):
+            module_data = HomePlusModuleStatus.from_dict(module_data)
+        self._update_state(module_data)
+        self._store_state()
+
+    def _update_state(self, module_status):
+        """Update the internal state of the module from its decoded status.
+
+        Subclasses extend this method to extract the status fields that are specific to them.
+
+        Args:
+            module_status (HomePlusModuleStatus): Decoded status of the module
         """
-        self.reachable = module_data.get("reachable") is True
-        self.fw = module_data.get("firmware_revision")
+        self.reachable = module_status.reachable is True
+        self.fw = module_status.firmware_revision
+
+    def _store_state(self):
+        """Write the state of the module into the state store of its plant, if it is registered in one, update the
+        power aggregates of the plant and discard the digest of the plant's last module status, which may no longer
+        match the state of the module."""
+        plant = self.plant
+        if self._slot is not None:
+            plant.state_store.write(self)
+        if plant is not None:
+            plant.power_aggregates.update(self)
+            plant._module_status_digest = None
 
     async def get_status_update(self):
         """Get the current status of the module by calling the corresponding API method.
@@ -75,7 +106,7 @@ class HomePlusModule:
         except aiohttp.ClientResponseError:
             self.logger.error("HTTP client response error when update module status")
         else:
-            response_body = await response.json()
+            response_body = await oauth_client.response_json(response)
             all_module_status = response_body["body"]["home"]["modules"]
             module_data = {}
             for module in all_module_status:
@@ -0,0 +1,297 @@
+def _no_intern(value):
+    return value
+
+
+class HomePlusModuleInfo:
+    """Topology information of a module, as extracted from the `homesdata` payload.
+
+    Attributes:
+        id (str): Unique identifier of the module.
+        type (str): Hardware/product type of the module (NLP, NLT, NLF...).
+        name (str): Name of the module.
+        bridge (str): Unique identifier of the bridge that controls this module, if any.
+        appliance_type (str): Additional type information of the module, if any.
+    """
+
+    __slots__ = ("id", "type", "name", "bridge", "appliance_type")
+
+    def __init__(self, id, type, name, bridge=None, appliance_type=None):
+        """HomePlusModuleInfo Constructor
+
+        Args:
+            id (str): Unique identifier of the module.
+            type (str): Hardware/product type of the module (NLP, NLT, NLF...).
+            name (str): Name of the module.
+            bridge (str, optional): Unique identifier of the bridge that controls this module. Defaults to None.
+            appliance_type (str, optional): Additional type information of the module. Defaults to None.
+        """
+        self.id = id
+        self.type = type
+        self.name = name
+        self.bridge = bridge
+        self.appliance_type = appliance_type
+
+    @classmethod
+    def from_dict(cls, module, intern=None):
+        """Extract the topology information of a module from its JSON structure.
+
+        Args:
+            module (dict): Dictionary representing the JSON structure of a module as returned by the API.
+            intern (HomePlusInternTable, optional): Table used to share the instances of the repeated strings.
+        """
+        if intern is None:
+            intern = _no_intern
+        return cls(
+            intern(module["id"]),
+            intern(module["type"]),
+            intern(module["name"]),
+            intern(module.get("bridge")),
+            intern(module.get("appliance_type")),
+        )
+
+
+class HomePlusHomeInfo:
+    """Information of a home, as extracted from the `homesdata` payload.
+
+    Attributes:
+        id (str): Unique identifier of the home.
+        name (str): Name of the home.
+        country (str): Two-letter country code where the home is located.
+        modules (list): List of `HomePlusModuleInfo` of the modules in the home.
+    """
+
+    __slots__ = ("id", "name", "country", "modules")
+
+    def __init__(self, id, name, country, modules):
+        """HomePlusHomeInfo Constructor
+
+        Args:
+            id (str): Unique identifier of the home.
+            name (str): Name of the home.
+            country (str): Two-letter country code where the home is located.
+            modules (list): List of `HomePlusModuleInfo` of the modules in the home.
+        """
+        self.id = id
+        self.name = name
+        self.country = country
+        self.modules = modules
+
+    @classmethod
+    def from_dict(cls, home_data, intern=None):
+        """Extract the information of a home from its JSON structure.
+
+        Args:
+            home_data (dict): Dictionary representing the JSON structure of the home as returned by the API.
+            intern (HomePlusInternTable, optional): Table used to share the instances of the repeated strings.
+        """
+        if intern is None:
+            intern = _no_intern
+        module_from_dict = HomePlusModuleInfo.from_dict
+        return cls(
+            intern(home_data.get("id")),
+            home_data.get("name", "UNKNOWN"),
+            intern(home_data.get("country", "XX")),
+            [module_from_dict(m, intern) for m in home_data.get("modules", [])],
+        )
+
+
+class HomePlusRoom:
+    """Room of a home, as extracted from the `homesdata` payload.
+
+    Attributes:
+        id (str): Unique identifier of the room.
+        name (str): Name of the room.
+        type (str): Type of the room (bedroom, kitchen...).
+        module_ids (tuple): Unique identifiers of the modules in the room.
+    """
+
+    __slots__ = ("id", "name", "type", "module_ids")
+
+    def __init__(self, id, name, type, module_ids=()):
+        """HomePlusRoom Constructor
+
+        Args:
+            id (str): Unique identifier of the room.
+            name (str): Name of the room.
+            type (str): Type of the room (bedroom, kitchen...).
+            module_ids (iterable, optional): Unique identifiers of the modules in the room.
+        """
+        self.id = id
+        self.name = name
+        self.type = type
+        self.module_ids = tuple(module_ids)
+
+    @classmethod
+    def from_dict(cls, room, intern=None):
+        """Extract a room from its JSON structure.
+
+        Args:
+            room (dict): Dictionary representing the JSON structure of a room as returned by the API.
+            intern (HomePlusInternTable, optional): Table used to share the instances of the repeated strings.
+        """
+        if intern is None:
+            intern = _no_intern
+        return cls(
+            intern(room["id"]),
+            room.get("name"),
+            intern(room.get("type")),
+            [intern(module_id) for module_id in room.get("module_ids", [])],
+        )
+
+
+class HomePlusSchedule:
+    """Schedule of a home, as extracted from the `homesdata` payload.
+
+    The timetable and zones are kept as returned by the API, since their structure depends on the type of schedule.
+
+    Attributes:
+        id (str): Unique identifier of the schedule.
+        name (str): Name of the schedule.
+        type (str): Type of the schedule (event, electricity...).
+        selected (bool): True if the schedule is selected.
+        default (bool): True if the schedule is the default one.
+        timetable (list): Timetable of the schedule.
+        zones (list): Zones referenced by the timetable.
+    """
+
+    __slots__ = ("id", "name", "type", "selected", "default", "timetable", "zones")
+
+    def __init__(self, id, name, type, selected=False, default=False, timetable=(), zones=()):
+        """HomePlusSchedule Constructor
+
+        Args:
+            id (str): Unique identifier of the schedule.
+            name (str): Name of the schedule.
+            type (str): Type of the schedule (event, electricity...).
+            selected (bool, optional): True if the schedule is selected. Defaults to False.
+            default (bool, optional): True if the schedule is the default one. Defaults to False.
+            timetable (list, optional): Timetable of the schedule.
+            zones (list, optional): Zones referenced by the timetable.
+        """
+        self.id = id
+        self.name = name
+        self.type = type
+        self.selected = selected
+        self.default = default
+        self.timetable = timetable
+        self.zones = zones
+
+    @classmethod
+    def from_dict(cls, schedule, intern=None):
+        """Extract a schedule from its JSON structure.
+
+        Args:
+            schedule (dict): Dictionary representing the JSON structure of a schedule as returned by the API.
+            intern (HomePlusInternTable, optional): Table used to share the instances of the repeated strings.
+        """
+        if intern is None:
+            intern = _no_intern
+        return cls(
+            intern(schedule["id"]),
+            schedule.get("name"),
+            intern(schedule.get("type")),
+            schedule.get("selected", False),
+            schedule.get("default", False),
+            schedule.get("timetable", []),
+            schedule.get("zones", []),
+        )
+
+
+class HomePlusModuleStatus:
+    """Status of a module, as extracted from the `homestatus` payload.
+
+    Only the fields that are used by the module classes are extracted. Fields that are absent from the payload are
+    set to None, except `power` which defaults to 0.
+
+    Attributes:
+        id (str): Unique identifier of the module.
+        reachable (bool): True if the module is reachable.
+        firmware_revision (int): Firmware revision of the module.
+        on (bool): True if the module is on (plugs and lights).
+        power (int): Power consumption of the module in watts (plugs and lights).
+        battery_state (str): State of charge of the module's battery (remotes).
+        battery_level (int): Level of the module's battery (remotes).
+        current_position (int): Current position of the module (automations).
+    """
+
+    __slots__ = (
+        "id",
+        "reachable",
+        "firmware_revision",
+        "on",
+        "power",
+        "battery_state",
+        "battery_level",
+        "current_position",
+    )
+
+    def __init__(
+        self,
+        id,
+        reachable=None,
+        firmware_revision=None,
+        on=None,
+        power=0,
+        battery_state=None,
+        battery_level=None,
+        current_position=None,
+    ):
+        """HomePlusModuleStatus Constructor
+
+        Args:
+            id (str): Unique identifier of the module.
+            reachable (bool, optional): True if the module is reachable.
+            firmware_revision (int, optional): Firmware revision of the module.
+            on (bool, optional): True if the module is on.
+            power (int, optional): Power consumption of the module in watts. Defaults to 0.
+            battery_state (str, optional): State of charge of the module's battery.
+            battery_level (int, optional): Level of the module's battery.
+            current_position (int, optional): Current position of the module.
+        """
+        self.id = id
+        self.reachable = reachable
+        self.firmware_revision = firmware_revision
+        self.on = on
+        self.power = power
+        self.battery_state = battery_state
+        self.battery_level = battery_level
+        self.current_position = current_position
+
+    @classmethod
+    def from_dict(cls, module_data, intern=None):
+        """Extract the status of a module from its JSON structure.
+
+        Args:
+            module_data (dict): Dictionary representing the JSON structure of a module's status as returned by the API.
+            intern (HomePlusInternTable, optional): Table used to share the instances of the repeated strings.
+        """
+        if intern is None:
+            intern = _no_intern
+        get = module_data.get
+        return cls(
+            intern(get("id")),
+            get("reachable"),
+            intern(get("firmware_revision")),
+            get("on"),
+            get("power", 0),
+            intern(get("battery_state")),
+            get("battery_level"),
+            get("current_position"),
+        )
+
+
+def decode_module_status(input_module_status, intern=None):
+    """Decode the list of module status structures of a home in a single pass.
+
+    Entries that are already decoded are kept as they are.
+
+    Args:
+        input_module_status (list): List of dictionaries representing the JSON structure of the home's module status as
+                                    returned by the API.
+        intern (HomePlusInternTable, optional): Table used to share the instances of the repeated strings.
+
+    Returns:
+        list: List of `HomePlusModuleStatus`.
+    """
+    from_dict = HomePlusModuleStatus.from_dict
+    return [m if isinstance(m, HomePlusModuleStatus) else from_dict(m, intern) for m in input_module_status]
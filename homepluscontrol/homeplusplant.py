@@ -1,16 +1,28 @@
+import hashlib
 import json
 import logging
+import re
+import time
 
 import aiohttp
 
 from .homeplusconst import HOMES_DATA_URL, HOMES_STATUS_URL, PRODUCT_TYPES
 from .authentication import AbstractHomePlusOAuth2Async
+from .homeplusaggregate import HomePlusPowerAggregates
+from .homepluseventbus import TRACKED_FIELDS, HomePlusModuleChange
+from .homeplusinteractivemodule import HomePlusInteractiveModule
 from .homeplusmodule import HomePlusModule
+from .homepluspayload import HomePlusHomeInfo, HomePlusRoom, HomePlusSchedule, decode_module_status
+from .homepluspowerhistory import HomePlusPowerHistory
+from .homeplusretention import DEFAULT_RETENTION_POLICY
 from .homepluslight import HomePlusLight
 from .homeplusplug import HomePlusPlug
 from .homeplusremote import HomePlusRemote
 from .homeplusautomation import HomePlusAutomation
 
+# Per-response metadata that changes on every call even when the status of the modules does not
+_VOLATILE_STATUS_FIELDS = re.compile(rb'"time_(?:server|exec)"\s*:\s*[0-9.]+')
+
 MODULE_CLASSES = {
     "light": HomePlusLight,
     "plug": HomePlusPlug,
@@ -28,11 +40,40 @@ class HomePlusPlant:
         country (str): Two-letter country code where the home is located.
         oauth_client (AbstractHomePlusOAuth2Async): Authentication client to make requests to the REST API.
         modules (dict): Dictionary containing the information of all modules in the home.
-        home_data (dict): JSON representation of the home's data as returned by the API
-        module_status (dict): JSON representation of the home modules' status as returned by the API
+        home_data (dict): JSON representation of the home's data as returned by the API, limited to the keys retained
+                          by the retention policy
+        module_status (list): Status of the home modules as returned by the API, decoded into `HomePlusModuleStatus`.
+                              Empty if the retention policy does not retain it.
+        raw_module_status (list): JSON representation of the home modules' status as returned by the API. Only
+                                  retained if the retention policy says so, None otherwise.
+        retention_policy (HomePlusRetentionPolicy): Policy that decides which parts of the payloads are retained
+        event_bus (HomePlusEventBus): Event bus where the changes in the state of the modules are published
+        state_store (HomePlusStateStore): Column-oriented store where the state of the modules is written
+        intern_table (HomePlusInternTable): Table used to share the instances of the strings repeated in the payloads
+        module_index (HomePlusModuleIndex): Index where the modules of the home are registered
+        power_aggregates (HomePlusPowerAggregates): Running power aggregates where the modules of the home contribute
+        power_history_size (int): Number of power samples kept per interactive module, or None to keep no history
+        rollup_engine (HomePlusRollupEngine): Engine that maintains the power rollups of the interactive modules
+        journal (HomePlusJournal): Journal where the changes in the state of the modules are appended
+        status_cache_hits (int): Number of module status responses that were skipped because they were unchanged
+        status_cache_misses (int): Number of module status responses that had to be parsed
     """
 
-    def __init__(self, id, home_data, oauth_client: AbstractHomePlusOAuth2Async):
+    def __init__(
+        self,
+        id,
+        home_data,
+        oauth_client: AbstractHomePlusOAuth2Async,
+        event_bus=None,
+        state_store=None,
+        intern_table=None,
+        retention_policy=None,
+        module_index=None,
+        power_aggregates=None,
+        power_history_size=None,
+        rollup_engine=None,
+        journal=None,
+    ):
         """HomePlusPlant Constructor
 
         Args:
@@ -40,14 +81,53 @@ class HomePlusPlant:
             home_data (dict): JSON representation of the home's data as returned by the API.
             country (str): Two-letter country code where the home is located.
             oauth_client (AbstractHomePlusOAuth2Async): Authentication client to make request to the REST API.
+            event_bus (HomePlusEventBus, optional): Event bus where the changes in the state of the modules are
+                                                    published. Defaults to None.
+            state_store (HomePlusStateStore, optional): Column-oriented store where the state of the modules is
+                                                        written. Defaults to None.
+            intern_table (HomePlusInternTable, optional): Table used to share the instances of the strings repeated
+                                                          in the payloads. Defaults to None.
+            retention_policy (HomePlusRetentionPolicy, optional): Policy that decides which parts of the payloads are
+                                                                  retained after parsing. Defaults to retaining the
+                                                                  complete home data and the decoded module status.
+            module_index (HomePlusModuleIndex, optional): Index where the modules of the home are registered.
+                                                          Defaults to None.
+            power_aggregates (HomePlusPowerAggregates, optional): Running power aggregates, possibly shared with other
+                                                                  homes, where the modules of the home contribute.
+                                                                  Defaults to aggregates of this home alone.
+            power_history_size (int, optional): Number of power samples kept in the ring buffer of each interactive
+                                                module. Defaults to None, i.e. no history is kept.
+            rollup_engine (HomePlusRollupEngine, optional): Engine, possibly shared with other homes, that maintains
+                                                            the power rollups of the interactive modules. Defaults to
+                                                            None.
+            journal (HomePlusJournal, optional): Journal, possibly shared with other homes, where the changes in the
+                                                 state of the modules are appended. Defaults to None.
         """
         self.id = id
         self.oauth_client = oauth_client
+        self.event_bus = event_bus
+        self.state_store = state_store
+        self.intern_table = intern_table
+        self.module_index = module_index
+        self.power_aggregates = HomePlusPowerAggregates() if power_aggregates is None else power_aggregates
+        self.power_history_size = power_history_size
+        self.rollup_engine = rollup_engine
+        self.journal = journal
+        self.retention_policy = DEFAULT_RETENTION_POLICY if retention_policy is None else retention_policy
         self.modules = {}
         self.module_status = json.loads("[ ]")
+        self.raw_module_status = None
+        self.status_cache_hits = 0
+        self.status_cache_misses = 0
+        self._module_status_digest = None
+        self._topology_fingerprint = None
+        # Views of the rooms and schedules, parsed on first access
+        self._rooms = None
+        self._module_rooms = None
+        self._schedules = None
 
         self._set_home_data(home_data)
-        self._parse_home_data(home_data)
+        self._parse_home_data_if_changed(home_data)
 
     def __str__(self):
         """Return the string representing this home"""
@@ -58,6 +138,73 @@ class HomePlusPlant:
         """Return logger of the home."""
         return logging.getLogger(__name__)
 
+    @property
+    def rooms(self):
+        """Return the rooms of the home.
+
+        The rooms are parsed from the home data the first time they are accessed after a change in the home's
+        topology, so they are only available if the retention policy retains the `rooms` key of the home data.
+
+        Returns:
+            dict: Dictionary of `HomePlusRoom` keyed by their unique identifier.
+        """
+        if self._rooms is None:
+            self._parse_rooms()
+        return self._rooms
+
+    @property
+    def schedules(self):
+        """Return the schedules of the home.
+
+        The schedules are parsed from the home data the first time they are accessed after a change in the home's
+        topology, so they are only available if the retention policy retains the `schedules` key of the home data.
+
+        Returns:
+            dict: Dictionary of `HomePlusSchedule` keyed by their unique identifier.
+        """
+        if self._schedules is None:
+            intern = self.intern_table
+            self._schedules = {
+                schedule.id: schedule
+                for schedule in (HomePlusSchedule.from_dict(s, intern) for s in self.home_data.get("schedules", []))
+            }
+        return self._schedules
+
+    def get_room_modules(self, room_id):
+        """Return the modules of a room.
+
+        Args:
+            room_id (str): Unique identifier of the room.
+
+        Returns:
+            list: List of the modules of the room that are part of the home, empty if the room is unknown.
+        """
+        room = self.rooms.get(room_id)
+        if room is None:
+            return []
+        return [self.modules[module_id] for module_id in room.module_ids if module_id in self.modules]
+
+    def get_module_room(self, module_id):
+        """Return the room of a module, or None if the module is not in any room.
+
+        Args:
+            module_id (str): Unique identifier of the module.
+
+        Returns:
+            HomePlusRoom: Room of the module.
+        """
+        if self._module_rooms is None:
+            self._parse_rooms()
+        return self._module_rooms.get(module_id)
+
+    def get_power_aggregate(self):
+        """Return the running power aggregate of the modules of the home.
+
+        Returns:
+            HomePlusPowerAggregate: Total power, number of modules that are on and maximum power of the home.
+        """
+        return self.power_aggregates.home(self.id)
+
     async def update_home_data(self, input_home_data=None):
         """Method that optionally refreshes the home's topology information through an API call
         and then parses the modules contained in that topology into the object's inner map.
@@ -70,11 +217,14 @@ class HomePlusPlant:
         """
         if input_home_data is None:
             new_home_data = await self._refresh_home_data()
+            if new_home_data is None:
+                # The home data could not be refreshed, so the modules are kept as they are
+                return
         else:
             new_home_data = input_home_data
 
         self._set_home_data(new_home_data)
-        self._parse_home_data(new_home_data)
+        self._parse_home_data_if_changed(new_home_data)
 
     async def update_module_status(self, input_module_status=None):
         """Method that optionally refreshes the information of the modules' status through an API call
@@ -90,10 +240,18 @@ class HomePlusPlant:
         """
         if input_module_status is None:
             new_module_status = await self._refresh_module_status()
+            if new_module_status is None:
+                # The status could not be refreshed or is identical to the previous one, so the modules are kept as
+                # they are
+                return
         else:
             new_module_status = input_module_status
 
+        # Storing the parsed states in the modules resets the digest of the last status, so it is restored afterwards
+        # when the parsed status is the one it was computed from
+        digest = self._module_status_digest if input_module_status is None else None
         self._parse_module_status(new_module_status)
+        self._module_status_digest = digest
 
     async def update_home_data_and_modules(self, input_home_data=None, input_module_status=None):
         """Convenience method that calls the `update_home_data` and `update_modules_status` methods in sequence so as
@@ -118,28 +276,41 @@ class HomePlusPlant:
         """
         self.name = input_home_data.get("name", "UNKNOWN")
         self.country = input_home_data.get("country", "XX")
-        self.home_data = input_home_data
+        self.home_data = self.retention_policy.retain_home_data(input_home_data)
+
+    def _parse_rooms(self):
+        """Parse the rooms of the retained home data and index them by the modules they contain."""
+        intern = self.intern_table
+        rooms = {}
+        module_rooms = {}
+        for room_data in self.home_data.get("rooms", []):
+            room = HomePlusRoom.from_dict(room_data, intern)
+            rooms[room.id] = room
+            for module_id in room.module_ids:
+                module_rooms[module_id] = room
+        self._rooms = rooms
+        self._module_rooms = module_rooms
 
     async def _refresh_home_data(self):
         """Makes a call to the API to refresh the information of the home into attribute `home_data`.
 
-        At this time, the home topology is only used to extract the module data.
-        TODO: Handle rooms/schedules
+        The home topology is used to extract the module data, while the rooms and schedules are only parsed when
+        they are accessed (see `rooms` and `schedules`).
 
         Returns:
-            dict: Dictionary representing the JSON structure of the home as returned by the API.
+            dict: Dictionary representing the JSON structure of the home as returned by the API or None if it could
+                  not be refreshed.
         """
-        new_home_data = self.home_data
+        new_home_data = None
         try:
             response = await self.oauth_client.get_request(HOMES_DATA_URL)
         except aiohttp.ClientResponseError:
             self.logger.error("HTTP client response error when refreshing home's data")
         else:
-            response_body = await response.json()
+            response_body = await self.oauth_client.response_json(response)
             for home_data in response_body["body"]["homes"]:
                 if home_data["id"] == self.id:
                     new_home_data = home_data
-                    self.home_data = new_home_data
         return new_home_data
 
     async def _refresh_module_status(self):
@@ -147,22 +318,72 @@ class HomePlusPlant:
         The module status provides information about the modules current status, eg. reachability, on/off,
         battery, consumption.
 
-        TODO: Handle consumptions
+        The historical consumptions of the modules are retrieved separately, with `HomePlusMeasureClient`.
+
+        The raw response is hashed (ignoring the server timestamps) and, if it is byte-identical to the previous one,
+        it is not decoded at all. The digest of the previous response is discarded whenever the state of a module is
+        changed by any other means, e.g. a command, so that the next response is parsed and the local change
+        corrected by the state reported by the API. The power of the modules is still sampled when the response is
+        not decoded (see `_carry_power_forward()`).
 
         Returns:
-            dict: Dictionary representing the JSON structure of the home's module status as returned by the API.
+            list: Status of the home's modules as returned by the API, decoded into `HomePlusModuleStatus`, or None if
+                  it could not be refreshed or has not changed since the last refresh.
         """
-        new_module_status = self.module_status
+        new_module_status = None
         try:
             response = await self.oauth_client.get_request(HOMES_STATUS_URL, {"home_id": self.id})
         except aiohttp.ClientResponseError:
             self.logger.error("HTTP client response error when refreshing module status")
         else:
-            response_body = await response.json()
-            new_module_status = response_body["body"]["home"]["modules"]
-            self.module_status = new_module_status
+            raw_body = await response.read()
+            digest = hashlib.blake2b(_VOLATILE_STATUS_FIELDS.sub(b"", raw_body), digest_size=16).digest()
+            if digest == self._module_status_digest:
+                self.status_cache_hits += 1
+                self._carry_power_forward()
+                return None
+            self.status_cache_misses += 1
+            response_body = self.oauth_client.json_codec.loads(raw_body)
+            raw_module_status = response_body["body"]["home"]["modules"]
+            new_module_status = decode_module_status(raw_module_status, self.intern_table)
+            if self.retention_policy.module_status:
+                self.module_status = new_module_status
+            if self.retention_policy.raw_module_status:
+                self.raw_module_status = raw_module_status
+            self._module_status_digest = digest
         return new_module_status
 
+    def _carry_power_forward(self):
+        """Add the last known power of the interactive modules to their power history and rollup as a new sample.
+
+        This is called when the module status has not changed since the last refresh, so that the modules are sampled
+        on every refresh: the statistics of their power history are weighted by time rather than by changes, and every
+        rollup bucket gets the samples and the energy of its own time span.
+        """
+        if not self.power_history_size and self.rollup_engine is None:
+            return
+        now = time.time()
+        for module in self.modules.values():
+            if isinstance(module, HomePlusInteractiveModule):
+                module._sample_power(now)
+
+    def _parse_home_data_if_changed(self, input_home_data):
+        """Parse the home data only if the structure of the home's modules has changed since the last time.
+
+        Args:
+            input_home_data (dict): Dictionary representing the JSON structure of the home as returned by the API.
+
+        Returns:
+            bool: True if the home data was parsed; False if the topology was unchanged.
+        """
+        fingerprint = topology_fingerprint(input_home_data)
+        if fingerprint == self._topology_fingerprint:
+            return False
+        self._rooms = self._module_rooms = self._schedules = None
+        self._parse_home_data(input_home_data)
+        self._topology_fingerprint = fingerprint
+        return True
+
     def _parse_home_data(self, input_home_data):
         """Auxiliary method to parse the home data returned by the API.
 
@@ -171,8 +392,8 @@ class HomePlusPlant:
         """
         # Extract the home's modules from the topology data structure.
         flat_modules = {}
-        for module in input_home_data.get("modules", []):
-            flat_modules[module["id"]] = module
+        for module in HomePlusHomeInfo.from_dict(input_home_data, self.intern_table).modules:
+            flat_modules[module.id] = module
 
         input_module_ids = set(flat_modules)
         current_module_ids = set(self.modules)
@@ -185,7 +406,7 @@ class HomePlusPlant:
             self._update_module(flat_modules[update_module_id])
         # Modules no longer there
         for delete_module_id in current_module_ids.difference(input_module_ids):
-            self.modules.pop(delete_module_id, None)
+            self._remove_module(delete_module_id)
 
     def _parse_module_status(self, input_module_status):
         """Auxiliary method to parse the module status data returned by the API.
@@ -193,58 +414,210 @@ class HomePlusPlant:
         It is assumed that the home topology is up to date - this method will only search for the module status
         of those modules that have been parsed in the topology data.
 
+        If there is an active event bus, the changes in the tracked fields of each module are published in it, and if
+        there is a journal, they are appended to it.
+
         Args:
             input_module_status (dict): Dictionary representing the JSON structure of the home's module status as returned
                                         by the API.
         """
+        # Only compute the module deltas when somebody is listening or they are journaled
+        event_bus = self.event_bus
+        if event_bus is not None and not event_bus.active:
+            event_bus = None
+        journal = self.journal
+        track_changes = event_bus is not None or journal is not None
+        module_index = self.module_index
+        changes = []
+
         # With the modules identified in the module_status information,
         # we update their status into the modules map of this home object
         input_module_ids = set()
 
-        for m_json in input_module_status:
-            module_id = m_json["id"]
+        for m_status in decode_module_status(input_module_status, self.intern_table):
+            module_id = m_status.id
             input_module_ids.add(module_id)
-            if module_id in self.modules:
-                self.modules[module_id].update_state(m_json)
+            module = self.modules.get(module_id)
+            if module is not None:
+                before = _tracked_state(module) if track_changes else None
+                reachable = module.reachable
+                module.update_state(m_status)
+                if before is not None:
+                    self._collect_changes(changes, module, before)
+                if module_index is not None and module.reachable is not reachable:
+                    module_index.update(module)
 
         # Check whether any existing modules in the topology have no module status info
         # and if that is the case, then we mark them as unreachable
         for existing_id in set(self.modules).difference(input_module_ids):
-            self.modules[existing_id].reachable = False
+            module = self.modules[existing_id]
+            before = _tracked_state(module) if track_changes else None
+            module.reachable = False
+            module._store_state()
+            if before is not None:
+                self._collect_changes(changes, module, before)
+            if module_index is not None:
+                module_index.update(module)
+
+        if changes:
+            timestamp = time.time()
+            for module, module_changes in changes:
+                event = HomePlusModuleChange(self.id, module.id, module.device, module_changes, timestamp)
+                if journal is not None:
+                    journal.append_change(event)
+                if event_bus is not None:
+                    event_bus.publish(event)
+            if journal is not None:
+                # The changes of the cycle are written as one batch by the journal's writer thread
+                journal.write_pending()
+
+    @staticmethod
+    def _collect_changes(changes, module, before):
+        """Append the changes of the tracked fields of a module, if any, to the list of changes.
+
+        Args:
+            changes (list): List of (module, changes dictionary) tuples.
+            module (HomePlusModule): Module that may have changed.
+            before (tuple): Values of the tracked fields of the module before the update.
+        """
+        after = _tracked_state(module)
+        if after != before:
+            changes.append(
+                (
+                    module,
+                    {
+                        field: (old, new)
+                        for field, old, new in zip(TRACKED_FIELDS, before, after)
+                        if old != new
+                    },
+                )
+            )
 
     def _create_module(self, input_module):
         """'Factory' method of specific Home+ Control modules depending on their type that adds the new module
         to the attribute `modules`.
 
         Args:
-            input_module (dict): Dictionary representing the JSON structure of a module as returned by the API.
+            input_module (HomePlusModuleInfo): Topology information of the module as returned by the API.
         """
-        module_product_type = PRODUCT_TYPES.get(input_module["type"])
+        module_product_type = PRODUCT_TYPES.get(input_module.type)
         module_class = MODULE_CLASSES.get(module_product_type, HomePlusModule)
+        # The new module has no status yet, so the next module status response must be parsed
+        self._module_status_digest = None
 
-        self.modules[input_module["id"]] = module_class(
+        # The module may be replacing an existing one of a different type
+        self._remove_module(input_module.id)
+        new_module = module_class(
             plant=self,
-            id=input_module["id"],
+            id=input_module.id,
             device=module_product_type,
-            name=input_module["name"],
-            hw_type=input_module["type"],
-            type=input_module.get("appliance_type"),
-            bridge=input_module.get("bridge"),
+            name=input_module.name,
+            hw_type=input_module.type,
+            type=input_module.appliance_type,
+            bridge=input_module.bridge,
         )
+        if isinstance(new_module, HomePlusInteractiveModule):
+            if self.power_history_size:
+                new_module.power_history = HomePlusPowerHistory(self.power_history_size)
+            if self.rollup_engine is not None:
+                new_module.power_rollup = self.rollup_engine.register(new_module)
+        self.modules[input_module.id] = new_module
+        if self.state_store is not None:
+            self.state_store.register(new_module)
+        if self.module_index is not None:
+            self.module_index.add(new_module)
+        self.power_aggregates.add(new_module)
+
+    def _remove_module(self, module_id):
+        """Remove a module from the attribute `modules`, releasing its slot in the state store and removing it from
+        the module index.
+
+        Args:
+            module_id (str): Unique identifier of the module.
+        """
+        old_module = self.modules.pop(module_id, None)
+        if old_module is not None:
+            self._detach_module(old_module)
+
+    def _detach_module(self, module):
+        """Release the slot of a module in the state store and remove it from the module index, the aggregates and
+        the rollup engine.
+
+        Args:
+            module (HomePlusModule): Module that is no longer part of the home.
+        """
+        if self.state_store is not None:
+            self.state_store.release(module)
+        if self.module_index is not None:
+            self.module_index.remove(module)
+        self.power_aggregates.remove(module)
+        if self.rollup_engine is not None:
+            self.rollup_engine.release(module)
+
+    def _detach_modules(self):
+        """Detach all the modules of a home that is no longer present, without removing them from `modules`."""
+        for module in self.modules.values():
+            self._detach_module(module)
 
     def _update_module(self, input_module):
         """Update the information of an existing module instance in the home, based on the latest input data.
 
         Args:
-            input_module (dict): Dictionary representing the JSON structure of a module as returned by the API. This
-                                 contains the latest module data that will be updated into the existing module instance.
+            input_module (HomePlusModuleInfo): Topology information of the module as returned by the API. This
+                                               contains the latest module data that will be updated into the existing
+                                               module instance.
         """
-        u_module = self.modules[input_module["id"]]
+        u_module = self.modules[input_module.id]
 
         # If the device type has changed, then we have to re-create the object of the correct class
         # This should not really happen if the IDs in the Legrand platform are really unique.
-        if input_module["type"] != u_module.hw_type:
+        if input_module.type != u_module.hw_type:
             self._create_module(input_module)
         else:
-            u_module.name = input_module["name"]
-            u_module.bridge = input_module.get("bridge")
+            u_module.name = input_module.name
+            u_module.bridge = input_module.bridge
+            if self.module_index is not None:
+                self.module_index.update(u_module)
+            self.power_aggregates.update(u_module)
+
+
+def _tracked_state(module):
+    """Return the values of the tracked fields of a module, with None for those that do not apply to it."""
+    return tuple(getattr(module, field, None) for field in TRACKED_FIELDS)
+
+
+def topology_fingerprint(home_data):
+    """Return a fingerprint of the structure of the modules, rooms and schedules of a home.
+
+    The fingerprint covers every module attribute that is used when parsing the home data (identifier, product type,
+    name, bridge and appliance type), so two home data structures with the same fingerprint produce the same modules.
+    It also covers the rooms and the schedules, so that their views are parsed again when they change.
+
+    Args:
+        home_data (dict): Dictionary representing the JSON structure of the home as returned by the API.
+
+    Returns:
+        int: Fingerprint of the home's topology.
+    """
+    return hash(
+        (
+            tuple(
+                (m.get("id"), m.get("type"), m.get("name"), m.get("bridge"), m.get("appliance_type"))
+                for m in home_data.get("modules", [])
+            ),
+            tuple(
+                (r.get("id"), r.get("name"), r.get("type"), tuple(r.get("module_ids", [])))
+                for r in home_data.get("rooms", [])
+            ),
+            _freeze(home_data.get("schedules", [])),
+        )
+    )
+
+
+def _freeze(value):
+    """Return a hashable copy of a JSON structure."""
+    if isinstance(value, dict):
+        return tuple((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
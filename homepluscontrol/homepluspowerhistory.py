@@ -0,0 +1,168 @@
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+DEFAULT_POWER_HISTORY_SIZE = 1440
+""" Default number of samples kept per module, i.e. 4 hours of samples at the default refresh interval. """
+
+
+class HomePlusPowerHistory:
+    """Fixed-size ring buffer of the power consumption samples of a module.
+
+    Samples are (timestamp, power) pairs kept in two preallocated `array` columns of fixed-size types, so the memory
+    used per module is fixed by the capacity (12 bytes per sample: an 8-byte timestamp and a 4-byte power) and
+    appending a sample takes constant time. Once the buffer is full, each new sample overwrites the oldest one.
+
+    Statistics are computed over arbitrary time windows: with NumPy installed they are vectorized over views of the
+    columns, otherwise they fall back to plain iteration over the samples.
+
+    Attributes:
+        capacity (int): Maximum number of samples kept in the buffer.
+    """
+
+    __slots__ = ("capacity", "_timestamps", "_powers", "_size", "_head")
+
+    def __init__(self, capacity=DEFAULT_POWER_HISTORY_SIZE):
+        """HomePlusPowerHistory Constructor
+
+        Args:
+            capacity (int, optional): Maximum number of samples kept in the buffer.
+        """
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._powers = array("i", [0]) * capacity
+        self._size = 0
+        # Position where the next sample is written, which holds the oldest sample once the buffer is full
+        self._head = 0
+
+    def __len__(self):
+        """Return the number of samples in the buffer"""
+        return self._size
+
+    def append(self, timestamp, power):
+        """Add a sample to the buffer, overwriting the oldest one if the buffer is full.
+
+        Args:
+            timestamp (float): Time of the sample in seconds since the epoch. Samples are expected in time order.
+            power (int): Power consumption of the module in watts.
+        """
+        head = self._head
+        self._timestamps[head] = timestamp
+        self._powers[head] = power
+        self._head = (head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def clear(self):
+        """Remove all the samples from the buffer."""
+        self._size = 0
+        self._head = 0
+
+    def samples(self, start=None, end=None):
+        """Return the samples of a time window in chronological order.
+
+        Args:
+            start (float, optional): Start of the window in seconds since the epoch (inclusive).
+            end (float, optional): End of the window in seconds since the epoch (inclusive).
+
+        Returns:
+            tuple: Timestamps and powers of the samples, as NumPy arrays if NumPy is installed or as lists otherwise.
+        """
+        timestamps, powers = self._ordered()
+        if np is not None:
+            low = 0 if start is None else int(np.searchsorted(timestamps, start, "left"))
+            high = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, "right"))
+        else:
+            low = 0 if start is None else bisect_left(timestamps, start)
+            high = len(timestamps) if end is None else bisect_right(timestamps, end)
+        return timestamps[low:high], powers[low:high]
+
+    def mean(self, start=None, end=None):
+        """Return the mean power in watts of the samples of a time window, or None if there are none."""
+        _, powers = self.samples(start, end)
+        if not len(powers):
+            return None
+        return float(powers.mean()) if np is not None else sum(powers) / len(powers)
+
+    def min(self, start=None, end=None):
+        """Return the minimum power in watts of the samples of a time window, or None if there are none."""
+        _, powers = self.samples(start, end)
+        return int(min(powers)) if len(powers) else None
+
+    def max(self, start=None, end=None):
+        """Return the maximum power in watts of the samples of a time window, or None if there are none."""
+        _, powers = self.samples(start, end)
+        return int(max(powers)) if len(powers) else None
+
+    def percentile(self, q, start=None, end=None):
+        """Return a percentile of the power of the samples of a time window, or None if there are none.
+
+        Percentiles are linearly interpolated between the closest samples.
+
+        Args:
+            q (float): Percentile to compute, between 0 and 100.
+            start (float, optional): Start of the window in seconds since the epoch (inclusive).
+            end (float, optional): End of the window in seconds since the epoch (inclusive).
+
+        Returns:
+            float: Percentile of the power in watts.
+        """
+        if not 0 <= q <= 100:
+            raise ValueError(f"Percentile {q} is not between 0 and 100")
+        _, powers = self.samples(start, end)
+        if not len(powers):
+            return None
+        if np is not None:
+            return float(np.percentile(powers, q))
+        ordered = sorted(powers)
+        rank = (len(ordered) - 1) * q / 100
+        low = math.floor(rank)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+    def energy(self, start=None, end=None):
+        """Return the energy consumed over a time window in watt-hours, integrating the samples with the trapezoidal
+        rule.
+
+        Only the time between the first and last samples of the window is integrated.
+
+        Args:
+            start (float, optional): Start of the window in seconds since the epoch (inclusive).
+            end (float, optional): End of the window in seconds since the epoch (inclusive).
+
+        Returns:
+            float: Consumed energy in watt-hours.
+        """
+        timestamps, powers = self.samples(start, end)
+        if len(powers) < 2:
+            return 0.0
+        if np is not None:
+            return float(((powers[1:] + powers[:-1]) * np.diff(timestamps)).sum()) / 7200
+        return (
+            sum(
+                (p0 + p1) * (t1 - t0)
+                for t0, t1, p0, p1 in zip(timestamps, timestamps[1:], powers, powers[1:])
+            )
+            / 7200
+        )
+
+    def _ordered(self):
+        """Return the timestamps and powers of all the samples in chronological order."""
+        size, head = self._size, self._head
+        if np is not None:
+            timestamps = np.frombuffer(self._timestamps, dtype="d")
+            powers = np.frombuffer(self._powers, dtype=self._powers.typecode)
+            if size < self.capacity:
+                return timestamps[:size], powers[:size]
+            return np.concatenate((timestamps[head:], timestamps[:head])), np.concatenate((powers[head:], powers[:head]))
+        if size < self.capacity:
+            return self._timestamps[:size].tolist(), self._powers[:size].tolist()
+        return (
+            (self._timestamps[head:] + self._timestamps[:head]).tolist(),
+            (self._powers[head:] + self._powers[:head]).tolist(),
+        )
@@ -12,6 +12,8 @@ class HomePlusRemote(HomePlusModule):
         battery_level: state of charge of the module's battery
     """
 
+    __slots__ = ("battery", "battery_level")
+
     def __init__(self, plant, id, name, hw_type, device, bridge, fw="", type="", reachable=False):
         """HomePlusRemote Constructor
 
@@ -34,12 +36,12 @@ class HomePlusRemote(HomePlusModule):
         """Return the string representing this module"""
         return f"Home+ Remote: device->{self.device}, name->{self.name}, id->{self.id}, reachable->{self.reachable}, battery->{self.battery}, battery_level->{self.battery_level}, bridge->{self.bridge}"
 
-    def update_state(self, module_data):
-        """Update the internal state of the module from the input JSON data.
+    def _update_state(self, module_status):
+        """Update the internal state of the module from its decoded status.
 
         Args:
-            module_data (json): JSON data of the module state
+            module_status (HomePlusModuleStatus): Decoded status of the module
         """
-        super().update_state(module_data)
-        self.battery = module_data.get("battery_state")
-        self.battery_level = module_data.get("battery_level")
+        super()._update_state(module_status)
+        self.battery = module_status.battery_state
+        self.battery_level = module_status.battery_level
@@ -0,0 +1,73 @@
+ALL_KEYS = "all"
+""" Value of `home_data_keys` that retains the complete home data. """
+
+
+class HomePlusRetentionPolicy:
+    """Policy that decides which parts of the API payloads a `HomePlusPlant` keeps after parsing them.
+
+    Once parsed, the payloads are no longer needed to operate the modules, so memory-constrained deployments can drop
+    them entirely or keep only the keys they use, while the raw module status can be retained for debugging.
+
+    Attributes:
+        home_data_keys (tuple): Keys of the home data that are retained (`ALL_KEYS` to retain all of them).
+        module_status (bool): True if the decoded module status is retained in the plant's `module_status`.
+        raw_module_status (bool): True if the module status is also retained as returned by the API, in the plant's
+                                  `raw_module_status`.
+    """
+
+    __slots__ = ("home_data_keys", "module_status", "raw_module_status")
+
+    def __init__(self, home_data_keys=ALL_KEYS, module_status=True, raw_module_status=False):
+        """HomePlusRetentionPolicy Constructor
+
+        Args:
+            home_data_keys (iterable, optional): Keys of the home data that are retained. Defaults to `ALL_KEYS`.
+            module_status (bool, optional): True if the decoded module status is retained. Defaults to True.
+            raw_module_status (bool, optional): True if the raw module status is retained. Defaults to False.
+        """
+        self.home_data_keys = home_data_keys if home_data_keys == ALL_KEYS else tuple(home_data_keys)
+        self.module_status = module_status
+        self.raw_module_status = raw_module_status
+
+    def __repr__(self):
+        """Return the string representing this policy"""
+        return (
+            f"HomePlusRetentionPolicy(home_data_keys={self.home_data_keys}, module_status={self.module_status}, "
+            f"raw_module_status={self.raw_module_status})"
+        )
+
+    def retain_home_data(self, home_data):
+        """Return the part of the home data that is to be retained.
+
+        Args:
+            home_data (dict): Dictionary representing the JSON structure of the home as returned by the API.
+
+        Returns:
+            dict: Retained home data, which is empty if no key is retained.
+        """
+        if self.home_data_keys == ALL_KEYS:
+            return home_data
+        return {key: home_data[key] for key in self.home_data_keys if key in home_data}
+
+    @classmethod
+    def keep_all(cls):
+        """Return a policy that retains the complete home data and the decoded module status."""
+        return cls()
+
+    @classmethod
+    def keep_none(cls):
+        """Return a policy that drops the payloads once they are parsed."""
+        return cls(home_data_keys=(), module_status=False)
+
+    @classmethod
+    def keep_keys(cls, *keys):
+        """Return a policy that only retains the given keys of the home data and drops the module status."""
+        return cls(home_data_keys=keys, module_status=False)
+
+    @classmethod
+    def debug(cls):
+        """Return a policy that retains everything, including the raw module status."""
+        return cls(raw_module_status=True)
+
+
+DEFAULT_RETENTION_POLICY = HomePlusRetentionPolicy.keep_all()
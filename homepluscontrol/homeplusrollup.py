@@ -0,0 +1,232 @@
+from array import array
+from collections import namedtuple
+
+DEFAULT_ROLLUP_TIERS = ((60, 60), (3600, 48), (86400, 90))
+""" Default tiers as (bucket length in seconds, number of buckets) pairs: 1 hour of 1-minute buckets, 2 days of
+1-hour buckets and 90 days of 1-day buckets. """
+
+HomePlusRollupBucket = namedtuple("HomePlusRollupBucket", ["start", "min", "max", "avg", "energy", "samples"])
+""" Power statistics of a time bucket: start time in seconds since the epoch, minimum, maximum and average power in
+watts, energy in watt-hours and number of samples. """
+
+
+class HomePlusRollupSeries:
+    """Fixed-size ring of the time buckets of one rollup tier.
+
+    Buckets are kept in preallocated `array` columns, so the memory used by a series is fixed by its size and adding a
+    sample takes constant time: it either updates the current bucket or starts a new one, overwriting the oldest.
+
+    Attributes:
+        resolution (int): Length of a bucket in seconds.
+        size (int): Maximum number of buckets kept in the series.
+    """
+
+    __slots__ = ("resolution", "size", "_start", "_min", "_max", "_sum", "_count", "_energy", "_head", "_used")
+
+    def __init__(self, resolution, size):
+        """HomePlusRollupSeries Constructor
+
+        Args:
+            resolution (int): Length of a bucket in seconds.
+            size (int): Maximum number of buckets kept in the series.
+        """
+        self.resolution = resolution
+        self.size = size
+        self._start = array("d", bytes(8 * size))
+        self._min = array("l", [0]) * size
+        self._max = array("l", [0]) * size
+        self._sum = array("d", bytes(8 * size))
+        self._count = array("l", [0]) * size
+        self._energy = array("d", bytes(8 * size))
+        # Position of the current bucket and number of buckets in use
+        self._head = -1
+        self._used = 0
+
+    def __len__(self):
+        """Return the number of buckets in the series"""
+        return self._used
+
+    def add(self, timestamp, power, energy=0.0):
+        """Add a sample to the bucket it falls in.
+
+        Samples that are older than the current bucket are ignored.
+
+        Args:
+            timestamp (float): Time of the sample in seconds since the epoch.
+            power (int): Power consumption in watts.
+            energy (float, optional): Energy in watt-hours consumed since the previous sample.
+        """
+        start = timestamp - timestamp % self.resolution
+        head = self._head
+        if head >= 0 and start == self._start[head]:
+            if power < self._min[head]:
+                self._min[head] = power
+            if power > self._max[head]:
+                self._max[head] = power
+            self._sum[head] += power
+            self._count[head] += 1
+            self._energy[head] += energy
+            return
+        if head >= 0 and start < self._start[head]:
+            return
+        head = self._head = (head + 1) % self.size
+        if self._used < self.size:
+            self._used += 1
+        self._start[head] = start
+        self._min[head] = power
+        self._max[head] = power
+        self._sum[head] = power
+        self._count[head] = 1
+        self._energy[head] = energy
+
+    def buckets(self, start=None, end=None):
+        """Return the buckets that start within a time window, in chronological order.
+
+        Args:
+            start (float, optional): Start of the window in seconds since the epoch (inclusive).
+            end (float, optional): End of the window in seconds since the epoch (inclusive).
+
+        Returns:
+            list: List of `HomePlusRollupBucket`.
+        """
+        result = []
+        first = (self._head - self._used + 1) % self.size
+        for offset in range(self._used):
+            i = (first + offset) % self.size
+            bucket_start = self._start[i]
+            if (start is not None and bucket_start < start) or (end is not None and bucket_start > end):
+                continue
+            count = self._count[i]
+            result.append(
+                HomePlusRollupBucket(bucket_start, self._min[i], self._max[i], self._sum[i] / count, self._energy[i], count)
+            )
+        return result
+
+
+class HomePlusPowerRollup:
+    """Multi-resolution rollup of the power consumption samples of a module, or of a group of modules.
+
+    Every sample is added to one `HomePlusRollupSeries` per tier. The rollup of a module also integrates the energy
+    consumed since its previous sample with the trapezoidal rule, and forwards the sample to the rollups of its groups.
+    In the rollup of a group, the minimum, maximum and average are taken over the samples of all its modules and the
+    energy is the total energy of its modules.
+    """
+
+    __slots__ = ("_series", "_groups", "_last")
+
+    def __init__(self, tiers=DEFAULT_ROLLUP_TIERS, groups=()):
+        """HomePlusPowerRollup Constructor
+
+        Args:
+            tiers (iterable, optional): Tiers as (bucket length in seconds, number of buckets) pairs.
+            groups (iterable, optional): Rollups of the groups of the module.
+        """
+        self._series = {resolution: HomePlusRollupSeries(resolution, size) for resolution, size in tiers}
+        self._groups = tuple(groups)
+        self._last = None
+
+    @property
+    def resolutions(self):
+        """Return the bucket lengths of the tiers in seconds."""
+        return list(self._series)
+
+    def series(self, resolution):
+        """Return the series of a tier.
+
+        Args:
+            resolution (int): Length of a bucket of the tier in seconds.
+
+        Raises:
+            ValueError: If there is no tier with the given resolution.
+        """
+        try:
+            return self._series[resolution]
+        except KeyError:
+            raise ValueError(f"No rollup tier with a resolution of {resolution} seconds") from None
+
+    def buckets(self, resolution, start=None, end=None):
+        """Return the buckets of a tier that start within a time window (see `HomePlusRollupSeries.buckets()`)."""
+        return self.series(resolution).buckets(start, end)
+
+    def add(self, timestamp, power):
+        """Add a power sample of the module.
+
+        Args:
+            timestamp (float): Time of the sample in seconds since the epoch.
+            power (int): Power consumption of the module in watts.
+        """
+        last = self._last
+        energy = 0.0
+        if last is not None and timestamp > last[0]:
+            energy = (last[1] + power) * (timestamp - last[0]) / 7200
+        self._last = (timestamp, power)
+        self._add(timestamp, power, energy)
+        for group in self._groups:
+            group._add(timestamp, power, energy)
+
+    def _add(self, timestamp, power, energy):
+        """Add a sample, with the energy consumed since the previous one, to every tier."""
+        for series in self._series.values():
+            series.add(timestamp, power, energy)
+
+
+class HomePlusRollupEngine:
+    """Engine that maintains the multi-resolution power rollups of the modules of a fleet of homes, and of their homes
+    and device types.
+
+    The memory used per module, home and device type is fixed by the tiers, regardless of how long the process runs.
+
+    Attributes:
+        tiers (tuple): Tiers as (bucket length in seconds, number of buckets) pairs.
+    """
+
+    def __init__(self, tiers=DEFAULT_ROLLUP_TIERS):
+        """HomePlusRollupEngine Constructor
+
+        Args:
+            tiers (iterable, optional): Tiers as (bucket length in seconds, number of buckets) pairs.
+        """
+        self.tiers = tuple(tiers)
+        self._modules = {}
+        self._groups = {}
+
+    def register(self, module):
+        """Create the rollup of a module, linked to the rollups of its home and device type.
+
+        Args:
+            module (HomePlusModule): Module to be registered.
+
+        Returns:
+            HomePlusPowerRollup: Rollup where the power samples of the module are to be added.
+        """
+        home_id = module.plant.id if module.plant is not None else None
+        groups = [self._group(("home", home_id)), self._group(("device", module.device))]
+        rollup = self._modules[module.id] = HomePlusPowerRollup(self.tiers, groups)
+        return rollup
+
+    def release(self, module):
+        """Drop the rollup of a module that is no longer in the fleet. The rollups of its groups are kept.
+
+        Args:
+            module (HomePlusModule): Module to be released.
+        """
+        self._modules.pop(module.id, None)
+
+    def module(self, module_id):
+        """Return the rollup of a module, or None if the module is not registered."""
+        return self._modules.get(module_id)
+
+    def home(self, home_id):
+        """Return the rollup of the modules of a home, or None if no module of the home has been registered."""
+        return self._groups.get(("home", home_id))
+
+    def device(self, device):
+        """Return the rollup of the modules of a device type, or None if no module of that type has been registered."""
+        return self._groups.get(("device", device))
+
+    def _group(self, key):
+        """Return the rollup of a group, creating it if needed."""
+        rollup = self._groups.get(key)
+        if rollup is None:
+            rollup = self._groups[key] = HomePlusPowerRollup(self.tiers)
+        return rollup
@@ -0,0 +1,275 @@
+import mmap
+import os
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+SAMPLES_MAGIC = b"HPCSAMP"
+SAMPLES_VERSION = 1
+MODULES_SUFFIX = ".modules"
+
+""" Fields of the fixed-width sample records, in file order, with their struct type codes.
+Unknown values are stored as -1. """
+SAMPLE_FIELDS = (
+    ("timestamp", "d"),
+    ("module", "I"),
+    ("power", "i"),
+    ("battery_level", "i"),
+    ("level", "h"),
+    ("on", "b"),
+    ("reachable", "b"),
+)
+
+_RECORD = struct.Struct("<" + "".join(code for _, code in SAMPLE_FIELDS))
+# Header: magic, version and record size, padded so that the records are aligned on 8 bytes
+_HEADER = struct.Struct("<7sBH6x")
+
+RECORD_SIZE = _RECORD.size
+HEADER_SIZE = _HEADER.size
+
+if np is not None:
+    SAMPLE_DTYPE = np.dtype([(name, "<" + code) for name, code in SAMPLE_FIELDS])
+else:  # pragma: no cover
+    SAMPLE_DTYPE = None
+
+
+class HomePlusSampleError(Exception):
+    """The sample file is corrupted or has an unsupported version or record size."""
+
+
+def _check_header(path, data):
+    """Raise HomePlusSampleError if the header of a sample file is not supported by this version of the library."""
+    if len(data) < HEADER_SIZE:
+        raise HomePlusSampleError(f"{path} is not a sample file")
+    magic, version, record_size = _HEADER.unpack_from(data)
+    if magic != SAMPLES_MAGIC:
+        raise HomePlusSampleError(f"{path} is not a sample file")
+    if version != SAMPLES_VERSION or record_size != RECORD_SIZE:
+        raise HomePlusSampleError(f"Unsupported sample version {version} (record size {record_size}) in {path}")
+
+
+def _read_module_ids(path):
+    """Return the module identifiers of a sample file, in the order of their codes."""
+    try:
+        with open(path + MODULES_SUFFIX, "r") as modules_file:
+            return modules_file.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+
+class HomePlusSampleWriter:
+    """Writer of the state of the modules as fixed-width binary samples (see `SAMPLE_FIELDS`).
+
+    Samples are appended to the file in the order they are written, so the timestamps are ordered as long as they come
+    from a single clock. The modules are stored as integer codes, whose identifiers are appended, one per line, to a
+    companion file with the `MODULES_SUFFIX` suffix.
+
+    Attributes:
+        path (str): Path of the sample file.
+        samples_written (int): Number of samples written since the writer was opened.
+    """
+
+    def __init__(self, path):
+        """HomePlusSampleWriter Constructor
+
+        Args:
+            path (str): Path of the sample file. If the file exists, new samples are appended to it.
+
+        Raises:
+            HomePlusSampleError: If the existing file is not a supported sample file.
+        """
+        self.path = path
+        self.samples_written = 0
+        self._module_ids = _read_module_ids(path)
+        self._module_codes = {module_id: code for code, module_id in enumerate(self._module_ids)}
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size:
+            with open(path, "rb") as sample_file:
+                _check_header(path, sample_file.read(HEADER_SIZE))
+        self._file = open(path, "ab")
+        self._modules_file = open(path + MODULES_SUFFIX, "a")
+        if size == 0:
+            self._file.write(_HEADER.pack(SAMPLES_MAGIC, SAMPLES_VERSION, RECORD_SIZE))
+        elif (size - HEADER_SIZE) % RECORD_SIZE:
+            # Drop the partial record left by an interrupted write
+            self._file.truncate(size - (size - HEADER_SIZE) % RECORD_SIZE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def attach(self, event_bus, modules):
+        """Start writing a sample of every module whose state changes in an event bus.
+
+        Args:
+            event_bus (HomePlusEventBus): Event bus where the module changes are published.
+            modules (dict): Dictionary of the modules, keyed by their unique identifier.
+
+        Returns:
+            function: Function that stops writing the samples when called.
+        """
+
+        def write_change(change):
+            module = modules.get(change.module_id)
+            if module is not None:
+                self.write(module, change.timestamp)
+
+        return event_bus.add_listener(write_change)
+
+    def write(self, module, timestamp):
+        """Append a sample of the current state of a module.
+
+        Args:
+            module (HomePlusModule): Module to be sampled.
+            timestamp (float): Time of the sample (seconds since the epoch).
+        """
+        status = getattr(module, "status", None)
+        level = getattr(module, "level", None)
+        battery_level = getattr(module, "battery_level", None)
+        power = getattr(module, "power", None)
+        self._file.write(
+            _RECORD.pack(
+                timestamp,
+                self._module_code(module.id),
+                -1 if power is None else power,
+                -1 if battery_level in (None, "") else battery_level,
+                -1 if level is None else level,
+                -1 if status not in ("on", "off") else status == "on",
+                -1 if module.reachable is None else module.reachable is True,
+            )
+        )
+        self.samples_written += 1
+
+    def write_modules(self, modules, timestamp):
+        """Append a sample of the current state of every module of an iterable, e.g. `plant.modules.values()`."""
+        for module in modules:
+            self.write(module, timestamp)
+
+    def flush(self):
+        """Flush the samples written so far, so that they are visible to the readers."""
+        self._modules_file.flush()
+        self._file.flush()
+
+    def close(self):
+        """Flush the samples and close the file."""
+        self._modules_file.close()
+        self._file.close()
+
+    def _module_code(self, module_id):
+        """Return the integer code of a module, registering it if needed."""
+        code = self._module_codes.get(module_id)
+        if code is None:
+            code = self._module_codes[module_id] = len(self._module_ids)
+            self._module_ids.append(module_id)
+            # The identifier must be readable before any sample that refers to it
+            self._modules_file.write(module_id + "\n")
+            self._modules_file.flush()
+        return code
+
+
+class HomePlusSampleReader:
+    """Memory-mapped reader of a sample file written by `HomePlusSampleWriter`.
+
+    With NumPy installed, the samples are exposed as a structured array and their fields as strided arrays that are
+    zero-copy views of the memory map, so scans over the whole file run without creating a Python object per sample.
+    Otherwise, they fall back to lists decoded from the memory map. The views must be released before closing the
+    reader.
+
+    Samples written after the reader was opened are not visible: open a new reader to see them.
+
+    Attributes:
+        path (str): Path of the sample file.
+        module_ids (list): Unique identifiers of the modules, indexed by the codes in the `module` field.
+    """
+
+    def __init__(self, path):
+        """HomePlusSampleReader Constructor
+
+        Args:
+            path (str): Path of the sample file.
+
+        Raises:
+            HomePlusSampleError: If the file is not a supported sample file.
+        """
+        self.path = path
+        with open(path, "rb") as sample_file:
+            self._mmap = mmap.mmap(sample_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            _check_header(path, self._mmap)
+        except HomePlusSampleError:
+            self._mmap.close()
+            raise
+        # A partial record left by an interrupted write is ignored
+        self._count = (len(self._mmap) - HEADER_SIZE) // RECORD_SIZE
+        self.module_ids = _read_module_ids(path)
+
+    def __len__(self):
+        """Return the number of samples in the file"""
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def samples(self):
+        """Return all the samples of the file.
+
+        Returns:
+            numpy.ndarray or list: Structured array of the samples (see `SAMPLE_DTYPE`), or list of tuples without
+                                   NumPy.
+        """
+        if np is None:
+            end = HEADER_SIZE + self._count * RECORD_SIZE
+            return list(_RECORD.iter_unpack(self._mmap[HEADER_SIZE:end]))
+        return np.frombuffer(self._mmap, dtype=SAMPLE_DTYPE, count=self._count, offset=HEADER_SIZE)
+
+    def field(self, name):
+        """Return the values of a field for all the samples of the file.
+
+        Args:
+            name (str): Name of the field (see `SAMPLE_FIELDS`).
+
+        Returns:
+            numpy.ndarray or list: Values of the field.
+        """
+        index = [field for field, _ in SAMPLE_FIELDS].index(name)
+        if np is None:
+            return [sample[index] for sample in self.samples]
+        return self.samples[name]
+
+    def between(self, start=None, end=None):
+        """Return the samples of a time range, assuming they were written in chronological order.
+
+        Args:
+            start (float, optional): Start of the time range in seconds since the epoch (inclusive).
+            end (float, optional): End of the time range in seconds since the epoch (exclusive).
+
+        Returns:
+            numpy.ndarray or list: Samples of the time range, as a zero-copy slice of `samples` with NumPy.
+        """
+        samples = self.samples
+        if np is None:
+            return [s for s in samples if (start is None or s[0] >= start) and (end is None or s[0] < end)]
+        timestamps = samples["timestamp"]
+        first = 0 if start is None else np.searchsorted(timestamps, start, side="left")
+        last = len(samples) if end is None else np.searchsorted(timestamps, end, side="left")
+        return samples[first:last]
+
+    def module_code(self, module_id):
+        """Return the code of a module in the `module` field, or -1 if the module has no samples."""
+        try:
+            return self.module_ids.index(module_id)
+        except ValueError:
+            return -1
+
+    def close(self):
+        """Close the memory map of the file."""
+        self._mmap.close()
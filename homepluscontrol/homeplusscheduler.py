@@ -0,0 +1,273 @@
+import asyncio
+import collections
+import heapq
+import itertools
+import logging
+import time
+
+# Fractional part of the golden ratio. Multiples of this value modulo 1 form a low-discrepancy sequence, so the
+# n-th registered home always lands in the largest gap left by the previous ones.
+_GOLDEN_RATIO_FRACTION = 0.6180339887498949
+
+DEFAULT_REFRESH_INTERVAL = 10  # 10 seconds
+DEFAULT_MAX_CONCURRENT_REFRESHES = 20
+
+
+class HomePlusRefreshScheduler:
+    """Single-task scheduler that owns the module status refresh deadlines of many homes.
+
+    Every registered `HomePlusPlant` (possibly belonging to different accounts) is given a fixed phase within the
+    refresh interval so that the refreshes are spread evenly across it instead of all of them waking up in the same
+    second. Deadlines are kept in a binary heap, so registering, unregistering and dispatching a home cost O(log n).
+
+    Refreshes are driven from a single asyncio task which dispatches `update_module_status()` calls as their deadline
+    is reached. At most `max_concurrent` refreshes are in flight at any time and a home whose previous refresh has not
+    finished yet is simply skipped for that cycle.
+
+    When a `background_interval` is configured, polling becomes demand-driven: only the homes with registered interest
+    (see `subscribe()`) are refreshed every `refresh_interval`, while the rest fall back to the slower background
+    cadence.
+
+    Attributes:
+        refresh_interval (float): Interval between two module status refreshes of the same home (in seconds).
+        background_interval (float): Interval between two refreshes of a home without registered interest (in seconds).
+                                     If None, every home is refreshed every `refresh_interval`.
+        max_concurrent (int): Maximum number of refreshes that can be in flight at the same time.
+    """
+
+    def __init__(
+        self,
+        refresh_interval=DEFAULT_REFRESH_INTERVAL,
+        max_concurrent=DEFAULT_MAX_CONCURRENT_REFRESHES,
+        background_interval=None,
+    ):
+        """HomePlusRefreshScheduler Constructor
+
+        Args:
+            refresh_interval (float): Interval between two module status refreshes of the same home (in seconds).
+            max_concurrent (int): Maximum number of refreshes that can be in flight at the same time.
+            background_interval (float, optional): Interval between two refreshes of a home without registered
+                                                   interest (in seconds). Defaults to None, which disables
+                                                   demand-driven polling.
+        """
+        self.refresh_interval = refresh_interval
+        self.background_interval = background_interval
+        self.max_concurrent = max_concurrent
+        self._heap = []
+        self._entries = {}
+        self._phases = {}
+        self._interest = {}
+        self._in_flight = {}
+        self._counter = itertools.count()
+        self._phase_counter = itertools.count()
+        self._task = None
+        self._wakeup = None
+        self._semaphore = None
+
+    def __len__(self):
+        """Return the number of homes registered in the scheduler"""
+        return len(self._entries)
+
+    def __contains__(self, plant):
+        """Return True if the plant is registered in the scheduler"""
+        return plant in self._entries
+
+    @property
+    def logger(self):
+        """Return logger of the scheduler."""
+        return logging.getLogger(__name__)
+
+    @property
+    def running(self):
+        """Return True if the scheduler task is running."""
+        return self._task is not None and not self._task.done()
+
+    def add_plant(self, plant):
+        """Register a home in the scheduler.
+
+        The home is assigned the next phase of the low-discrepancy sequence, so that its first refresh is placed in
+        the largest gap of the refresh interval. Registering a home that is already in the scheduler does nothing.
+
+        Args:
+            plant (HomePlusPlant): Home whose module status is to be refreshed periodically.
+        """
+        if plant in self._entries:
+            return
+        phase = (next(self._phase_counter) * _GOLDEN_RATIO_FRACTION) % 1.0
+        self._phases[plant] = phase
+        self._push(plant, time.monotonic() + phase * self._interval_for(plant))
+        self.logger.debug("Registered home %s in the refresh scheduler with phase %.3f", plant.id, phase)
+
+    def remove_plant(self, plant):
+        """Unregister a home from the scheduler.
+
+        The heap entry is invalidated in place and discarded lazily when it reaches the top of the heap.
+
+        Any interest registered for the home is discarded as well.
+
+        Args:
+            plant (HomePlusPlant): Home that is no longer to be refreshed.
+        """
+        self._phases.pop(plant, None)
+        self._interest.pop(plant, None)
+        entry = self._entries.pop(plant, None)
+        if entry is not None:
+            entry[-1] = None
+            self.logger.debug("Unregistered home %s from the refresh scheduler", plant.id)
+
+    def subscribe(self, plant, module_id=None):
+        """Register interest in a home or in one of its modules.
+
+        Interest is reference-counted per home and module, so every call must be balanced by a call to
+        `unsubscribe()` with the same arguments. Interest in a module implies interest in its home, since the status
+        of all the modules of a home is retrieved in a single call. If the home was on the background cadence, its
+        next refresh is brought forward to within one `refresh_interval`.
+
+        Args:
+            plant (HomePlusPlant): Home of interest.
+            module_id (str, optional): Unique identifier of the module of interest. Defaults to None, which registers
+                                       interest in the home as a whole.
+        """
+        counter = self._interest.setdefault(plant, collections.Counter())
+        was_interested = bool(counter)
+        counter[module_id] += 1
+        if not was_interested and self.background_interval is not None and plant in self._entries:
+            deadline = time.monotonic() + self._phases[plant] * self.refresh_interval
+            if deadline < self._entries[plant][0]:
+                self._entries[plant][-1] = None
+                self._push(plant, deadline)
+
+    def unsubscribe(self, plant, module_id=None):
+        """Release interest previously registered with `subscribe()`.
+
+        When the last interest in a home is released, the home falls back to the background cadence after its next
+        refresh.
+
+        Args:
+            plant (HomePlusPlant): Home of interest.
+            module_id (str, optional): Unique identifier of the module of interest. Defaults to None.
+        """
+        counter = self._interest.get(plant)
+        if counter is None or counter[module_id] <= 0:
+            self.logger.warning("Unbalanced interest release for home %s and module %s", plant.id, module_id)
+            return
+        counter[module_id] -= 1
+        if counter[module_id] == 0:
+            del counter[module_id]
+        if not counter:
+            del self._interest[plant]
+
+    def is_subscribed(self, plant, module_id=None):
+        """Return True if there is registered interest in a home or in one of its modules.
+
+        Args:
+            plant (HomePlusPlant): Home of interest.
+            module_id (str, optional): Unique identifier of the module. If absent, any interest in the home counts.
+        """
+        counter = self._interest.get(plant)
+        if counter is None:
+            return False
+        return module_id is None or counter[module_id] > 0
+
+    def next_deadline(self, plant):
+        """Return the monotonic time of the next scheduled refresh of a home.
+
+        Args:
+            plant (HomePlusPlant): Home registered in the scheduler.
+
+        Returns:
+            float: Monotonic time of the next refresh or None if the home is not registered.
+        """
+        entry = self._entries.get(plant)
+        return None if entry is None else entry[0]
+
+    def start(self):
+        """Start the scheduler task in the running event loop."""
+        if self.running:
+            return
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        """Stop the scheduler task and cancel the refreshes that are in flight."""
+        tasks = list(self._in_flight.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._in_flight.clear()
+
+    async def run(self):
+        """Main loop of the scheduler, which dispatches the refreshes of all homes as they become due."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        while True:
+            delay = self._dispatch_due(time.monotonic())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _push(self, plant, deadline):
+        """Add the entry of a home to the heap and wake up the scheduler task if it is now the earliest one."""
+        entry = [deadline, next(self._counter), plant]
+        self._entries[plant] = entry
+        heapq.heappush(self._heap, entry)
+        if self._wakeup is not None and self._heap[0] is entry:
+            self._wakeup.set()
+
+    def _dispatch_due(self, now):
+        """Dispatch the refreshes of all the homes whose deadline has been reached.
+
+        Args:
+            now (float): Current monotonic time.
+
+        Returns:
+            float: Number of seconds until the next deadline or None if there are no homes to refresh.
+        """
+        heap = self._heap
+        while heap:
+            deadline, _, plant = heap[0]
+            if plant is None:
+                heapq.heappop(heap)
+                continue
+            if deadline > now:
+                return deadline - now
+            heapq.heappop(heap)
+            self._refresh(plant)
+            # Keep the phase of the home: skip whole intervals if the scheduler fell behind
+            interval = self._interval_for(plant)
+            missed = int((now - deadline) // interval)
+            self._push(plant, deadline + (missed + 1) * interval)
+        return None
+
+    def _interval_for(self, plant):
+        """Return the refresh interval that applies to a home depending on the registered interest."""
+        if self.background_interval is None or plant in self._interest:
+            return self.refresh_interval
+        return self.background_interval
+
+    def _refresh(self, plant):
+        """Launch the refresh of a home unless the previous one is still in flight."""
+        if plant in self._in_flight:
+            self.logger.debug("Previous refresh of home %s still in progress, skipping this cycle", plant.id)
+            return
+        self._in_flight[plant] = asyncio.ensure_future(self._async_refresh(plant))
+
+    async def _async_refresh(self, plant):
+        """Refresh the module status of a home, bounded by the concurrency limit."""
+        try:
+            async with self._semaphore:
+                await plant.update_module_status()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.logger.exception("Error refreshing the module status of home %s", plant.id)
+        finally:
+            self._in_flight.pop(plant, None)
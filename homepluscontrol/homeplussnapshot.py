@@ -0,0 +1,123 @@
+import os
+import tempfile
+import time
+import zlib
+
+from .homepluscodec import get_codec
+
+SNAPSHOT_MAGIC = b"HPCSNAP"
+SNAPSHOT_VERSION = 1
+
+
+class HomePlusSnapshotError(Exception):
+    """The snapshot is missing, corrupted or has an unsupported version."""
+
+
+def plant_snapshot(plant):
+    """Return the snapshot of a home: its information, the topology of its modules and their last known status.
+
+    The snapshot is built from the modules themselves rather than from the retained payloads, so it is complete
+    regardless of the retention policy of the home.
+
+    Args:
+        plant (HomePlusPlant): Home to be saved.
+
+    Returns:
+        dict: Dictionary with the home data, in the structure returned by the `homesdata` API, and the module status,
+              in the structure returned by the `homestatus` API.
+    """
+    home_data = {
+        "id": plant.id,
+        "name": plant.name,
+        "country": plant.country,
+        "modules": [
+            {
+                "id": module.id,
+                "type": module.hw_type,
+                "name": module.name,
+                "bridge": module.bridge,
+                "appliance_type": module.type,
+            }
+            for module in plant.modules.values()
+        ],
+    }
+    for key in ("rooms", "schedules"):
+        if key in plant.home_data:
+            home_data[key] = plant.home_data[key]
+    return {"home_data": home_data, "module_status": [_module_status(module) for module in plant.modules.values()]}
+
+
+def write_snapshot(path, plants, json_codec=None):
+    """Atomically write the snapshot of some homes to a file.
+
+    The snapshot is written to a temporary file in the same directory which then replaces the target file, so the
+    target always holds either the previous snapshot or the new one, even if the process dies while writing.
+
+    Args:
+        path (str): Path of the snapshot file.
+        plants (iterable): Homes to be saved.
+        json_codec (HomePlusJsonCodec, optional): JSON codec used to encode the snapshot. Defaults to the fastest one.
+    """
+    codec = get_codec() if json_codec is None else json_codec
+    payload = {"saved_at": time.time(), "homes": [plant_snapshot(plant) for plant in plants]}
+    data = SNAPSHOT_MAGIC + bytes([SNAPSHOT_VERSION]) + zlib.compress(codec.dumps(payload))
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_snapshot(path, json_codec=None):
+    """Read the snapshot of some homes from a file.
+
+    Args:
+        path (str): Path of the snapshot file.
+        json_codec (HomePlusJsonCodec, optional): JSON codec used to decode the snapshot. Defaults to the fastest one.
+
+    Returns:
+        dict: Dictionary with the time when the snapshot was saved (`saved_at`) and the list of home snapshots
+              (`homes`), as returned by `plant_snapshot()`.
+
+    Raises:
+        HomePlusSnapshotError: If the file cannot be read, is corrupted or has an unsupported version.
+    """
+    codec = get_codec() if json_codec is None else json_codec
+    try:
+        with open(path, "rb") as snapshot_file:
+            data = snapshot_file.read()
+    except OSError as err:
+        raise HomePlusSnapshotError(f"Cannot read snapshot {path}") from err
+    header_length = len(SNAPSHOT_MAGIC) + 1
+    if len(data) < header_length or not data.startswith(SNAPSHOT_MAGIC):
+        raise HomePlusSnapshotError(f"{path} is not a snapshot")
+    if data[header_length - 1] != SNAPSHOT_VERSION:
+        raise HomePlusSnapshotError(f"Unsupported snapshot version {data[header_length - 1]} in {path}")
+    try:
+        return codec.loads(zlib.decompress(data[header_length:]))
+    except (zlib.error, ValueError) as err:
+        raise HomePlusSnapshotError(f"Corrupted snapshot {path}") from err
+
+
+def _module_status(module):
+    """Return the last known status of a module, in the structure returned by the `homestatus` API."""
+    status = {"id": module.id, "reachable": module.reachable, "firmware_revision": module.fw}
+    on_status = getattr(module, "status", None)
+    if on_status in ("on", "off"):
+        status["on"] = on_status == "on"
+    for field, attribute in (
+        ("power", "power"),
+        ("battery_state", "battery"),
+        ("battery_level", "battery_level"),
+        ("current_position", "level"),
+    ):
+        value = getattr(module, attribute, None)
+        if value is not None:
+            status[field] = value
+    return status
@@ -0,0 +1,210 @@
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from .homeplusconst import PRODUCT_TYPES
+
+""" Device types in the order of their code in the `device` column. """
+DEVICE_CODES = sorted(set(PRODUCT_TYPES.values()))
+
+""" Type codes of the columns of the store. Unknown values are stored as -1 (or NaN for the time). """
+COLUMNS = {
+    "device": "b",
+    "home": "l",
+    "power": "l",
+    "on": "b",
+    "reachable": "b",
+    "level": "h",
+    "battery_level": "l",
+    "last_updated": "d",
+}
+
+_DEFAULTS = {"device": -1, "home": -1, "power": 0, "on": -1, "reachable": -1, "level": -1, "battery_level": -1}
+
+_INITIAL_CAPACITY = 64
+
+
+class HomePlusStateStore:
+    """Column-oriented store of the state of the modules of a fleet of homes.
+
+    Each module is assigned a stable slot, i.e. a row index, when it is registered, and its state is written into
+    fixed-width columns (see `COLUMNS`) every time it is updated. Aggregates and masks are then computed over whole
+    columns: with NumPy installed they are vectorized over zero-copy views of the columns, otherwise they fall back to
+    plain iteration over the `array` columns.
+
+    Slots of released modules are reused by the modules registered afterwards.
+
+    Attributes:
+        capacity (int): Number of rows currently allocated in every column.
+    """
+
+    def __init__(self):
+        """HomePlusStateStore Constructor"""
+        self.capacity = 0
+        self._columns = {name: array(code) for name, code in COLUMNS.items()}
+        self._module_ids = []
+        self._free_slots = []
+        self._home_codes = {}
+        self._home_ids = []
+        self._grow(_INITIAL_CAPACITY)
+
+    def __len__(self):
+        """Return the number of modules registered in the store"""
+        return len(self._module_ids) - len(self._free_slots)
+
+    def register(self, module):
+        """Allocate a slot for a module and write its current state into it.
+
+        Args:
+            module (HomePlusModule): Module to be registered. Its `_slot` attribute is set to the allocated slot.
+
+        Returns:
+            int: Slot allocated to the module.
+        """
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._module_ids[slot] = module.id
+        else:
+            slot = len(self._module_ids)
+            if slot >= self.capacity:
+                self._grow(self.capacity)
+            self._module_ids.append(module.id)
+        columns = self._columns
+        columns["device"][slot] = DEVICE_CODES.index(module.device) if module.device in DEVICE_CODES else -1
+        columns["home"][slot] = self._home_code(module.plant.id) if module.plant is not None else -1
+        module._slot = slot
+        self.write(module)
+        return slot
+
+    def release(self, module):
+        """Release the slot of a module that is no longer in the fleet.
+
+        Args:
+            module (HomePlusModule): Module to be released.
+        """
+        slot = module._slot
+        if slot is None:
+            return
+        module._slot = None
+        self._module_ids[slot] = None
+        for name, default in _DEFAULTS.items():
+            self._columns[name][slot] = default
+        self._columns["last_updated"][slot] = float("nan")
+        self._free_slots.append(slot)
+
+    def write(self, module):
+        """Write the current state of a registered module into its slot.
+
+        Args:
+            module (HomePlusModule): Module whose state has changed.
+        """
+        slot = module._slot
+        columns = self._columns
+        status = getattr(module, "status", None)
+        level = getattr(module, "level", None)
+        battery_level = getattr(module, "battery_level", None)
+        columns["power"][slot] = getattr(module, "power", 0) or 0
+        columns["on"][slot] = -1 if status not in ("on", "off") else status == "on"
+        columns["reachable"][slot] = module.reachable is True
+        columns["level"][slot] = -1 if level is None else level
+        columns["battery_level"][slot] = -1 if battery_level in (None, "") else battery_level
+        columns["last_updated"][slot] = time.time()
+
+    def module_id(self, slot):
+        """Return the unique identifier of the module in a slot, or None if the slot is free."""
+        return self._module_ids[slot] if slot < len(self._module_ids) else None
+
+    def column(self, name):
+        """Return a column of the store.
+
+        With NumPy installed, the column is returned as a zero-copy NumPy view that remains valid until the store
+        grows. Otherwise, a copy of the underlying array is returned.
+
+        Args:
+            name (str): Name of the column (see `COLUMNS`).
+
+        Returns:
+            numpy.ndarray or array: Values of the column for all the slots, including the free ones.
+        """
+        values = self._columns[name]
+        if np is None:
+            return array(values.typecode, values)
+        return np.frombuffer(values, dtype=values.typecode)
+
+    def mask(self, device=None, home_id=None, reachable=None, on=None):
+        """Return a mask of the slots of the modules that match all the given conditions.
+
+        Args:
+            device (str, optional): Type of the device (plug, light, remote, automation).
+            home_id (str, optional): Unique identifier of the home of the modules.
+            reachable (bool, optional): Reachability of the modules.
+            on (bool, optional): On/off status of the modules.
+
+        Returns:
+            numpy.ndarray or list: Boolean mask over all the slots of the store.
+        """
+        conditions = []
+        if device is not None:
+            conditions.append(("device", DEVICE_CODES.index(device) if device in DEVICE_CODES else -2))
+        if reachable is not None:
+            conditions.append(("reachable", int(reachable)))
+        if on is not None:
+            conditions.append(("on", int(on)))
+        # Free slots have no home, so the home condition also selects the slots in use
+        home_code = self._home_codes.get(home_id, -2) if home_id is not None else None
+
+        if np is not None:
+            homes = self.column("home")
+            result = homes != -1 if home_code is None else homes == home_code
+            for name, value in conditions:
+                result &= self.column(name) == value
+            return result
+
+        homes = self._columns["home"]
+        result = [h != -1 for h in homes] if home_code is None else [h == home_code for h in homes]
+        for name, value in conditions:
+            result = [r and c == value for r, c in zip(result, self._columns[name])]
+        return result
+
+    def module_ids(self, **conditions):
+        """Return the unique identifiers of the modules that match all the given conditions (see `mask()`)."""
+        mask = self.mask(**conditions)
+        if np is not None:
+            return [self._module_ids[slot] for slot in np.flatnonzero(mask)]
+        return [self._module_ids[slot] for slot, selected in enumerate(mask) if selected]
+
+    def count(self, **conditions):
+        """Return the number of modules that match all the given conditions (see `mask()`)."""
+        mask = self.mask(**conditions)
+        return int(np.count_nonzero(mask)) if np is not None else sum(mask)
+
+    def total_power(self, **conditions):
+        """Return the total power consumption in watts of the modules that match all the given conditions."""
+        mask = self.mask(**conditions)
+        if np is not None:
+            return int(self.column("power")[mask].sum())
+        return sum(power for power, selected in zip(self._columns["power"], mask) if selected)
+
+    def _home_code(self, home_id):
+        """Return the integer code of a home in the `home` column."""
+        code = self._home_codes.get(home_id)
+        if code is None:
+            code = self._home_codes[home_id] = len(self._home_ids)
+            self._home_ids.append(home_id)
+        return code
+
+    def _grow(self, extra_rows):
+        """Add rows to every column, initialised to the unknown value."""
+        for name, values in self._columns.items():
+            default = float("nan") if name == "last_updated" else _DEFAULTS[name]
+            try:
+                values.extend(array(values.typecode, [default]) * extra_rows)
+            except BufferError:
+                # A NumPy view of the column is still alive, so the column cannot be resized in place
+                values = self._columns[name] = array(values.typecode, values)
+                values.extend(array(values.typecode, [default]) * extra_rows)
+        self.capacity += extra_rows
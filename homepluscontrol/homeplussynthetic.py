@@ -0,0 +1,91 @@
+"""Generators of synthetic Home+ Control API payloads of arbitrary size."""
+import random
+
+# Hardware types with the relative frequency in which they appear in the synthetic homes
+MODULE_TYPES = ["NLP"] * 4 + ["NLF"] * 3 + ["NLT"] * 2 + ["NBR"]
+
+
+def module_id(home_index, module_index):
+    """Return a MAC-like module identifier that is unique across homes."""
+    value = (home_index << 24) | module_index
+    return "aa:" + ":".join(f"{(value >> shift) & 0xFF:02x}" for shift in range(48, -8, -8))
+
+
+def generate_home_data(num_modules, home_index=0, seed=0):
+    """Return the JSON structure of one home as returned by the homesdata endpoint."""
+    rng = random.Random(seed + home_index)
+    bridge_id = f"00:11:22:{home_index >> 16 & 0xFF:02x}:{home_index >> 8 & 0xFF:02x}:{home_index & 0xFF:02x}"
+    modules = [{"id": bridge_id, "type": "NLG", "name": "Gateway", "setup_date": 1563480130, "room_id": "1"}]
+    module_ids = []
+    for i in range(num_modules):
+        m_id = module_id(home_index, i)
+        module_ids.append(m_id)
+        hw_type = rng.choice(MODULE_TYPES)
+        module = {
+            "id": m_id,
+            "type": hw_type,
+            "name": f"Module {i}",
+            "setup_date": 1563480133 + i,
+            "room_id": str(i % 10),
+            "bridge": bridge_id,
+        }
+        if hw_type == "NLP":
+            module["appliance_type"] = "other"
+        modules.append(module)
+    modules[0]["modules_bridged"] = module_ids
+    return {
+        "id": f"home_{home_index:08d}",
+        "name": f"Home {home_index}",
+        "altitude": 100,
+        "coordinates": [0.0, 0.0],
+        "country": "ES",
+        "timezone": "Europe/Madrid",
+        "rooms": [
+            {"id": str(r), "name": f"Room {r}", "type": "custom", "module_ids": module_ids[r::10]} for r in range(10)
+        ],
+        "modules": modules,
+        "schedules": [],
+    }
+
+
+def generate_homes_data(num_homes, modules_per_home, seed=0):
+    """Return the response body of the homesdata endpoint for an account with several homes."""
+    return {
+        "body": {
+            "homes": [generate_home_data(modules_per_home, h, seed) for h in range(num_homes)],
+            "user": {"email": "user@example.com", "language": "en-US", "locale": "en-US"},
+        },
+        "status": "ok",
+        "time_exec": 0.05,
+        "time_server": 1656139596,
+    }
+
+
+def generate_module_status(home_data, seed=0, time_server=1656139596):
+    """Return the response body of the homestatus endpoint for a home generated by `generate_home_data`."""
+    rng = random.Random(seed)
+    modules = []
+    for module in home_data["modules"]:
+        status = {
+            "id": module["id"],
+            "type": module["type"],
+            "firmware_revision": rng.randint(40, 70),
+            "last_seen": time_server - rng.randint(0, 600),
+            "reachable": rng.random() > 0.05,
+        }
+        if module["type"] in ("NLP", "NLF"):
+            status["on"] = rng.random() > 0.5
+            status["power"] = rng.randint(0, 2000) if status["on"] else 0
+        elif module["type"] == "NLT":
+            status["battery_state"] = "full"
+            status["battery_level"] = rng.randint(2500, 3300)
+        elif module["type"] == "NBR":
+            status["current_position"] = status["target_position"] = rng.choice([0, 50, 100])
+        if "bridge" in module:
+            status["bridge"] = module["bridge"]
+        modules.append(status)
+    return {
+        "status": "ok",
+        "time_server": time_server,
+        "body": {"home": {"id": home_data["id"], "modules": modules}},
+    }
@@ -0,0 +1,146 @@
+import collections
+import logging
+import time
+
+DEFAULT_TOMBSTONE_MAX_SIZE = 1000
+DEFAULT_TOMBSTONE_TTL = 24 * 3600  # 1 day
+
+
+class HomePlusTombstoneQueue:
+    """Bounded queue of the modules that have been removed from the homes' topology.
+
+    Every removed module leaves a tombstone that consumers (e.g. an integration that has to delete the corresponding
+    entities) read with `pending()` and acknowledge with `ack()` once they have cleaned up after the module.
+    Tombstones that are never acknowledged do not accumulate: they expire after `ttl` seconds and, when the queue is
+    full, the oldest ones are evicted to make room for the new ones.
+
+    The queue also behaves as a read-only dictionary of the removed modules keyed by their unique identifier.
+
+    Attributes:
+        max_size (int): Maximum number of tombstones kept in the queue.
+        ttl (float): Number of seconds after which an unacknowledged tombstone expires.
+        added (int): Number of tombstones added to the queue.
+        acknowledged (int): Number of tombstones acknowledged by the consumers.
+        expired (int): Number of tombstones that expired before being acknowledged.
+        evicted (int): Number of tombstones evicted from the full queue before being acknowledged.
+    """
+
+    def __init__(self, max_size=DEFAULT_TOMBSTONE_MAX_SIZE, ttl=DEFAULT_TOMBSTONE_TTL, clock=time.monotonic):
+        """HomePlusTombstoneQueue Constructor
+
+        Args:
+            max_size (int, optional): Maximum number of tombstones kept in the queue.
+            ttl (float, optional): Number of seconds after which an unacknowledged tombstone expires.
+            clock (callable, optional): Function that returns the current time in seconds. Defaults to
+                                        `time.monotonic`.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.added = 0
+        self.acknowledged = 0
+        self.expired = 0
+        self.evicted = 0
+        self._clock = clock
+        # Tombstones in the order in which they were added, so the oldest one is always the first one. Popping the
+        # oldest entry of a dict gets slower with every entry deleted before it, but not of an OrderedDict
+        self._tombstones = collections.OrderedDict()
+
+    def __len__(self):
+        """Return the number of tombstones in the queue"""
+        self._expire()
+        return len(self._tombstones)
+
+    def __contains__(self, module_id):
+        """Return True if there is a tombstone for the module with the given identifier"""
+        self._expire()
+        return module_id in self._tombstones
+
+    def __iter__(self):
+        """Iterate over the identifiers of the removed modules, oldest first"""
+        self._expire()
+        return iter(list(self._tombstones))
+
+    def __getitem__(self, module_id):
+        """Return the removed module with the given identifier"""
+        self._expire()
+        return self._tombstones[module_id][0]
+
+    @property
+    def logger(self):
+        """Return logger of the tombstone queue."""
+        return logging.getLogger(__name__)
+
+    @property
+    def metrics(self):
+        """Return the counters of the queue as a dictionary."""
+        return {
+            "size": len(self),
+            "added": self.added,
+            "acknowledged": self.acknowledged,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def add(self, module):
+        """Add the tombstone of a removed module, replacing any previous tombstone of the same module.
+
+        Args:
+            module (HomePlusModule): Module that has been removed from the homes' topology.
+        """
+        tombstones = self._tombstones
+        tombstones[module.id] = (module, self._clock())
+        tombstones.move_to_end(module.id)
+        self.added += 1
+        self._expire()
+        while len(tombstones) > self.max_size:
+            module_id, _ = tombstones.popitem(last=False)
+            self.evicted += 1
+            self.logger.debug("Tombstone of Home+ Control module %s evicted before being acknowledged.", module_id)
+
+    def pending(self):
+        """Return the removed modules whose tombstones have not been acknowledged yet, oldest first.
+
+        Returns:
+            list: List of removed modules.
+        """
+        self._expire()
+        return [module for module, _ in self._tombstones.values()]
+
+    def ack(self, *module_ids):
+        """Acknowledge the tombstones of removed modules, which are then dropped from the queue.
+
+        Identifiers without a tombstone (e.g. because it has already expired) are ignored.
+
+        Args:
+            *module_ids (str): Unique identifiers of the removed modules.
+
+        Returns:
+            int: Number of tombstones that were acknowledged.
+        """
+        count = 0
+        for module_id in module_ids:
+            if self._tombstones.pop(module_id, None) is not None:
+                count += 1
+        self.acknowledged += count
+        return count
+
+    def discard(self, module_id):
+        """Drop the tombstone of a module that is back in the homes' topology, without counting it as acknowledged.
+
+        Args:
+            module_id (str): Unique identifier of the module.
+        """
+        self._tombstones.pop(module_id, None)
+
+    def _expire(self):
+        """Drop the tombstones that are older than the TTL."""
+        tombstones = self._tombstones
+        if not tombstones:
+            return
+        deadline = self._clock() - self.ttl
+        while tombstones:
+            _, removed_at = tombstones[next(iter(tombstones))]
+            if removed_at > deadline:
+                break
+            tombstones.popitem(last=False)
+            self.expired += 1
@@ -0,0 +1,270 @@
+import asyncio
+import collections
+import json
+import logging
+import time
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+""" Keys whose values are replaced by `REDACTED` in the recorded request parameters, request bodies and responses. """
+REDACTED_KEYS = frozenset(("access_token", "refresh_token", "client_secret", "code"))
+REDACTED = "REDACTED"
+
+HomePlusTrafficRecord = collections.namedtuple(
+    "HomePlusTrafficRecord", ["started", "elapsed", "method", "url", "params", "data", "status", "body"]
+)
+HomePlusTrafficRecord.__doc__ = """Request to the API and its response, as recorded by `HomePlusTrafficRecorder`.
+
+Attributes:
+    started (float): Time when the request was sent, in seconds since the start of the recording.
+    elapsed (float): Time until the response body was received, in seconds.
+    method (str): HTTP method of the request, in lower case.
+    url (str): URL of the request, without its query parameters.
+    params (dict): Query parameters of the request, or None.
+    data: Body of the request, either as a dictionary of form fields or as text, or None.
+    status (int): HTTP status of the response.
+    body (str): Body of the response.
+"""
+
+
+class HomePlusReplayError(Exception):
+    """A replayed request does not match any of the remaining recorded requests."""
+
+
+def _redact(value):
+    """Return a copy of a dictionary, or of a JSON object in a string, without the values of the `REDACTED_KEYS`."""
+    if isinstance(value, dict):
+        return {key: REDACTED if key in REDACTED_KEYS else item for key, item in value.items()}
+    if isinstance(value, str) and any(key in value for key in REDACTED_KEYS):
+        try:
+            decoded = json.loads(value)
+        except ValueError:
+            return value
+        if isinstance(decoded, dict):
+            return json.dumps(_redact(decoded))
+    return value
+
+
+def _text(data):
+    """Return the body of a request or response as a dictionary of form fields or as text."""
+    if data is None or isinstance(data, (dict, str)):
+        return data
+    if isinstance(data, (bytes, bytearray)):
+        return data.decode("utf-8", errors="replace")
+    return dict(data)
+
+
+def _params(params):
+    """Return the query parameters of a request as a dictionary of strings without the values of the `REDACTED_KEYS`."""
+    return None if params is None else _redact({key: str(value) for key, value in params.items()})
+
+
+def save_traffic(path, records):
+    """Write recorded requests to a file, one JSON object per line.
+
+    Args:
+        path (str): Path of the file.
+        records (iterable): Recorded requests (`HomePlusTrafficRecord`).
+    """
+    with open(path, "w") as traffic_file:
+        for record in records:
+            traffic_file.write(json.dumps(record._asdict()) + "\n")
+
+
+def load_traffic(path):
+    """Read recorded requests from a file written by `save_traffic()`.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        list: Recorded requests (`HomePlusTrafficRecord`), in the order they were sent.
+    """
+    with open(path, "r") as traffic_file:
+        return [HomePlusTrafficRecord(**json.loads(line)) for line in traffic_file if line.strip()]
+
+
+class HomePlusTrafficRecorder:
+    """Client session that records the requests sent through it, with their responses and timings.
+
+    It wraps the aiohttp session that is passed as the `oauth_client` of the API and authentication classes, so it
+    records both the requests of `AbstractHomePlusOAuth2Async.request()` and the token requests. Authorization headers
+    are not recorded and the tokens, secrets and authorization codes are redacted from the parameters and bodies.
+
+    Attributes:
+        session (ClientSession): aiohttp session that sends the requests.
+        records (list): Recorded requests (`HomePlusTrafficRecord`), in the order they were sent.
+    """
+
+    def __init__(self, session=None, clock=time.monotonic):
+        """HomePlusTrafficRecorder Constructor
+
+        Args:
+            session (ClientSession, optional): aiohttp session that sends the requests. If not specified, a new one is
+                                               created.
+            clock (function, optional): Monotonic clock that times the requests.
+        """
+        self.session = aiohttp.ClientSession() if session is None else session
+        self.records = []
+        self._clock = clock
+        self._origin = clock()
+
+    @property
+    def logger(self):
+        """Return logger of the traffic recorder."""
+        return logging.getLogger(__name__)
+
+    @property
+    def closed(self):
+        """Return True if the underlying session is closed."""
+        return self.session.closed
+
+    async def request(self, method, url, params=None, data=None, **kwargs):
+        """Send a request with the underlying session and record it once its response body is received.
+
+        Returns:
+            ClientResponse: aiohttp response object, whose body has already been read.
+        """
+        started = self._clock()
+        response = await self.session.request(method, url, params=params, data=data, **kwargs)
+        body = await response.read()
+        self.records.append(
+            HomePlusTrafficRecord(
+                started - self._origin,
+                self._clock() - started,
+                method.lower(),
+                str(url),
+                _params(params),
+                _redact(_text(data)),
+                response.status,
+                _redact(_text(body)),
+            )
+        )
+        return response
+
+    async def get(self, url, **kwargs):
+        """Send and record a GET request."""
+        return await self.request("get", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        """Send and record a POST request."""
+        return await self.request("post", url, **kwargs)
+
+    def save(self, path):
+        """Write the recorded requests to a file (see `save_traffic()`)."""
+        save_traffic(path, self.records)
+
+    async def close(self):
+        """Close the underlying session."""
+        await self.session.close()
+
+
+class HomePlusReplayResponse:
+    """Response of a replayed request, with the subset of the interface of aiohttp's `ClientResponse` used by the
+    library."""
+
+    def __init__(self, record):
+        """HomePlusReplayResponse Constructor
+
+        Args:
+            record (HomePlusTrafficRecord): Recorded request whose response is replayed.
+        """
+        self.status = record.status
+        self.method = record.method.upper()
+        self.url = URL(record.url)
+        self.headers = CIMultiDictProxy(CIMultiDict({"Content-Type": "application/json"}))
+        self._body = record.body.encode("utf-8")
+
+    async def read(self):
+        """Return the body of the response."""
+        return self._body
+
+    async def text(self, encoding="utf-8"):
+        """Return the body of the response as text."""
+        return self._body.decode(encoding)
+
+    async def json(self, **kwargs):
+        """Return the decoded JSON body of the response."""
+        return json.loads(self._body)
+
+    def release(self):
+        """Do nothing, as there is no connection to release."""
+
+    def raise_for_status(self):
+        """Raise an aiohttp `ClientResponseError` if the status of the response is an error."""
+        if self.status >= 400:
+            request_info = aiohttp.RequestInfo(self.url, self.method, CIMultiDictProxy(CIMultiDict()), self.url)
+            raise aiohttp.ClientResponseError(request_info, (), status=self.status, message="Replayed error")
+
+
+class HomePlusReplaySession:
+    """Client session that answers the requests with the responses of a recording, without any network access.
+
+    Every request is answered with the response of the first remaining recorded request with the same method, URL and
+    query parameters, compared without the values of the `REDACTED_KEYS`, which is then consumed. The response is
+    delivered at the time it was received in the recording, relative to the first replayed request and divided by
+    `speed`, or immediately if `speed` is None.
+
+    Attributes:
+        records (list): Recorded requests that have not been replayed yet.
+        replayed (int): Number of requests replayed so far.
+        speed (float): Speed-up factor of the replay, or None to replay as fast as possible.
+    """
+
+    def __init__(self, records, speed=1.0, clock=time.monotonic):
+        """HomePlusReplaySession Constructor
+
+        Args:
+            records (iterable): Recorded requests (`HomePlusTrafficRecord`), e.g. returned by `load_traffic()`.
+            speed (float, optional): Speed-up factor of the replay, or None to replay as fast as possible.
+            clock (function, optional): Monotonic clock that paces the replay.
+        """
+        self.records = list(records)
+        self.replayed = 0
+        self.speed = speed
+        self.closed = False
+        self._clock = clock
+        self._origin = None
+
+    async def request(self, method, url, params=None, **kwargs):
+        """Return the recorded response of a request, at the pace of the recording.
+
+        Returns:
+            HomePlusReplayResponse: Recorded response.
+
+        Raises:
+            HomePlusReplayError: If no remaining recorded request matches the request.
+        """
+        record = self._take(method.lower(), str(url), params)
+        if self.speed is not None:
+            now = self._clock()
+            if self._origin is None:
+                self._origin = now - record.started / self.speed
+            delay = self._origin + (record.started + record.elapsed) / self.speed - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self.replayed += 1
+        return HomePlusReplayResponse(record)
+
+    async def get(self, url, **kwargs):
+        """Replay a GET request."""
+        return await self.request("get", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        """Replay a POST request."""
+        return await self.request("post", url, **kwargs)
+
+    async def close(self):
+        """Mark the session as closed."""
+        self.closed = True
+
+    def _take(self, method, url, params):
+        """Remove and return the first remaining recorded request that matches a request."""
+        # The recorded parameters are redacted, so the parameters of the request are compared once redacted too
+        params = _params(params)
+        for index, record in enumerate(self.records):
+            if record.method == method and record.url == url and record.params == params:
+                return self.records.pop(index)
+        raise HomePlusReplayError(f"No recorded response left for {method.upper()} {url} {params or ''}")
@@ -50,4 +50,8 @@ setuptools.setup(
         "PyJWT>=1.7.1",
         "yarl>=1.4.2",
     ],
+    extras_require={
+        "speedups": ["orjson>=3.0"],
+        "analytics": ["numpy>=1.17"],
+    },
 )
@@ -12,6 +12,9 @@ from homepluscontrol import (
     homeplusplug,
     homeplusremote,
     homeplusautomation,
+    homeplusstatestore,
+    homepluspowerhistory,
+    homeplussamples,
 )
 
 
@@ -873,3 +876,17 @@ def mock_automation_post():
     future = asyncio.Future()
     future.set_result(True)
     return future
+
+
+# Modules that use NumPy when it is installed and the standard library `array` module otherwise
+ARRAY_BACKEND_MODULES = [homeplusstatestore, homepluspowerhistory, homeplussamples]
+
+
+@pytest.fixture(params=["numpy", "array"])
+def array_backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        for module in ARRAY_BACKEND_MODULES:
+            monkeypatch.setattr(module, "np", None)
+    return request.param
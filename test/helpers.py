@@ -0,0 +1,21 @@
+from homepluscontrol import (
+    homeplusapi,
+)
+
+
+class MockHomePlusControlAPI(homeplusapi.HomePlusControlAPI):
+    """API client whose access token is the one of its OAuth client, e.g. the `test_client` fixture."""
+
+    async def async_get_access_token(self):
+        return self.oauth_client.token
+
+
+class FakeServerHomePlusControlAPI(homeplusapi.HomePlusControlAPI):
+    """API client that gets its access tokens through an authentication client, e.g. from the fake API server."""
+
+    def __init__(self, auth, **kwargs):
+        super().__init__(oauth_client=auth.oauth_client, **kwargs)
+        self.auth = auth
+
+    async def async_get_access_token(self):
+        return await self.auth.async_get_access_token()
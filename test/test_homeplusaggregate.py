@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from homepluscontrol import (
+    homeplusaggregate,
+    homeplusapi,
+    homeplusplug,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+def _plug(plant, id, power, bridge="bridge"):
+    plug = homeplusplug.HomePlusPlug(plant, id, "Plug", "NLP", "plug", bridge)
+    plug.power = power
+    plug.status = "on" if power else "off"
+    return plug
+
+
+def test_power_aggregates(test_plant):
+    aggregates = homeplusaggregate.HomePlusPowerAggregates()
+    plugs = [_plug(test_plant, f"plug_{i}", power) for i, power in enumerate((100, 300, 300, 0))]
+    for plug in plugs:
+        aggregates.add(plug)
+    home = aggregates.home(test_plant.id)
+    assert (home.power, home.on, home.modules, home.max_power) == (700, 3, 4, 300)
+
+    # The maximum only drops when the last module at the maximum goes below it
+    plugs[1].power = 50
+    aggregates.update(plugs[1])
+    assert (home.power, home.max_power) == (450, 300)
+    plugs[2].power, plugs[2].status = 0, "off"
+    aggregates.update(plugs[2])
+    assert (home.power, home.on, home.max_power) == (150, 2, 100)
+
+    # Moving a module to another bridge updates both bridges
+    plugs[0].bridge = "other_bridge"
+    aggregates.update(plugs[0])
+    assert aggregates.bridge("other_bridge").power == 100
+    assert aggregates.bridge("bridge").power == 50
+
+    aggregates.remove(plugs[0])
+    assert aggregates.bridge("other_bridge").modules == 0
+    assert (aggregates.fleet().power, aggregates.fleet().modules) == (50, 3)
+    # Modules that are not registered are ignored
+    aggregates.update(_plug(test_plant, "plug_9", 1000))
+    assert aggregates.device("plug").power == 50
+    assert len(aggregates) == 3
+
+
+def test_api_power_aggregates(mock_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    test_api = MockHomePlusControlAPI(test_client, -1)
+    modules = loop.run_until_complete(test_api.async_get_modules())
+
+    plugs = [m for m in modules.values() if m.device == "plug"]
+    expected = sum(m.power for m in plugs)
+    assert test_api.get_power_aggregate(device="plug").power == expected
+    assert test_api.get_power_aggregate().modules == len(modules)
+    plant = next(iter(test_api._homes.values()))
+    assert plant.get_power_aggregate().on == sum(getattr(m, "status", None) == "on" for m in modules.values())
+
+    # The aggregates follow the state updates of the modules
+    plugs[0].update_state({"id": plugs[0].id, "reachable": True, "on": True, "power": plugs[0].power + 42})
+    assert test_api.get_power_aggregate(device="plug").power == expected + 42
+    assert test_api.get_power_aggregate(home_id=plant.id).power == plant.get_power_aggregate().power
+
+    with pytest.raises(homeplusapi.HomePlusControlApiError):
+        test_api.get_power_aggregate(home_id=plant.id, device="plug")
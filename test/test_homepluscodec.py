@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+import pytest
+from aioresponses import aioresponses
+from yarl import URL
+
+from homepluscontrol import homepluscodec
+
+
+def test_get_codec():
+    assert homepluscodec.get_codec() is next(iter(homepluscodec.CODECS.values()))
+    assert homepluscodec.get_codec("json").name == "json"
+    with pytest.raises(ValueError):
+        homepluscodec.get_codec("unknown")
+
+
+@pytest.mark.parametrize("codec_name", list(homepluscodec.CODECS))
+def test_codec_roundtrip(codec_name, plant_modules):
+    codec = homepluscodec.get_codec(codec_name)
+    raw_body = plant_modules.encode()
+    decoded = codec.loads(raw_body)
+    assert decoded == json.loads(plant_modules)
+    encoded = codec.dumps(decoded)
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == decoded
+
+
+def test_post_request_uses_codec(test_client):
+    loop = asyncio.get_event_loop()
+    test_client.json_codec = homepluscodec.get_codec("json")
+    with aioresponses() as mock:
+        mock.post("https://api.netatmo.com/api/setstate", status=200)
+        loop.run_until_complete(
+            test_client.post_request("https://api.netatmo.com/api/setstate", json={"home": {"id": "1"}})
+        )
+        request = mock.requests[("post", URL("https://api.netatmo.com/api/setstate"))][0]
+    assert request.kwargs["data"] == b'{"home":{"id":"1"}}'
+    assert request.kwargs["headers"]["Content-Type"] == "application/json"
+    assert request.kwargs["headers"]["Authorization"] == "Bearer AcCeSs_ToKeN"
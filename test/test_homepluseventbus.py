@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+from homepluscontrol import (
+    homepluseventbus,
+    homeplusplant,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+def _change(module_id="module_1", device="plug", changes=None, home_id="home_1"):
+    if changes is None:
+        changes = {"status": ("off", "on")}
+    return homepluseventbus.HomePlusModuleChange(home_id, module_id, device, changes, 0)
+
+
+def test_listener_filters():
+    bus = homepluseventbus.HomePlusEventBus()
+    assert not bus.active
+    all_changes = []
+    power_changes = []
+    remove_all = bus.add_listener(all_changes.append)
+    bus.add_listener(power_changes.append, device="plug", fields=["power"])
+    assert bus.active
+
+    bus.publish(_change())
+    bus.publish(_change(changes={"power": (0, 10)}))
+    bus.publish(_change(device="light", changes={"power": (0, 10)}))
+    assert len(all_changes) == 3
+    assert len(power_changes) == 1
+
+    remove_all()
+    bus.publish(_change())
+    assert len(all_changes) == 3
+
+
+def test_watcher_backpressure():
+    loop = asyncio.get_event_loop()
+    bus = homepluseventbus.HomePlusEventBus()
+
+    async def consume():
+        received = []
+        async with bus.watch(module_id="module_1", maxsize=2) as watcher:
+            for power in range(5):
+                bus.publish(_change(changes={"power": (power, power + 1)}))
+            bus.publish(_change(module_id="module_2"))
+            received.append(await watcher.__anext__())
+            received.append(await watcher.__anext__())
+        return watcher, received
+
+    watcher, received = loop.run_until_complete(consume())
+    # The oldest changes are dropped to make room for the new ones
+    assert watcher.dropped == 3
+    assert [c.changes["power"] for c in received] == [(3, 4), (4, 5)]
+    assert not bus.active
+
+
+def test_plant_publishes_deltas(plant_data, plant_modules):
+    bus = homepluseventbus.HomePlusEventBus()
+    home_data = json.loads(plant_data)["body"]["homes"][0]
+    module_status = json.loads(plant_modules)["body"]["home"]["modules"]
+    test_plant = homeplusplant.HomePlusPlant(home_data["id"], home_data, None, event_bus=bus)
+
+    # Without listeners nothing is computed
+    test_plant._parse_module_status(module_status)
+
+    changes = []
+    bus.add_listener(changes.append)
+    test_plant._parse_module_status(module_status)
+    assert changes == []
+
+    module_status[4]["power"] = 55
+    module_status[4]["on"] = False
+    test_plant._parse_module_status(module_status[:-1])
+    assert len(changes) == 2
+    plug_change = changes[0]
+    assert plug_change.home_id == "123456789009876543210"
+    assert plug_change.module_id == "aa:34:ab:f3:ff:4e:22:b1"
+    assert plug_change.device == "plug"
+    assert plug_change.changes == {"status": ("on", "off"), "power": (2, 55)}
+    # The module without status information is marked as unreachable
+    remote_change = changes[1]
+    assert remote_change.module_id == "aa:45:21:aa:1b:fc:bd:da"
+    assert remote_change.changes == {"reachable": (True, False)}
+
+
+def test_api_watch(mock_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    test_api = MockHomePlusControlAPI(test_client, -1)
+
+    async def watch_first_refresh():
+        watcher = test_api.watch(device="automation", fields=["level"])
+        await test_api.async_get_modules()
+        watcher.close()
+        return [change async for change in watcher]
+
+    changes = loop.run_until_complete(watch_first_refresh())
+    assert len(changes) == 2
+    assert {c.module_id for c in changes} == {"aa:34:56:78:90:00:0c:dd", "aa:88:99:43:18:1f:09:76"}
+    assert changes[0].changes["level"][0] is None
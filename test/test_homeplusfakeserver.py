@@ -0,0 +1,109 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from homepluscontrol import (
+    authentication,
+    homeplusapi,
+    homeplusfakeserver,
+)
+
+from .helpers import FakeServerHomePlusControlAPI
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def test_fake_server_end_to_end():
+    clock = FakeClock()
+    server = homeplusfakeserver.HomePlusFakeServer(num_homes=2, modules_per_home=20, clock=clock)
+
+    async def scenario():
+        async with server:
+            session = server.client_session()
+            auth = authentication.HomePlusOAuth2Async("client_id", "client_secret", oauth_client=session)
+            api = FakeServerHomePlusControlAPI(auth)
+            modules = await api.async_get_modules()
+            plug = next(m for m in modules.values() if m.device == "plug")
+            shutter = next(m for m in modules.values() if m.device == "automation")
+            await plug.turn_off()
+            start = 100 if shutter.level else 0
+            await shutter.set_level(100 - start)
+            home_id = plug.plant.id
+            assert server.module_status(home_id, plug.id)["on"] is False
+            # The shutter moves at 20% per second
+            clock.now += 2
+            assert server.module_status(home_id, shutter.id)["current_position"] == (40 if start == 0 else 60)
+            clock.now += 10
+            assert server.module_status(home_id, shutter.id)["current_position"] == 100 - start
+            await session.close()
+            return modules
+
+    modules = _run(scenario())
+    assert len(modules) == 2 * (20 + 1)
+    assert server.request_counts["/oauth2/token"] == 1
+    assert server.request_counts["/api/homesdata"] == 1
+    assert server.request_counts["/api/homestatus"] == 2
+    assert server.request_counts["/api/setstate"] == 2
+    # The requests reuse the connection of the session
+    assert len(server.peers) == 1
+
+
+def test_fake_server_errors():
+    clock = FakeClock()
+    server = homeplusfakeserver.HomePlusFakeServer(quota=2, quota_period=10, token_lifetime=60, clock=clock)
+
+    async def scenario():
+        async with server:
+            session = server.client_session()
+            auth = authentication.HomePlusOAuth2Async("client_id", "client_secret", oauth_client=session)
+            api = FakeServerHomePlusControlAPI(auth)
+            for _ in range(2):
+                await api.get_request(homeplusapi.HOMES_DATA_URL)
+            with pytest.raises(aiohttp.ClientResponseError) as quota_error:
+                await api.get_request(homeplusapi.HOMES_DATA_URL)
+            clock.now += 10
+            await api.get_request(homeplusapi.HOMES_DATA_URL)
+            # The token has expired on the server but not yet on the client
+            clock.now += 60
+            with pytest.raises(aiohttp.ClientResponseError) as token_error:
+                await api.get_request(homeplusapi.HOMES_DATA_URL)
+            server.error_rate = 1.0
+            with pytest.raises(aiohttp.ClientResponseError) as server_error:
+                await api.get_request(homeplusapi.HOMES_DATA_URL)
+            await session.close()
+            return quota_error.value.status, token_error.value.status, server_error.value.status
+
+    assert _run(scenario()) == (429, 403, 500)
+    assert server.error_counts == {429: 1, 403: 1, 500: 1}
+
+
+def test_fake_server_state_changes():
+    server = homeplusfakeserver.HomePlusFakeServer(modules_per_home=100, change_rate=0.5, seed=1)
+    home_id = server.homes_data["body"]["homes"][0]["id"]
+    module_ids = [m["id"] for m in server.homes_data["body"]["homes"][0]["modules"]]
+    before = [server.module_status(home_id, module_id) for module_id in module_ids]
+    server._random_changes(home_id)
+    after = [server.module_status(home_id, module_id) for module_id in module_ids]
+    changed = sum(b != a for b, a in zip(before, after))
+    assert 20 < changed < 80
+
+
+def test_fake_session_rewrites_api_urls():
+    async def scenario():
+        session = homeplusfakeserver.HomePlusFakeSession("http://127.0.0.1:8080/")
+        rewritten = session._rewrite(homeplusapi.HOMES_DATA_URL), session._rewrite("https://example.com/api")
+        await session.close()
+        return rewritten
+
+    assert _run(scenario()) == ("http://127.0.0.1:8080/api/homesdata", "https://example.com/api")
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from homepluscontrol import (
+    homepluseventbus,
+    homeplushistory,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+def _change(module_id, timestamp, **changes):
+    return homepluseventbus.HomePlusModuleChange("home", module_id, "plug", changes, timestamp)
+
+
+def test_history_queries(tmp_path):
+    store = homeplushistory.HomePlusHistoryStore(str(tmp_path / "history.db"), batch_size=4)
+    store.add(_change("plug_1", 10.0, status=("off", "on"), power=(0, 50)))
+    store.add(_change("plug_2", 20.0, reachable=(True, False)))
+    store.add(_change("plug_1", 30.0, status=("on", "off")))
+    # The first batch is written in the background, the last change is still buffered
+    store.add(_change("plug_3", 40.0, reachable=(True, False)))
+    store.add(_change("plug_2", 50.0, reachable=(False, True)))
+    asyncio.get_event_loop().run_until_complete(store.async_flush())
+    assert store.rows_written == 6
+
+    assert list(store.query(module_id="plug_1")) == [
+        homeplushistory.HomePlusHistoryRecord(10.0, "home", "plug_1", "plug", "status", "off", "on"),
+        homeplushistory.HomePlusHistoryRecord(10.0, "home", "plug_1", "plug", "power", 0, 50),
+        homeplushistory.HomePlusHistoryRecord(30.0, "home", "plug_1", "plug", "status", "on", "off"),
+    ]
+    assert [r.module_id for r in store.query(field="reachable", start=20.0, end=40.0)] == ["plug_2", "plug_3"]
+    assert store.last_change_to("plug_1", "status", "on") == 10.0
+    assert store.last_change_to("plug_2", "status", "on") is None
+
+    # plug_2 was unreachable before the range and plug_3 became unreachable during it
+    assert list(store.modules_with("reachable", False, 45.0, 60.0)) == ["plug_2", "plug_3"]
+    assert list(store.modules_with("reachable", False, 55.0, 60.0)) == ["plug_3"]
+    assert list(store.modules_with("reachable", False, 0.0, 10.0)) == []
+    assert list(store.modules_with("reachable", False, 45.0, 60.0, home_id="other")) == []
+
+    store.add(_change("plug_1", 60.0, status=("off", "on")))
+    store.close()
+    reopened = homeplushistory.HomePlusHistoryStore(str(tmp_path / "history.db"))
+    assert reopened.last_change_to("plug_1", "status", "on") == 60.0
+    reopened.close()
+
+
+def test_api_history(mock_aioresponse, plant_modules, test_client, tmp_path):
+    loop = asyncio.get_event_loop()
+    store = homeplushistory.HomePlusHistoryStore(str(tmp_path / "history.db"))
+    test_api = MockHomePlusControlAPI(test_client, history_store=store)
+    loop.run_until_complete(test_api.async_get_modules())
+
+    plant = test_api._homes["123456789009876543210"]
+    status = json.loads(plant_modules)["body"]["home"]["modules"]
+    plug = next(m for m in status if m["id"] == "aa:87:65:43:21:fe:dc:ba")
+    plug["power"] += 100
+    plant._parse_module_status(status)
+    loop.run_until_complete(store.async_flush())
+
+    *_, record = store.query(module_id="aa:87:65:43:21:fe:dc:ba", field="power")
+    assert (record.home_id, record.new - record.old) == ("123456789009876543210", 100)
+    store.close()
+
+
+def test_changes_are_written_every_cycle(mock_aioresponse, plant_modules, test_client, tmp_path):
+    loop = asyncio.get_event_loop()
+    store = homeplushistory.HomePlusHistoryStore(str(tmp_path / "history.db"))
+    test_api = MockHomePlusControlAPI(test_client, history_store=store)
+    loop.run_until_complete(test_api.async_get_modules())
+    plant = test_api._homes["123456789009876543210"]
+    status = json.loads(plant_modules)["body"]["home"]["modules"]
+    plug = next(m for m in status if m["id"] == "aa:87:65:43:21:fe:dc:ba")
+
+    async def refresh_cycle():
+        plug["power"] += 1
+        plant._parse_module_status(status)
+        # The changes of the cycle are handed to the writer thread on the next iteration of the event loop
+        await asyncio.sleep(0)
+        return len(store._pending)
+
+    for _ in range(3):
+        assert loop.run_until_complete(refresh_cycle()) == 0
+    # Far fewer changes than a batch, which are queried without flushing the store first
+    assert len(list(store.query(module_id=plug["id"], field="power"))) == 4
+    assert store.rows_written < store.batch_size
+
+    # Changes added without an event loop are written before any query
+    store.add(homepluseventbus.HomePlusModuleChange("home", "plug", "plug", {"status": ("off", "on")}, 1.0))
+    assert store.last_change_to("plug", "status", "on") == 1.0
+    store.close()
+    assert list(store.query(module_id="plug")) == [
+        homeplushistory.HomePlusHistoryRecord(1.0, "home", "plug", "plug", "status", "off", "on")
+    ]
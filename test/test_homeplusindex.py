@@ -0,0 +1,69 @@
+import asyncio
+import copy
+import json
+
+from aioresponses import aioresponses
+
+from .helpers import MockHomePlusControlAPI
+
+
+def _renamed(payload):
+    """Return a copy of a payload with different module and bridge identifiers."""
+    return json.loads(json.dumps(payload).replace("aa:", "bb:").replace("00:11:22", "99:11:22"))
+
+
+def test_multiple_homes(plant_data, plant_modules, test_client):
+    loop = asyncio.get_event_loop()
+    homes_data = json.loads(plant_data)
+    status = json.loads(plant_modules)
+    second_home = _renamed(homes_data)["body"]["homes"][0]
+    second_home["id"] = "99999999999999999999"
+    second_status = _renamed(status)
+    second_status["body"]["home"]["id"] = "99999999999999999999"
+    homes_data["body"]["homes"].append(second_home)
+    # Second refresh: a plug of the first home goes away and a remote of the second home is unreachable
+    reduced_homes_data = copy.deepcopy(homes_data)
+    reduced_homes_data["body"]["homes"][0]["modules"].pop(1)
+    reduced_second_status = copy.deepcopy(second_status)
+    reduced_second_status["body"]["home"]["modules"].pop()
+
+    test_api = MockHomePlusControlAPI(test_client, -1)
+    first_url = "https://api.netatmo.com/api/homestatus?home_id=123456789009876543210"
+    second_url = "https://api.netatmo.com/api/homestatus?home_id=99999999999999999999"
+    with aioresponses() as mock:
+        mock.get("https://api.netatmo.com/api/homesdata", status=200, body=json.dumps(homes_data))
+        mock.get(first_url, status=200, body=plant_modules)
+        mock.get(second_url, status=200, body=json.dumps(second_status))
+        mock.get("https://api.netatmo.com/api/homesdata", status=200, body=json.dumps(reduced_homes_data))
+        mock.get(first_url, status=200, body=plant_modules)
+        mock.get(second_url, status=200, body=json.dumps(reduced_second_status))
+
+        modules = loop.run_until_complete(test_api.async_get_modules())
+        index = test_api.module_index
+        # The modules of both homes are kept
+        assert len(modules) == 24
+        assert len(index.by_home("123456789009876543210")) == 12
+        assert len(index.by_home("99999999999999999999")) == 12
+        assert len(index.by_device("plug")) == 8
+        assert len(index.by_bridge("99:11:22:33:44:55")) == 11
+        assert len(index.by_reachable(True)) == 24
+        assert index.by_reachable(False) == []
+
+        modules = loop.run_until_complete(test_api.async_get_modules())
+        assert len(modules) == 23
+        assert list(test_api._modules_to_remove) == ["aa:04:74:00:00:0b:ab:cd"]
+        assert len(index.by_device("plug")) == 7
+        assert len(index.by_home("123456789009876543210")) == 11
+        assert [m.id for m in index.by_reachable(False)] == ["bb:45:21:bb:1b:fc:bd:da"]
+        assert index.get("bb:45:21:bb:1b:fc:bd:da").plant.id == "99999999999999999999"
+
+
+def test_removed_home(mock_plant_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    test_api = MockHomePlusControlAPI(test_client, -1)
+    loop.run_until_complete(test_api.async_get_modules())
+    assert len(test_api.module_index) == 12
+    # The second response has no modules in the first home
+    loop.run_until_complete(test_api.async_get_modules())
+    assert len(test_api.module_index) == 0
+    assert len(test_api._modules_to_remove) == 12
@@ -0,0 +1,45 @@
+import asyncio
+
+from homepluscontrol import (
+    homeplusintern,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+def test_intern_table():
+    table = homeplusintern.HomePlusInternTable(max_size=2)
+    first = "".join(["NL", "P"])
+    second = "".join(["NL", "P"])
+    assert first is not second
+    assert table(first) is first
+    assert table(second) is first
+    assert (table.hits, table.misses) == (1, 1)
+    # Other types of values are not interned
+    assert table(None) is None
+    assert table(42) == 42
+    assert len(table) == 1
+
+    # The oldest entries are evicted when the table is full
+    table("NLF")
+    table("NLT")
+    assert len(table) == 2
+    assert table.evictions == 1
+    assert table(second) is second
+
+
+def test_api_interns_payload_strings(mock_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    test_api = MockHomePlusControlAPI(test_client, -1)
+    loop.run_until_complete(test_api.async_get_modules())
+
+    modules = list(test_api._modules.values())
+    bridges = {id(m.bridge) for m in modules if m.bridge is not None}
+    assert len(bridges) == 1
+    plugs = [m for m in modules if m.hw_type == "NLP"]
+    assert len({id(m.hw_type) for m in plugs}) == 1
+    # The cached module status shares the module identifiers
+    home = test_api._homes["123456789009876543210"]
+    status_ids = {id(m.id) for m in home.module_status}
+    assert {id(m.id) for m in modules} <= status_ids
+    assert test_api.intern_table.hits > 0
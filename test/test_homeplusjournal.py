@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from homepluscontrol import (
+    homeplusjournal,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+def _fill(journal, count, start=0):
+    for i in range(start, start + count):
+        journal.append(f"module_{i % 10}", "power", i - 1, i, float(i))
+
+
+def test_journal_replay(tmp_path):
+    journal = homeplusjournal.HomePlusJournal(str(tmp_path), segment_size=2048, index_interval=8)
+    journal.append("plug", "status", "off", "on", 0.5)
+    journal.append("plug", "reachable", True, False, 0.5)
+    journal.append("light", "level", None, 2.5, 0.75)
+    _fill(journal, 1000, start=1)
+    journal.flush()
+    assert len(journal.segments) > 10
+    assert journal.records_written == 1003
+
+    records = list(journal.replay(end=0.75))
+    assert records == [
+        homeplusjournal.HomePlusJournalRecord(0.5, "plug", "status", "off", "on"),
+        homeplusjournal.HomePlusJournalRecord(0.5, "plug", "reachable", True, False),
+        homeplusjournal.HomePlusJournalRecord(0.75, "light", "level", None, 2.5),
+    ]
+    assert [r.timestamp for r in journal.replay(start=500, end=510)] == [float(i) for i in range(500, 511)]
+    assert [r.new for r in journal.replay(start=990, module_id="module_5")] == [995]
+    with pytest.raises(ValueError):
+        journal.append("plug", "name", "a", "b", 1001.0)
+
+    # The segments are recovered when the journal is opened again
+    journal.close()
+    reopened = homeplusjournal.HomePlusJournal(str(tmp_path), segment_size=2048, index_interval=8)
+    assert [r.timestamp for r in reopened.replay(start=500, end=510)] == [float(i) for i in range(500, 511)]
+    assert len(list(reopened.replay())) == 1003
+
+
+def test_journal_truncated_segment(tmp_path):
+    journal = homeplusjournal.HomePlusJournal(str(tmp_path), index_interval=8)
+    _fill(journal, 20)
+    journal.flush()
+    [path] = journal.segments
+    # The index is lost and the last record is only partially written
+    os.unlink(path[: -len(".seg")] + ".idx")
+    with open(path, "ab") as segment_file:
+        segment_file.write(b"\x20\x00\x01")
+
+    recovered = homeplusjournal.HomePlusJournal(str(tmp_path), index_interval=8)
+    assert [r.timestamp for r in recovered.replay(start=10)] == [float(i) for i in range(10, 20)]
+    assert os.path.exists(path[: -len(".seg")] + ".idx")
+
+
+def test_journal_compaction(tmp_path):
+    journal = homeplusjournal.HomePlusJournal(str(tmp_path), segment_size=512, compaction_window=100, retention=300)
+    for i in range(100):
+        journal.append("plug", "power", i, i + 1, float(i))
+    # Changes that cancel out within a window are dropped
+    journal.append("plug", "status", "off", "on", 100.0)
+    journal.append("plug", "status", "on", "off", 101.0)
+    for i in range(100, 500, 10):
+        journal.append("plug", "power", i, i + 1, float(i))
+    journal.close()
+
+    records = list(journal.replay())
+    # Expired segments are deleted and the successive changes of every window are merged within each segment
+    assert len([r for r in records if r.timestamp < 100]) < 5
+    assert all(r.field == "power" for r in records)
+    assert journal.records_compacted == 142 - len(records)
+    assert [r.timestamp for r in records] == sorted(r.timestamp for r in records)
+    merged = next(r for r in records if r.timestamp < 100)
+    assert merged.new - merged.old > 1
+
+
+def test_plant_journal(mock_aioresponse, plant_modules, test_client, tmp_path):
+    loop = asyncio.get_event_loop()
+    journal = homeplusjournal.HomePlusJournal(str(tmp_path))
+    test_api = MockHomePlusControlAPI(test_client, journal=journal)
+    loop.run_until_complete(test_api.async_get_modules())
+    first = list(journal.replay())
+    assert len(first) > 0
+
+    plant = test_api._homes["123456789009876543210"]
+    status = json.loads(plant_modules)["body"]["home"]["modules"]
+    plug = next(m for m in status if m["id"] == "aa:87:65:43:21:fe:dc:ba")
+    plug["power"] += 100
+    plant._parse_module_status(status)
+    [record] = list(journal.replay())[len(first) :]
+    assert (record.module_id, record.field, record.new - record.old) == ("aa:87:65:43:21:fe:dc:ba", "power", 100)
+
+
+def test_journal_batches(tmp_path):
+    journal = homeplusjournal.HomePlusJournal(str(tmp_path), batch_size=10)
+    _fill(journal, 5)
+    # The records are buffered until a batch is full or they are handed to the writer thread
+    assert journal.records_written == 0
+    _fill(journal, 10, start=5)
+    journal.write_pending()
+    asyncio.get_event_loop().run_until_complete(journal.async_flush())
+    assert journal.records_written == 15
+    assert len(list(journal.replay())) == 15
+    journal.close()
+
+
+def test_journal_compacts_sealed_segment(tmp_path):
+    journal = homeplusjournal.HomePlusJournal(str(tmp_path), segment_size=512, compaction_window=100)
+    # The changes of one window, which fill exactly one segment
+    count = 0
+    while len(journal.segments) == 1:
+        journal.append("plug", "power", count, count + 1, float(count))
+        journal.flush()
+        count += 1
+    # The segment that has just been sealed is compacted straight away
+    assert journal.records_compacted == count - 1
+    assert list(journal.replay()) == [homeplusjournal.HomePlusJournalRecord(count - 1.0, "plug", "power", 0, count)]
+    journal.close()
+
+
+def test_journal_replay_during_compaction(tmp_path):
+    journal = homeplusjournal.HomePlusJournal(str(tmp_path), segment_size=512, compaction_window=100, retention=300)
+    # Changes of different modules, which cannot be merged
+    for i in range(100):
+        journal.append(f"module_{i}", "power", -1, i, float(i))
+    journal.flush()
+    segments = journal.segments
+    replay = journal.replay()
+    assert next(replay).timestamp == 0.0
+
+    # Segments are sealed while the replay is in progress, but the segments it reads are neither compacted nor deleted
+    _fill(journal, 500, start=1000)
+    journal.flush()
+    assert all(os.path.exists(path) for path in segments)
+    assert journal.records_compacted == 0
+    assert [r.timestamp for r in replay] == [float(i) for i in range(1, 100)]
+
+    # The deferred compaction runs once the replay is over
+    journal.flush()
+    assert journal.records_compacted > 0
+    assert not os.path.exists(segments[0])
+    journal.close()
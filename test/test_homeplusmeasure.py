@@ -0,0 +1,98 @@
+import asyncio
+import json
+import re
+
+import pytest
+from aioresponses import CallbackResult, aioresponses
+
+from homepluscontrol import (
+    homeplusapi,
+    homeplusmeasure,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+GET_MEASURE_PATTERN = re.compile(r"^https://api\.netatmo\.com/api/getmeasure.*$")
+HOUR = 3600
+NOW = 10000 * HOUR + 1800  # Half way through an hour
+
+
+class FakeModule:
+    id = "aa:87:65:43:21:fe:dc:ba"
+    bridge = "00:11:22:33:44:55"
+
+
+class FakeGetMeasure:
+    """Callback that returns one value per hour, equal to the hour number, and records the requested ranges."""
+
+    def __init__(self):
+        self.ranges = []
+
+    def __call__(self, url, **kwargs):
+        begin, end = int(url.query["date_begin"]), int(url.query["date_end"])
+        self.ranges.append((begin, end))
+        first = -(-begin // HOUR) * HOUR
+        body = {str(t): [t // HOUR] for t in range(first, end, HOUR)}
+        return CallbackResult(status=200, body=json.dumps({"body": body, "status": "ok"}))
+
+
+def test_measure_client(test_client):
+    loop = asyncio.get_event_loop()
+    getmeasure = FakeGetMeasure()
+    client = homeplusmeasure.HomePlusMeasureClient(test_client, chunk_size=100, clock=lambda: NOW)
+    with aioresponses() as mock:
+        mock.get(GET_MEASURE_PATTERN, callback=getmeasure, repeat=True)
+        start = NOW - 250 * HOUR
+        measures = loop.run_until_complete(client.get_measures(FakeModule(), start))
+        # Intervals from the first one that starts in the range up to the open one
+        assert measures == [(hour * HOUR, hour) for hour in range(9751, 10001)]
+        # The range is split in chunks of 100 hours, aligned on multiples of 100 hours
+        assert sorted(getmeasure.ranges) == [
+            (9700 * HOUR, 9800 * HOUR),
+            (9800 * HOUR, 9900 * HOUR),
+            (9900 * HOUR, 10000 * HOUR),
+            (10000 * HOUR, NOW),
+        ]
+
+        # Only the open interval is requested again
+        measures_again = loop.run_until_complete(client.get_measures(FakeModule(), start))
+        assert measures_again == measures
+        assert getmeasure.ranges[4:] == [(10000 * HOUR, NOW)]
+        assert client.requests == 5
+
+        loop.run_until_complete(client.get_measures(FakeModule(), start, NOW - 100 * HOUR))
+        assert client.requests == 5
+
+
+def test_measure_client_errors(test_client):
+    with pytest.raises(ValueError):
+        homeplusmeasure.HomePlusMeasureClient(test_client, scale="1month")
+
+    loop = asyncio.get_event_loop()
+    client = homeplusmeasure.HomePlusMeasureClient(test_client, clock=lambda: NOW)
+    with aioresponses() as mock:
+        mock.get(GET_MEASURE_PATTERN, status=500)
+        with pytest.raises(homeplusmeasure.HomePlusMeasureError):
+            loop.run_until_complete(client.get_measures(FakeModule(), NOW - HOUR))
+
+    # Modules without a bridge, such as the gateways, have no measurements
+    gateway = FakeModule()
+    gateway.bridge = None
+    with pytest.raises(homeplusmeasure.HomePlusMeasureError, match="no bridge"):
+        loop.run_until_complete(client.get_measures(gateway, NOW - HOUR))
+
+
+def test_api_energy_measures(mock_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    test_api = MockHomePlusControlAPI(test_client, -1)
+    loop.run_until_complete(test_api.async_get_modules())
+    getmeasure = FakeGetMeasure()
+    mock_aioresponse.get(GET_MEASURE_PATTERN, callback=getmeasure, repeat=True)
+    test_api.measure_client._clock = lambda: NOW
+
+    measures = loop.run_until_complete(test_api.async_get_energy_measures(FakeModule.id, NOW - 2 * HOUR))
+    assert measures == [(NOW - 2 * HOUR - 1800 + HOUR, NOW // HOUR - 1), (NOW - 1800, NOW // HOUR)]
+    with pytest.raises(homeplusapi.HomePlusControlApiError):
+        loop.run_until_complete(test_api.async_get_energy_measures("unknown", NOW - HOUR))
+    with pytest.raises(homeplusapi.HomePlusControlApiError):
+        loop.run_until_complete(test_api.async_get_energy_measures("00:11:22:33:44:55", NOW - HOUR))
@@ -19,3 +19,18 @@ def test_base_update_status(async_mock_plant):
     assert isinstance(mock_module, homeplusmodule.HomePlusModule)
     assert status_result["reachable"]
     assert status_result["firmware_revision"] is not None
+
+
+def test_modules_are_slotted(async_mock_plant):
+    mock_plant, loop = async_mock_plant
+    for module in mock_plant.modules.values():
+        assert not hasattr(module, "__dict__")
+        assert module.statusUrl == "https://api.netatmo.com/api/homestatus"
+    # The status URL is a class constant, which subclasses can override
+    assert "statusUrl" not in homeplusmodule.HomePlusModule.__slots__
+
+    class MirrorModule(homeplusmodule.HomePlusModule):
+        __slots__ = ()
+        statusUrl = "https://example.com/api/homestatus"
+
+    assert MirrorModule(mock_plant, "id", "name", "NLP", "plug", None).statusUrl == "https://example.com/api/homestatus"
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from homepluscontrol import (
+    homepluspayload,
+)
+
+
+def test_decode_home_data(plant_data):
+    home_data = json.loads(plant_data)["body"]["homes"][0]
+    home_info = homepluspayload.HomePlusHomeInfo.from_dict(home_data)
+    assert home_info.id == "123456789009876543210"
+    assert home_info.name == "My Home"
+    assert home_info.country == "ES"
+    assert len(home_info.modules) == 12
+
+    gateway, plug = home_info.modules[:2]
+    assert (gateway.id, gateway.type, gateway.bridge, gateway.appliance_type) == ("00:11:22:33:44:55", "NLG", None, None)
+    assert (plug.name, plug.type, plug.bridge, plug.appliance_type) == (
+        "Gateway Plug",
+        "NLP",
+        "00:11:22:33:44:55",
+        "other",
+    )
+
+
+def test_decode_module_status(plant_modules):
+    module_status = json.loads(plant_modules)["body"]["home"]["modules"]
+    decoded = homepluspayload.decode_module_status(module_status)
+    assert len(decoded) == len(module_status)
+
+    gateway, plug, remote = decoded[:3]
+    assert gateway.reachable is True
+    assert gateway.firmware_revision == 250
+    # Missing fields
+    assert gateway.on is None
+    assert gateway.power == 0
+    assert (plug.on, plug.power) == (True, 0)
+    assert (remote.battery_state, remote.battery_level) == ("full", 2600)
+    assert decoded[8].current_position == 100
+
+    # Decoded entries are passed through
+    assert homepluspayload.decode_module_status(decoded)[0] is gateway
+
+
+def test_payload_structs_are_slotted():
+    module_status = homepluspayload.HomePlusModuleStatus("module_id")
+    assert not hasattr(module_status, "__dict__")
+    with pytest.raises(AttributeError):
+        module_status.unknown_field = 1
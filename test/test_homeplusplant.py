@@ -1,5 +1,7 @@
 import asyncio
+import json
 
+from aioresponses import aioresponses
 from homepluscontrol import (
     homeplusplant,
     homeplusplug,
@@ -72,3 +74,121 @@ def test_topology_and_module_separate_update(mock_aioresponse, test_client):
     assert mock_plant.modules["aa:34:ab:f3:ff:4e:22:b1"].fw == 68
     assert mock_plant.modules["aa:34:ab:f3:ff:4e:22:b1"].status == "on"
     assert mock_plant.modules["aa:34:ab:f3:ff:4e:22:b1"].reachable
+
+
+def test_unchanged_module_status_is_skipped(plant_data, plant_modules, test_client):
+    loop = asyncio.get_event_loop()
+    home_data = json.loads(plant_data)["body"]["homes"][0]
+    test_plant = homeplusplant.HomePlusPlant(home_data["id"], home_data, test_client)
+    status_url = "https://api.netatmo.com/api/homestatus?home_id=123456789009876543210"
+    changed_modules = plant_modules.replace('"power": 2,', '"power": 25,')
+
+    with aioresponses() as mock:
+        mock.get(status_url, status=200, body=plant_modules)
+        # Only the server time differs
+        mock.get(status_url, status=200, body=plant_modules.replace("1656139596", "1656139606"))
+        mock.get(status_url, status=200, body=changed_modules)
+        mock.get(status_url, status=200, body=changed_modules)
+
+        loop.run_until_complete(test_plant.update_module_status())
+        assert (test_plant.status_cache_hits, test_plant.status_cache_misses) == (0, 1)
+        test_plant.modules["aa:34:ab:f3:ff:4e:22:b1"].power = -1
+        loop.run_until_complete(test_plant.update_module_status())
+        assert (test_plant.status_cache_hits, test_plant.status_cache_misses) == (1, 1)
+        # The modules have not been updated
+        assert test_plant.modules["aa:34:ab:f3:ff:4e:22:b1"].power == -1
+
+        loop.run_until_complete(test_plant.update_module_status())
+        assert (test_plant.status_cache_hits, test_plant.status_cache_misses) == (1, 2)
+        assert test_plant.modules["aa:34:ab:f3:ff:4e:22:b1"].power == 25
+
+        # A new module in the topology forces the next response to be parsed
+        home_data["modules"].append({"id": "aa:00:00:00:00:00:00:01", "type": "NLP", "name": "New Plug"})
+        loop.run_until_complete(test_plant.update_home_data(home_data))
+        loop.run_until_complete(test_plant.update_module_status())
+        assert (test_plant.status_cache_hits, test_plant.status_cache_misses) == (1, 3)
+
+
+def test_local_state_change_is_corrected_by_unchanged_module_status(plant_data, plant_modules, test_client):
+    loop = asyncio.get_event_loop()
+    home_data = json.loads(plant_data)["body"]["homes"][0]
+    test_plant = homeplusplant.HomePlusPlant(home_data["id"], home_data, test_client)
+    status_url = "https://api.netatmo.com/api/homestatus?home_id=123456789009876543210"
+    plug = test_plant.modules["aa:34:ab:f3:ff:4e:22:b1"]
+
+    with aioresponses() as mock:
+        mock.get(status_url, status=200, body=plant_modules)
+        mock.post("https://api.netatmo.com/api/setstate", status=200)
+        mock.get(status_url, status=200, body=plant_modules)
+
+        loop.run_until_complete(test_plant.update_module_status())
+        assert plug.status == "on"
+        loop.run_until_complete(plug.turn_off())
+        assert plug.status == "off"
+        # The command has not been applied by the server, which still reports the plug as on
+        loop.run_until_complete(test_plant.update_module_status())
+        assert (test_plant.status_cache_hits, test_plant.status_cache_misses) == (0, 2)
+        assert plug.status == "on"
+
+
+def test_unchanged_topology_is_not_parsed(plant_data):
+    loop = asyncio.get_event_loop()
+    home_data = json.loads(plant_data)["body"]["homes"][0]
+    test_plant = homeplusplant.HomePlusPlant(home_data["id"], home_data, None)
+    parsed = []
+    original_parse = test_plant._parse_home_data
+    test_plant._parse_home_data = lambda data: parsed.append(data) or original_parse(data)
+
+    # Same topology, freshly decoded and with changes in data that does not affect the modules
+    same_home_data = json.loads(plant_data)["body"]["homes"][0]
+    same_home_data["name"] = "My Renamed Home"
+    same_home_data["modules"][1]["setup_date"] = 0
+    loop.run_until_complete(test_plant.update_home_data(same_home_data))
+    assert parsed == []
+    assert test_plant.name == "My Renamed Home"
+
+    # Renamed module
+    same_home_data["modules"][1]["name"] = "Renamed Plug"
+    loop.run_until_complete(test_plant.update_home_data(same_home_data))
+    assert len(parsed) == 1
+    assert test_plant.modules["aa:04:74:00:00:0b:ab:cd"].name == "Renamed Plug"
+
+    # Removed module
+    same_home_data["modules"].pop()
+    loop.run_until_complete(test_plant.update_home_data(same_home_data))
+    assert len(parsed) == 2
+    assert "aa:45:21:aa:1b:fc:bd:da" not in test_plant.modules
+
+
+def test_rooms_and_schedules(plant_data):
+    loop = asyncio.get_event_loop()
+    home_data = json.loads(plant_data)["body"]["homes"][0]
+    test_plant = homeplusplant.HomePlusPlant(home_data["id"], home_data, None)
+    # The views are only parsed when accessed
+    assert test_plant._rooms is None and test_plant._schedules is None
+
+    assert sorted(test_plant.rooms) == ["1221", "4560", "8756", "9885"]
+    kitchen = test_plant.rooms["1221"]
+    assert (kitchen.name, kitchen.type) == ("Kitchen", "kitchen")
+    assert [m.name for m in test_plant.get_room_modules("1221")] == ["Volet Cuisine", "Wall Switch 2", "Kitchen Wall Outlet"]
+    assert test_plant.get_room_modules("unknown") == []
+    assert test_plant.get_module_room("aa:04:74:00:00:0b:ab:cd").name == "Living Room"
+    assert test_plant.get_module_room("00:11:22:33:44:55") is None
+
+    schedules = test_plant.schedules
+    assert sorted(schedules) == ["132133bbbdef", "abcdef1234"]
+    assert schedules["132133bbbdef"].type == "electricity"
+    assert schedules["132133bbbdef"].selected
+    assert len(schedules["132133bbbdef"].zones) == 2
+
+    # The views are kept while the topology is unchanged...
+    rooms = test_plant.rooms
+    loop.run_until_complete(test_plant.update_home_data(json.loads(plant_data)["body"]["homes"][0]))
+    assert test_plant.rooms is rooms
+    # ... and parsed again when it changes
+    changed_home_data = json.loads(plant_data)["body"]["homes"][0]
+    changed_home_data["rooms"][0]["name"] = "Guest Bedroom"
+    changed_home_data["schedules"][1]["timetable"].append({"zone_id": 1, "m_offset": 1320})
+    loop.run_until_complete(test_plant.update_home_data(changed_home_data))
+    assert test_plant.rooms["4560"].name == "Guest Bedroom"
+    assert len(test_plant.schedules["132133bbbdef"].timetable) == 3
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+from aioresponses import aioresponses
+
+from homepluscontrol import (
+    homeplusplant,
+    homepluspowerhistory,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+def test_power_history(array_backend):
+    history = homepluspowerhistory.HomePlusPowerHistory(capacity=4)
+    assert history.mean() is None
+    assert history.energy() == 0.0
+
+    for timestamp, power in ((0, 100), (1800, 300), (3600, 300), (5400, 0), (7200, 100)):
+        history.append(timestamp, power)
+    # The oldest sample has been overwritten
+    assert len(history) == 4
+    timestamps, powers = history.samples()
+    assert list(timestamps) == [1800, 3600, 5400, 7200]
+    assert list(powers) == [300, 300, 0, 100]
+
+    assert history.mean() == 175
+    assert (history.min(), history.max()) == (0, 300)
+    assert history.percentile(50) == 200
+    assert history.percentile(100) == 300
+    with pytest.raises(ValueError):
+        history.percentile(101)
+    # 300 W for half an hour, then down to 0 W and up to 100 W in the next two half hours
+    assert history.energy() == 150 + 75 + 25
+    assert history.energy(start=3600, end=5400) == 75
+    assert history.mean(start=6000) == 100
+    assert history.max(start=8000) is None
+
+
+def test_api_power_history(array_backend, mock_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    test_api = MockHomePlusControlAPI(test_client, -1, power_history_size=10)
+    modules = loop.run_until_complete(test_api.async_get_modules())
+
+    plug = modules["aa:87:65:43:21:fe:dc:ba"]
+    assert plug.power_history.capacity == 10
+    assert list(plug.power_history.samples()[1]) == [plug.power]
+    plug.update_state({"id": plug.id, "reachable": True, "on": True, "power": 50})
+    assert plug.power_history.max() == 50
+    # Only the interactive modules keep a power history
+    assert not hasattr(modules["aa:34:97:56:13:cc:bb:aa"], "power_history")
+
+
+def test_unchanged_module_status_is_sampled(plant_data, plant_modules, test_client):
+    loop = asyncio.get_event_loop()
+    home_data = json.loads(plant_data)["body"]["homes"][0]
+    test_plant = homeplusplant.HomePlusPlant(home_data["id"], home_data, test_client, power_history_size=10)
+    status_url = "https://api.netatmo.com/api/homestatus?home_id=123456789009876543210"
+    plug = test_plant.modules["aa:34:ab:f3:ff:4e:22:b1"]
+
+    with aioresponses() as mock:
+        for _ in range(5):
+            mock.get(status_url, status=200, body=plant_modules)
+        for _ in range(5):
+            loop.run_until_complete(test_plant.update_module_status())
+
+    assert (test_plant.status_cache_hits, test_plant.status_cache_misses) == (4, 1)
+    # The power is sampled on every refresh, not only when the status changes
+    timestamps, powers = plug.power_history.samples()
+    assert list(powers) == [plug.power] * 5
+    assert list(timestamps) == sorted(timestamps)
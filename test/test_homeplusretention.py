@@ -0,0 +1,54 @@
+import asyncio
+
+from homepluscontrol import (
+    homeplusretention,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+def _refresh(test_client, policy):
+    loop = asyncio.get_event_loop()
+    test_api = MockHomePlusControlAPI(test_client, -1, retention_policy=policy)
+    loop.run_until_complete(test_api.async_get_modules())
+    return test_api, test_api._homes["123456789009876543210"]
+
+
+def test_keep_all(mock_aioresponse, test_client):
+    test_api, home = _refresh(test_client, None)
+    assert home.retention_policy is homeplusretention.DEFAULT_RETENTION_POLICY
+    assert "rooms" in home.home_data
+    assert len(home.module_status) == 12
+    assert home.raw_module_status is None
+
+
+def test_keep_none(mock_aioresponse, test_client):
+    test_api, home = _refresh(test_client, homeplusretention.HomePlusRetentionPolicy.keep_none())
+    assert home.home_data == {}
+    assert home.module_status == []
+    assert home.raw_module_status is None
+    # The modules are parsed all the same
+    assert len(test_api._modules) == 12
+    assert home.name == "My Home"
+    assert test_api._modules["aa:34:ab:f3:ff:4e:22:b1"].power == 2
+
+
+def test_keep_keys(mock_aioresponse, test_client):
+    test_api, home = _refresh(test_client, homeplusretention.HomePlusRetentionPolicy.keep_keys("rooms", "timezone"))
+    assert sorted(home.home_data) == ["rooms", "timezone"]
+    assert home.module_status == []
+
+
+def test_debug(mock_aioresponse, test_client):
+    test_api, home = _refresh(test_client, homeplusretention.HomePlusRetentionPolicy.debug())
+    assert len(home.raw_module_status) == 12
+    assert home.raw_module_status[1]["offload"] is False
+
+
+def test_refresh_errors_keep_modules(partial_error_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    test_api, home = _refresh(test_client, homeplusretention.HomePlusRetentionPolicy.keep_none())
+    # The status request failed
+    assert not test_api._modules["aa:34:ab:f3:ff:4e:22:b1"].reachable
+    loop.run_until_complete(test_api.async_get_modules())
+    assert test_api._modules["aa:34:ab:f3:ff:4e:22:b1"].reachable
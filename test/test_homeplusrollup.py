@@ -0,0 +1,87 @@
+import asyncio
+import json
+import time
+
+import pytest
+from aioresponses import aioresponses
+
+from homepluscontrol import (
+    homeplusplant,
+    homeplusrollup,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+def test_rollup_series():
+    series = homeplusrollup.HomePlusRollupSeries(60, 3)
+    for timestamp, power in ((0, 10), (30, 20), (59, 30), (60, 5), (130, 8), (200, 1)):
+        series.add(timestamp, power, energy=1.0)
+    # The first bucket has been overwritten
+    assert len(series) == 3
+    assert [b.start for b in series.buckets()] == [60, 120, 180]
+    series.add(100, 1000)
+    assert series.buckets(start=120, end=120) == [homeplusrollup.HomePlusRollupBucket(120, 8, 8, 8.0, 1.0, 1)]
+
+    series = homeplusrollup.HomePlusRollupSeries(60, 3)
+    for timestamp, power in ((0, 10), (30, 20), (59, 30)):
+        series.add(timestamp, power)
+    assert series.buckets() == [homeplusrollup.HomePlusRollupBucket(0, 10, 30, 20.0, 0.0, 3)]
+
+
+def test_power_rollup():
+    home = homeplusrollup.HomePlusPowerRollup(((60, 10), (3600, 2)))
+    rollup = homeplusrollup.HomePlusPowerRollup(((60, 10), (3600, 2)), groups=[home])
+    assert rollup.resolutions == [60, 3600]
+    for timestamp, power in ((0, 100), (1800, 300), (3600, 300), (5400, 100)):
+        rollup.add(timestamp, power)
+    hours = rollup.buckets(3600)
+    assert [(b.start, b.min, b.max, b.avg) for b in hours] == [(0, 100, 300, 200), (3600, 100, 300, 200)]
+    # The energy since the previous sample goes to the bucket of the sample
+    assert [b.energy for b in hours] == [100, 250]
+    assert home.buckets(3600) == hours
+    assert len(rollup.buckets(60)) == 4
+    with pytest.raises(ValueError):
+        rollup.series(86400)
+
+
+def test_api_rollups(mock_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    engine = homeplusrollup.HomePlusRollupEngine()
+    test_api = MockHomePlusControlAPI(test_client, -1, rollup_engine=engine)
+    modules = loop.run_until_complete(test_api.async_get_modules())
+
+    plug = modules["aa:87:65:43:21:fe:dc:ba"]
+    assert plug.power_rollup is engine.module(plug.id)
+    [bucket] = plug.power_rollup.buckets(60)
+    assert bucket.max == plug.power
+    plug_samples = sum(len(m.power_rollup.buckets(86400)) for m in modules.values() if m.device == "plug")
+    assert engine.device("plug").buckets(86400)[0].samples == plug_samples
+    assert engine.home("123456789009876543210").buckets(3600)[0].max == max(
+        m.power for m in modules.values() if m.device in ("plug", "light")
+    )
+    assert engine.device("remote") is None
+
+
+def test_unchanged_module_status_is_rolled_up(monkeypatch, plant_data, plant_modules, test_client):
+    loop = asyncio.get_event_loop()
+    now = [6000]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    home_data = json.loads(plant_data)["body"]["homes"][0]
+    engine = homeplusrollup.HomePlusRollupEngine()
+    test_plant = homeplusplant.HomePlusPlant(home_data["id"], home_data, test_client, rollup_engine=engine)
+    status_url = "https://api.netatmo.com/api/homestatus?home_id=123456789009876543210"
+    plug = test_plant.modules["aa:34:ab:f3:ff:4e:22:b1"]
+
+    with aioresponses() as mock:
+        for _ in range(4):
+            mock.get(status_url, status=200, body=plant_modules)
+        for _ in range(4):
+            loop.run_until_complete(test_plant.update_module_status())
+            now[0] += 60
+
+    assert (test_plant.status_cache_hits, test_plant.status_cache_misses) == (3, 1)
+    # Every minute has its own bucket, with the energy consumed during that minute at the unchanged power
+    buckets = plug.power_rollup.buckets(60)
+    assert [(b.start, b.samples) for b in buckets] == [(6000, 1), (6060, 1), (6120, 1), (6180, 1)]
+    assert [b.energy for b in buckets] == [0.0] + [plug.power / 60] * 3
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+
+from homepluscontrol import (
+    homeplussamples,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+def test_write_read_samples(array_backend, tmp_path, test_plug, test_remote):
+    path = str(tmp_path / "state.samples")
+    with homeplussamples.HomePlusSampleWriter(path) as writer:
+        test_plug.power = 10
+        test_plug.status = "on"
+        test_plug.reachable = True
+        for i in range(100):
+            test_plug.power = i
+            writer.write_modules([test_plug, test_remote], float(i))
+        assert writer.samples_written == 200
+
+    # A partial record is ignored by the reader and dropped by the next writer
+    with open(path, "ab") as sample_file:
+        sample_file.write(b"\x00\x01\x02")
+    with homeplussamples.HomePlusSampleReader(path) as reader:
+        assert len(reader) == 200
+        assert reader.module_ids == [test_plug.id, test_remote.id]
+        power = reader.field("power")
+        assert list(power[:4]) == [0, -1, 1, -1]
+        assert list(reader.field("on")[:2]) == [1, -1]
+        assert list(reader.field("module")[:2]) == [0, 1]
+        assert reader.module_code(test_remote.id) == 1
+        assert reader.module_code("unknown") == -1
+        window = reader.between(10.0, 20.0)
+        assert len(window) == 20
+        if array_backend == "numpy":
+            # Fields are zero-copy views of the memory map
+            assert not power.flags.owndata
+            plug_power = power[reader.field("module") == reader.module_code(test_plug.id)]
+            assert plug_power.sum() == sum(range(100))
+            assert window["timestamp"][0] == 10.0
+            del power, window
+        else:
+            assert window[0][0] == 10.0
+
+    with homeplussamples.HomePlusSampleWriter(path) as writer:
+        writer.write(test_remote, 100.0)
+    with homeplussamples.HomePlusSampleReader(path) as reader:
+        assert len(reader) == 201
+        assert reader.module_ids == [test_plug.id, test_remote.id]
+        assert list(reader.field("timestamp"))[-2:] == [99.0, 100.0]
+
+
+def test_invalid_sample_file(tmp_path):
+    path = tmp_path / "state.samples"
+    path.write_bytes(b"not a sample file")
+    with pytest.raises(homeplussamples.HomePlusSampleError):
+        homeplussamples.HomePlusSampleReader(str(path))
+    with pytest.raises(homeplussamples.HomePlusSampleError):
+        homeplussamples.HomePlusSampleWriter(str(path))
+    path.write_bytes(homeplussamples.SAMPLES_MAGIC + bytes([homeplussamples.SAMPLES_VERSION + 1, 24, 0]) + bytes(6))
+    with pytest.raises(homeplussamples.HomePlusSampleError, match="version"):
+        homeplussamples.HomePlusSampleReader(str(path))
+
+
+def test_api_samples(mock_aioresponse, plant_modules, test_client, tmp_path):
+    loop = asyncio.get_event_loop()
+    path = str(tmp_path / "state.samples")
+    writer = homeplussamples.HomePlusSampleWriter(path)
+    test_api = MockHomePlusControlAPI(test_client, sample_writer=writer)
+    loop.run_until_complete(test_api.async_get_modules())
+    written = writer.samples_written
+    assert written > 0
+
+    plant = test_api._homes["123456789009876543210"]
+    status = json.loads(plant_modules)["body"]["home"]["modules"]
+    plug = next(m for m in status if m["id"] == "aa:87:65:43:21:fe:dc:ba")
+    plug["power"] += 100
+    plant._parse_module_status(status)
+    writer.close()
+
+    with homeplussamples.HomePlusSampleReader(path) as reader:
+        assert len(reader) == written + 1
+        assert reader.module_ids[reader.samples[-1][1]] == "aa:87:65:43:21:fe:dc:ba"
+        assert reader.samples[-1][2] == plug["power"]
@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from homepluscontrol import (
+    homeplusapi,
+    homeplusscheduler,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+class MockPlant:
+    def __init__(self, id, delay=0):
+        self.id = id
+        self.delay = delay
+        self.refreshes = 0
+
+    async def update_module_status(self):
+        await asyncio.sleep(self.delay)
+        self.refreshes += 1
+
+
+def test_scheduler_spreads_deadlines():
+    scheduler = homeplusscheduler.HomePlusRefreshScheduler(refresh_interval=10)
+    plants = [MockPlant(f"home_{i}") for i in range(100)]
+    for p in plants:
+        scheduler.add_plant(p)
+    assert len(scheduler) == 100
+
+    deadlines = sorted(scheduler.next_deadline(p) for p in plants)
+    gaps = [b - a for a, b in zip(deadlines, deadlines[1:])]
+    # All homes fall within one interval and no two homes are bunched together
+    assert deadlines[-1] - deadlines[0] < 10
+    assert min(gaps) > 0.02
+    assert max(gaps) < 0.2
+
+
+def test_scheduler_add_remove():
+    scheduler = homeplusscheduler.HomePlusRefreshScheduler(refresh_interval=10)
+    plant = MockPlant("home_1")
+    scheduler.add_plant(plant)
+    deadline = scheduler.next_deadline(plant)
+    # Registering twice does not change the schedule
+    scheduler.add_plant(plant)
+    assert scheduler.next_deadline(plant) == deadline
+    assert plant in scheduler
+
+    scheduler.remove_plant(plant)
+    assert plant not in scheduler
+    assert scheduler.next_deadline(plant) is None
+    # Invalidated entries are discarded when dispatching
+    assert scheduler._dispatch_due(deadline + 100) is None
+    assert len(scheduler._heap) == 0
+
+
+def test_scheduler_run():
+    loop = asyncio.get_event_loop()
+    scheduler = homeplusscheduler.HomePlusRefreshScheduler(refresh_interval=0.05)
+    plants = [MockPlant(f"home_{i}") for i in range(5)]
+    slow_plant = MockPlant("slow_home", delay=1)
+
+    async def run_scheduler():
+        for p in plants + [slow_plant]:
+            scheduler.add_plant(p)
+        scheduler.start()
+        await asyncio.sleep(0.28)
+        await scheduler.stop()
+
+    loop.run_until_complete(run_scheduler())
+    assert not scheduler.running
+    for p in plants:
+        assert 4 <= p.refreshes <= 6
+    # The slow home never completes a refresh, but is not refreshed concurrently either
+    assert slow_plant.refreshes == 0
+    assert len(scheduler._in_flight) == 0
+
+
+def test_api_registers_homes(mock_plant_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    scheduler = homeplusscheduler.HomePlusRefreshScheduler()
+    test_api = MockHomePlusControlAPI(test_client, -1, scheduler=scheduler)
+
+    loop.run_until_complete(test_api.async_handle_home_data())
+    assert len(scheduler) == 1
+    # Second plant appears
+    loop.run_until_complete(test_api.async_handle_home_data())
+    assert len(scheduler) == 2
+    # Second plant disappears
+    loop.run_until_complete(test_api.async_handle_home_data())
+    assert len(scheduler) == 1
+    assert test_api._homes["123456789009876543210"] in scheduler
+
+
+def test_scheduler_interest():
+    scheduler = homeplusscheduler.HomePlusRefreshScheduler(refresh_interval=10, background_interval=300)
+    plant = MockPlant("home_1")
+    other_plant = MockPlant("home_2")
+    scheduler.add_plant(plant)
+    scheduler.add_plant(other_plant)
+    assert scheduler._interval_for(plant) == 300
+
+    # Interest in a module is interest in its home, and brings the next refresh forward
+    scheduler.subscribe(plant, "module_1")
+    scheduler.subscribe(plant, "module_1")
+    scheduler.subscribe(plant)
+    assert scheduler.is_subscribed(plant)
+    assert scheduler.is_subscribed(plant, "module_1")
+    assert not scheduler.is_subscribed(plant, "module_2")
+    assert not scheduler.is_subscribed(other_plant)
+    assert scheduler._interval_for(plant) == 10
+    assert scheduler._interval_for(other_plant) == 300
+
+    # Interest is reference-counted
+    scheduler.unsubscribe(plant)
+    scheduler.unsubscribe(plant, "module_1")
+    assert scheduler.is_subscribed(plant, "module_1")
+    scheduler.unsubscribe(plant, "module_1")
+    assert not scheduler.is_subscribed(plant)
+    assert scheduler._interval_for(plant) == 300
+    # Unbalanced releases are ignored
+    scheduler.unsubscribe(plant, "module_1")
+    assert not scheduler.is_subscribed(plant)
+
+
+def test_scheduler_run_demand_driven():
+    loop = asyncio.get_event_loop()
+    scheduler = homeplusscheduler.HomePlusRefreshScheduler(refresh_interval=0.05, background_interval=10)
+    idle_plant = MockPlant("idle_home")
+    watched_plant = MockPlant("watched_home")
+
+    async def run_scheduler():
+        # The first home gets a phase of zero, so it is refreshed right away
+        scheduler.add_plant(idle_plant)
+        scheduler.add_plant(watched_plant)
+        scheduler.subscribe(watched_plant)
+        scheduler.start()
+        await asyncio.sleep(0.28)
+        await scheduler.stop()
+
+    loop.run_until_complete(run_scheduler())
+    assert idle_plant.refreshes == 1
+    assert watched_plant.refreshes >= 4
+
+
+def test_api_interest(mock_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    scheduler = homeplusscheduler.HomePlusRefreshScheduler(background_interval=600)
+    test_api = MockHomePlusControlAPI(test_client, -1, scheduler=scheduler)
+    loop.run_until_complete(test_api.async_get_modules())
+    home = test_api._homes["123456789009876543210"]
+
+    test_api.subscribe(module_id="aa:34:ab:f3:ff:4e:22:b1")
+    assert scheduler.is_subscribed(home, "aa:34:ab:f3:ff:4e:22:b1")
+    test_api.unsubscribe(module_id="aa:34:ab:f3:ff:4e:22:b1")
+    assert not scheduler.is_subscribed(home)
+
+    test_api.subscribe(home_id="123456789009876543210")
+    assert scheduler.is_subscribed(home)
+
+    with pytest.raises(homeplusapi.HomePlusControlApiError):
+        test_api.subscribe(module_id="unknown")
+
+    # Interest registration is not available without a scheduler
+    with pytest.raises(homeplusapi.HomePlusControlApiError):
+        MockHomePlusControlAPI(test_client, -1).subscribe(home_id="123456789009876543210")
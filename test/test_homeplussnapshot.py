@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from homepluscontrol import (
+    homeplusapi,
+    homeplusretention,
+    homeplussnapshot,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+def _module_state(module):
+    return (
+        type(module),
+        module.name,
+        module.bridge,
+        module.reachable,
+        getattr(module, "status", None),
+        getattr(module, "power", None),
+        getattr(module, "battery", None),
+        getattr(module, "level", None),
+    )
+
+
+def test_snapshot_roundtrip(mock_aioresponse, test_client, tmp_path):
+    loop = asyncio.get_event_loop()
+    path = str(tmp_path / "homes.snapshot")
+    test_api = MockHomePlusControlAPI(test_client, retention_policy=homeplusretention.HomePlusRetentionPolicy.keep_none())
+    modules = loop.run_until_complete(test_api.async_get_modules())
+    test_api.save_snapshot(path)
+    assert [p.name for p in tmp_path.iterdir()] == ["homes.snapshot"]
+
+    restarted_api = MockHomePlusControlAPI(test_client)
+    requests = sum(len(calls) for calls in mock_aioresponse.requests.values())
+    assert restarted_api.load_snapshot(path) == 1
+    restored = loop.run_until_complete(restarted_api.async_get_modules())
+    # No request is made to serve the last known state
+    assert sum(len(calls) for calls in mock_aioresponse.requests.values()) == requests
+    assert {k: _module_state(m) for k, m in restored.items()} == {k: _module_state(m) for k, m in modules.items()}
+    plant = restarted_api._homes["123456789009876543210"]
+    assert plant.name == "My Home"
+    assert restarted_api.get_power_aggregate().power == test_api.get_power_aggregate().power
+    # Homes that are already known are not replaced
+    assert restarted_api.load_snapshot(path) == 0
+
+
+def test_snapshot_errors(tmp_path, test_client):
+    api = MockHomePlusControlAPI(test_client)
+    with pytest.raises(homeplusapi.HomePlusControlApiError):
+        api.load_snapshot(str(tmp_path / "missing"))
+
+    path = tmp_path / "homes.snapshot"
+    path.write_bytes(b"not a snapshot")
+    with pytest.raises(homeplussnapshot.HomePlusSnapshotError):
+        homeplussnapshot.read_snapshot(str(path))
+    path.write_bytes(homeplussnapshot.SNAPSHOT_MAGIC + bytes([homeplussnapshot.SNAPSHOT_VERSION + 1]))
+    with pytest.raises(homeplussnapshot.HomePlusSnapshotError, match="version"):
+        homeplussnapshot.read_snapshot(str(path))
+    path.write_bytes(homeplussnapshot.SNAPSHOT_MAGIC + bytes([homeplussnapshot.SNAPSHOT_VERSION]) + b"garbage")
+    with pytest.raises(homeplussnapshot.HomePlusSnapshotError, match="Corrupted"):
+        homeplussnapshot.read_snapshot(str(path))
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from homepluscontrol import (
+    homeplusplug,
+    homeplusstatestore,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+@pytest.fixture()
+def state_store(array_backend):
+    return homeplusstatestore.HomePlusStateStore()
+
+
+def test_fleet_aggregates(state_store, mock_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    test_api = MockHomePlusControlAPI(test_client, -1, state_store=state_store)
+    loop.run_until_complete(test_api.async_get_modules())
+
+    assert len(state_store) == 12
+    assert state_store.total_power() == 2022
+    assert state_store.total_power(device="plug") == 2004
+    assert state_store.total_power(device="plug", home_id="123456789009876543210") == 2004
+    assert state_store.total_power(home_id="unknown") == 0
+    assert state_store.count(device="light", on=False) == 2
+    assert state_store.count(reachable=False) == 0
+    assert sorted(state_store.module_ids(device="automation")) == [
+        "aa:34:56:78:90:00:0c:dd",
+        "aa:88:99:43:18:1f:09:76",
+    ]
+
+    plug = test_api._modules["aa:87:65:43:21:fe:dc:ba"]
+    assert state_store.module_id(plug._slot) == plug.id
+    assert list(state_store.column("power"))[plug._slot] == 3
+    loop.run_until_complete(plug.turn_off())
+    assert state_store.count(device="plug", on=True) == 3
+
+
+def test_register_release(state_store, test_plug, test_remote):
+    slot = state_store.register(test_plug)
+    assert test_plug._slot == slot
+    state_store.register(test_remote)
+    assert state_store.count() == 2
+
+    state_store.release(test_plug)
+    assert test_plug._slot is None
+    assert state_store.count() == 1
+    assert state_store.module_id(slot) is None
+    # Free slots are reused
+    assert state_store.register(test_plug) == slot
+
+
+def test_growth(state_store, test_plant):
+    power_view = state_store.column("power")
+    modules = [
+        homeplusplug.HomePlusPlug(test_plant, f"plug_{i}", "Plug", "NLP", "plug", "bridge") for i in range(200)
+    ]
+    for power, module in enumerate(modules):
+        module.power = power
+        state_store.register(module)
+    assert state_store.capacity >= 200
+    assert state_store.total_power() == sum(range(200))
+    assert len(power_view) == 64
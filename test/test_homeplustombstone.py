@@ -0,0 +1,62 @@
+import asyncio
+
+from homepluscontrol import (
+    homeplustombstone,
+)
+
+from .helpers import MockHomePlusControlAPI
+
+
+class FakeModule:
+    def __init__(self, id):
+        self.id = id
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_tombstone_queue():
+    clock = FakeClock()
+    queue = homeplustombstone.HomePlusTombstoneQueue(max_size=3, ttl=60, clock=clock)
+    for module_id in ("a", "b", "c"):
+        queue.add(FakeModule(module_id))
+        clock.now += 10
+    assert list(queue) == ["a", "b", "c"]
+    assert queue["b"].id == "b"
+    # A module removed again gets a new tombstone, at the end of the queue
+    queue.add(FakeModule("a"))
+    assert list(queue) == ["b", "c", "a"]
+
+    # The oldest tombstone is evicted when the queue is full
+    queue.add(FakeModule("d"))
+    assert [m.id for m in queue.pending()] == ["c", "a", "d"]
+    assert queue.evicted == 1
+
+    assert queue.ack("c", "unknown") == 1
+    assert "c" not in queue
+    queue.discard("d")
+    assert list(queue) == ["a"]
+
+    # Unacknowledged tombstones expire after the TTL
+    clock.now += 60
+    assert len(queue) == 0
+    assert queue.metrics == {"size": 0, "added": 5, "acknowledged": 1, "expired": 1, "evicted": 1}
+
+
+def test_api_tombstones(mock_plant_aioresponse, test_client):
+    loop = asyncio.get_event_loop()
+    test_api = MockHomePlusControlAPI(test_client, -1)
+    loop.run_until_complete(test_api.async_get_modules())
+    assert test_api.get_removed_modules() == []
+    # The second response has no modules in the first home
+    loop.run_until_complete(test_api.async_get_modules())
+    removed = test_api.get_removed_modules()
+    assert len(removed) == 12
+    assert test_api.ack_removed_modules(*[m.id for m in removed[:10]]) == 10
+    assert len(test_api._modules_to_remove) == 2
+    assert test_api.tombstones.metrics["acknowledged"] == 10
@@ -0,0 +1,130 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from homepluscontrol import (
+    authentication,
+    homeplusapi,
+    homeplusfakeserver,
+    homeplustraffic,
+)
+
+from .helpers import FakeServerHomePlusControlAPI
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def _module_state(modules):
+    return {k: (type(m), m.name, m.reachable, getattr(m, "power", None)) for k, m in modules.items()}
+
+
+def test_record_and_replay(tmp_path):
+    server = homeplusfakeserver.HomePlusFakeServer(num_homes=2, modules_per_home=5)
+    path = str(tmp_path / "traffic.jsonl")
+
+    async def record():
+        async with server:
+            recorder = homeplustraffic.HomePlusTrafficRecorder(server.client_session())
+            auth = authentication.HomePlusOAuth2Async("client_id", "client_secret", oauth_client=recorder)
+            api = FakeServerHomePlusControlAPI(auth)
+            modules = await api.async_get_modules()
+            plug = next(m for m in modules.values() if m.device == "plug")
+            await plug.turn_on()
+            recorder.save(path)
+            await recorder.close()
+            return _module_state(modules), recorder.records
+
+    recorded_state, records = _run(record())
+    assert [(r.method, r.url.rsplit("/", 1)[1], r.status) for r in records] == [
+        ("post", "token", 200),
+        ("get", "homesdata", 200),
+        ("get", "homestatus", 200),
+        ("get", "homestatus", 200),
+        ("post", "setstate", 200),
+    ]
+    assert all(r.elapsed >= 0 for r in records)
+    # Tokens and secrets are not recorded
+    token_record = records[0]
+    assert token_record.data["client_secret"] == homeplustraffic.REDACTED
+    assert token_record.data["client_id"] == "client_id"
+    assert '"access_token": "REDACTED"' in token_record.body
+    assert all("client_secret" not in r.body for r in records)
+
+    async def replay():
+        session = homeplustraffic.HomePlusReplaySession(homeplustraffic.load_traffic(path), speed=None)
+        auth = authentication.HomePlusOAuth2Async("client_id", "client_secret", oauth_client=session)
+        api = FakeServerHomePlusControlAPI(auth)
+        modules = await api.async_get_modules()
+        plug = next(m for m in modules.values() if m.device == "plug")
+        await plug.turn_on()
+        with pytest.raises(homeplustraffic.HomePlusReplayError):
+            await session.get(homeplusapi.HOMES_DATA_URL)
+        return _module_state(modules), session.replayed
+
+    assert _run(replay()) == (recorded_state, 5)
+
+
+def test_replay_pacing_and_errors(monkeypatch):
+    url = homeplusapi.HOMES_DATA_URL
+    records = [
+        homeplustraffic.HomePlusTrafficRecord(1.0, 0.5, "get", url, None, None, 200, "{}"),
+        homeplustraffic.HomePlusTrafficRecord(3.0, 1.0, "get", url, None, None, 500, "{}"),
+    ]
+    clock = FakeClock()
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+        clock.now += delay
+
+    monkeypatch.setattr(homeplustraffic.asyncio, "sleep", fake_sleep)
+    session = homeplustraffic.HomePlusReplaySession(records, speed=2.0, clock=clock)
+
+    async def replay():
+        first = await session.get(homeplusapi.HOMES_DATA_URL)
+        first.raise_for_status()
+        second = await session.get(homeplusapi.HOMES_DATA_URL)
+        with pytest.raises(aiohttp.ClientResponseError) as error:
+            second.raise_for_status()
+        return await first.json(), error.value.status
+
+    assert _run(replay()) == ({}, 500)
+    # Responses are delivered at half their recorded times, relative to the first request
+    assert delays == [0.25, 1.25]
+
+
+def test_query_parameters_are_redacted():
+    server = homeplusfakeserver.HomePlusFakeServer(num_homes=1, modules_per_home=1)
+    params = {"access_token": "SECRET", "home_id": 1}
+
+    async def record():
+        async with server:
+            recorder = homeplustraffic.HomePlusTrafficRecorder(server.client_session())
+            response = await recorder.get(homeplusapi.HOMES_DATA_URL, params=params)
+            await recorder.close()
+            return response.status, recorder.records
+
+    status, records = _run(record())
+    assert records[0].params == {"access_token": homeplustraffic.REDACTED, "home_id": "1"}
+    assert "SECRET" not in repr(records)
+
+    async def replay():
+        session = homeplustraffic.HomePlusReplaySession(records, speed=None)
+        # The secret of the replayed request does not need to be the recorded one
+        response = await session.get(homeplusapi.HOMES_DATA_URL, params=dict(params, access_token="OTHER"))
+        with pytest.raises(homeplustraffic.HomePlusReplayError):
+            await session.get(homeplusapi.HOMES_DATA_URL, params={"home_id": 2})
+        return response.status
+
+    assert _run(replay()) == status